@@ -1,5 +1,5 @@
 # backend/app.py
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
@@ -7,12 +7,24 @@ import shutil
 from pathlib import Path
 import uuid
 import json
-from datetime import datetime
-import threading
+from datetime import datetime, timedelta
 import time
+import fcntl
+import hashlib
+import threading
 
 # Importer notre compresseur
-from file_compressor import FileCompressor
+from file_compressor import CompressionPool, FileCompressor, run_compression_jobs, set_image_pixel_limit, supported_formats
+from scheduler import JobScheduler, MemoryBudget, QueueFullError, available_memory
+from result_cache import ResultCache
+from zip_stream import stream_zip
+from task_store import create_task_store
+from job_queue import create_job_queue
+from compression_task import (
+    CompressionTask as BaseCompressionTask, build_file_result, file_settings, record_file_progress, record_file_result
+)
+from metrics import REGISTRY, CONTENT_TYPE, gauge, histogram
+from job_metrics import queue_wait_seconds, record_job_metrics, stage_seconds
 
 # Configuration pour servir les fichiers statiques React
 app = Flask(__name__, 
@@ -21,35 +33,138 @@ app = Flask(__name__,
 CORS(app)
 
 # Configuration
-app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))  # 500MB max
 app.config['UPLOAD_FOLDER'] = '/app/uploads'
 app.config['COMPRESSED_FOLDER'] = '/app/compressed'
+app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # Taille de morceau conseillée pour l'upload fragmenté
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.environ.get('X_ACCEL_REDIRECT_PREFIX')  # ex: /protected-compressed (nginx internal)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')  # Apache/lighttpd
+app.config['CACHE_FOLDER'] = os.environ.get('CACHE_FOLDER', '/app/cache')
+app.config['CACHE_MAX_BYTES'] = int(os.environ.get('CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 2GB, 0 = cache désactivé
+app.config['WEB_WORKERS'] = int(os.environ.get('WEB_WORKERS', 1))  # Processus web (gunicorn), qui se partagent les cœurs et la mémoire
+app.config['COMPRESSION_JOBS'] = int(os.environ.get('COMPRESSION_JOBS', max(1, (os.cpu_count() or 1) // app.config['WEB_WORKERS'])))  # Processus de compression par processus web, toutes tâches confondues
+app.config['SCHEDULER_LIGHT_WORKERS'] = int(os.environ.get('SCHEDULER_LIGHT_WORKERS', 2))  # Tâches images/PDF simultanées
+app.config['SCHEDULER_HEAVY_WORKERS'] = int(os.environ.get('SCHEDULER_HEAVY_WORKERS', 1))  # Tâches vidéo/audio simultanées
+app.config['SCHEDULER_MAX_QUEUED'] = int(os.environ.get('SCHEDULER_MAX_QUEUED', 100))  # Au-delà, les nouvelles tâches sont refusées
+app.config['MEMORY_BUDGET'] = int(os.environ.get('MEMORY_BUDGET', 0))  # Mémoire des fichiers compressés simultanément, 0 = 75 % de la mémoire / WEB_WORKERS
+app.config['JOB_MEMORY_LIMIT'] = int(os.environ.get('JOB_MEMORY_LIMIT', 4 * 1024 * 1024 * 1024))  # Plafond par fichier (octets), 0 = aucun
+app.config['JOB_TIMEOUT'] = int(os.environ.get('JOB_TIMEOUT', 3600))  # Durée maximale par fichier (secondes), 0 = aucune
+app.config['MAX_IMAGE_PIXELS'] = int(os.environ.get('MAX_IMAGE_PIXELS', 100_000_000))  # Au-delà, l'image est refusée (bombe de décompression)
+app.config['TASK_STORE_URL'] = os.environ.get('TASK_STORE_URL', 'sqlite:////app/data/tasks.db')  # ou redis://hote:6379/0
+app.config['EXECUTION_MODE'] = os.environ.get('EXECUTION_MODE', 'local')  # local : ordonnanceur intégré, queue : workers séparés (worker.py)
+app.config['JOB_QUEUE_URL'] = os.environ.get('JOB_QUEUE_URL', 'sqlite:////app/data/jobs.db')  # ou redis://hote:6379/0
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # Tentatives par fichier si un worker disparaît
+app.config['TASK_TTL'] = int(os.environ.get('TASK_TTL', 24 * 3600))  # Durée de vie des tâches et de leurs fichiers (secondes)
+app.config['REAPER_INTERVAL'] = int(os.environ.get('REAPER_INTERVAL', 300))  # Fréquence du nettoyage automatique (secondes)
+app.config['BATCH_IDLE_TIMEOUT'] = int(os.environ.get('BATCH_IDLE_TIMEOUT', 3600))  # Lot ouvert sans nouveau fichier fermé après (secondes), 0 = jamais
+app.config['DISK_HIGH_WATERMARK'] = float(os.environ.get('DISK_HIGH_WATERMARK', 0.90))  # Occupation disque déclenchant le nettoyage
+app.config['DISK_LOW_WATERMARK'] = float(os.environ.get('DISK_LOW_WATERMARK', 0.80))  # Occupation visée après nettoyage
 
 # Créer les dossiers nécessaires
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['COMPRESSED_FOLDER'], exist_ok=True)
 
-# Stockage en mémoire des tâches (en production, utiliser Redis)
-tasks = {}
-task_results = {}
-
-class CompressionTask:
-    def __init__(self, task_id, files):
-        self.task_id = task_id
-        self.files = files
-        self.status = 'pending'
-        self.progress = 0
-        self.total_files = len(files)
-        self.processed_files = 0
-        self.results = []
-        self.error_message = None
-        self.created_at = datetime.now()
-        self.completed_at = None
-
-def compress_files_async(task_id, files, settings):
-    """Fonction de compression asynchrone"""
-    task = tasks[task_id]
-    task.status = 'processing'
+# Cache des résultats, partagé par tous les processus de compression
+result_cache = ResultCache(app.config['CACHE_FOLDER'], app.config['CACHE_MAX_BYTES']) if app.config['CACHE_MAX_BYTES'] > 0 else None
+
+# Tâches dont l'archive ZIP est en cours d'enregistrement
+zip_builds = set()
+zip_builds_lock = threading.Lock()
+
+# Réveille les flux SSE locaux à chaque nouvel événement de tâche
+task_events = threading.Condition()
+
+set_image_pixel_limit(app.config['MAX_IMAGE_PIXELS'])
+
+# Les fichiers démarrent selon leur mémoire estimée, et non leur seul nombre
+# (budget propre à chaque processus web, d'où la division par WEB_WORKERS)
+memory_budget = MemoryBudget(
+    app.config['MEMORY_BUDGET'] or int(available_memory() * 0.75 / app.config['WEB_WORKERS'])
+)
+job_limits = (app.config['JOB_MEMORY_LIMIT'] or None, app.config['JOB_TIMEOUT'] or None)
+
+# Pool de compression unique, partagé par toutes les tâches et voies de ce processus web :
+# créé avant tout thread (fork sûr), ffmpeg y est limité à sa part des cœurs
+compression_pool = None
+if app.config['EXECUTION_MODE'] == 'local':
+    compression_pool = CompressionPool(
+        app.config['COMPRESSION_JOBS'],
+        ffmpeg_threads=max(1, (os.cpu_count() or 1) // app.config['WEB_WORKERS'] // app.config['COMPRESSION_JOBS'])
+    )
+
+# Ordonnanceur global : budget fixe de workers au lieu d'un thread par tâche
+scheduler = JobScheduler(
+    {
+        'light': app.config['SCHEDULER_LIGHT_WORKERS'],
+        'heavy': app.config['SCHEDULER_HEAVY_WORKERS']
+    },
+    max_queued=app.config['SCHEDULER_MAX_QUEUED']
+)
+
+# File partagée avec les workers de compression (mode queue uniquement)
+job_queue = None
+if app.config['EXECUTION_MODE'] == 'queue':
+    job_queue = create_job_queue(
+        app.config['JOB_QUEUE_URL'], scheduler.lanes, app.config['JOB_MAX_ATTEMPTS']
+    )
+
+# Métriques exposées sur /metrics (propres à chaque processus),
+# en plus de celles des fichiers compressés (job_metrics, communes avec worker.py)
+task_seconds = histogram('compressor_task_seconds', "Durée de traitement des tâches", ('lane',))
+zip_seconds = histogram('compressor_zip_seconds', "Durée de diffusion des archives ZIP", ('mode',))
+scheduler_tasks = gauge('compressor_scheduler_tasks', "Tâches de l'ordonnanceur", ('lane', 'state'))
+scheduler_workers = gauge('compressor_scheduler_workers', "Workers de l'ordonnanceur", ('lane',))
+queue_jobs = gauge('compressor_job_queue_jobs', "Fichiers de la file partagée des workers", ('lane', 'state'))
+memory_budget_bytes = gauge('compressor_memory_budget_bytes', "Budget mémoire des fichiers en cours", ('state',))
+cache_entries = gauge('compressor_cache_entries', "Entrées du cache de résultats")
+cache_size_bytes = gauge('compressor_cache_size_bytes', "Occupation du cache de résultats")
+
+def collect_gauges():
+    """Occupation de l'ordonnanceur et du cache, lue au moment de l'exposition"""
+    for lane, stats in scheduler.stats().items():
+        scheduler_tasks.set(stats['running'], lane=lane, state='active')
+        scheduler_tasks.set(stats['queued'], lane=lane, state='queued')
+        scheduler_workers.set(stats['workers'], lane=lane)
+    if job_queue is not None:
+        for lane, stats in job_queue.stats().items():
+            queue_jobs.set(stats['running'], lane=lane, state='active')
+            queue_jobs.set(stats['queued'], lane=lane, state='queued')
+    stats = memory_budget.stats()
+    memory_budget_bytes.set(stats['capacity'], state='capacity')
+    memory_budget_bytes.set(stats['used'], state='used')
+    if result_cache is not None:
+        stats = result_cache.stats()
+        cache_entries.set(stats['entries'])
+        cache_size_bytes.set(stats['size_bytes'])
+
+REGISTRY.add_collector(collect_gauges)
+
+class CompressionTask(BaseCompressionTask):
+    """Tâche rattachée au stockage et aux flux SSE de ce processus"""
+    
+    def save(self):
+        """Enregistre l'état courant dans le stockage des tâches"""
+        tasks[self.task_id] = self
+    
+    def publish(self, event_type, data):
+        """Ajoute un événement au journal de la tâche et réveille les flux SSE"""
+        with task_events:
+            tasks.append_event(self.task_id, event_type, data)
+            task_events.notify_all()
+
+# Stockage persistant des tâches (SQLite local ou Redis), partagé entre les workers
+tasks = create_task_store(app.config['TASK_STORE_URL'], CompressionTask.from_dict)
+
+def compress_files_async(task_id, files, settings, queued_at=None):
+    """Fonction de compression asynchrone (queued_at : instant de mise en file, time.monotonic())"""
+    started_at = time.monotonic()
+    task = tasks.update(task_id, lambda task: setattr(task, 'status', 'processing'))
+    if queued_at is not None:
+        queue_wait_seconds.observe(started_at - queued_at, lane=task.lane)
+    task.publish('started', {'total_files': task.total_files})
+    
+    def on_progress(index, fraction):
+        publish_file_progress(task_id, index, files[index], fraction)
     
     try:
         # Créer un dossier unique pour cette tâche
@@ -57,82 +172,132 @@ def compress_files_async(task_id, files, settings):
         task_folder.mkdir(exist_ok=True)
         
         compressor = FileCompressor(str(task_folder))
+        # Le client peut demander moins de processus, jamais plus que la configuration
+        jobs = max(1, min(int(settings.get('jobs', app.config['COMPRESSION_JOBS'])), app.config['COMPRESSION_JOBS']))
+        job_specs = [file_job_spec(task_folder, file_info, settings) for file_info in files]
         
-        for i, file_info in enumerate(files):
-            try:
-                file_path = Path(file_info['path'])
-                extension = file_path.suffix.lower()
-                
-                # Préparer les paramètres selon le type de fichier
-                compression_params = {}
-                
-                if extension in compressor.image_extensions:
-                    compression_params = {
-                        'quality': settings.get('quality', 85),
-                        'max_resolution': (
-                            settings.get('max_width', 1920),
-                            settings.get('max_height', 1080)
-                        )
-                    }
-                elif extension in compressor.video_extensions:
-                    compression_params = {
-                        'bitrate': settings.get('video_bitrate', '1000k'),
-                        'resolution': (
-                            settings.get('max_width', 1280),
-                            settings.get('max_height', 720)
-                        )
-                    }
-                elif extension in compressor.audio_extensions:
-                    compression_params = {
-                        'bitrate': settings.get('audio_bitrate', '128k'),
-                        'format': 'mp3'
-                    }
-                # Pour PDF, pas de paramètres spéciaux nécessaires
-                
-                # Compresser le fichier
-                original_size = compressor.get_file_size(file_path)
-                output_path = compressor.compress_file(file_path, **compression_params)
-                
-                if output_path and output_path.exists():
-                    compressed_size = compressor.get_file_size(output_path)
-                    compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
-                    
-                    result = {
-                        'filename': file_info['filename'],
-                        'original_size': original_size,
-                        'compressed_size': compressed_size,
-                        'compression_ratio': compression_ratio,
-                        'output_path': str(output_path),
-                        'status': 'success'
-                    }
-                else:
-                    result = {
-                        'filename': file_info['filename'],
-                        'status': 'error',
-                        'error': 'Compression failed'
-                    }
-                
-                task.results.append(result)
-                task.processed_files += 1
-                task.progress = (task.processed_files / task.total_files) * 100
-                
-            except Exception as e:
-                result = {
-                    'filename': file_info['filename'],
-                    'status': 'error',
-                    'error': str(e)
-                }
-                task.results.append(result)
-                task.processed_files += 1
-                task.progress = (task.processed_files / task.total_files) * 100
+        # Les résultats sont publiés au fur et à mesure que chaque fichier se termine
+        for index, job_result, error in run_compression_jobs(job_specs, jobs, on_progress, memory_budget, job_limits, compression_pool):
+            file_info = files[index]
+            file_type = compressor.file_type(Path(file_info['path']))
+            record_job_metrics(file_type, file_info, job_result, error)
+            
+            result = build_file_result(index, file_info, job_result, error)
+            task, _, _ = record_file_result(tasks, task_id, result)
+            task.publish('file_completed', {**result, 'task_progress': round(task.progress, 1)})
         
-        task.status = 'completed'
-        task.completed_at = datetime.now()
+        def mark_completed(task):
+            task.status = 'completed'
+            task.completed_at = datetime.now()
+        
+        task = tasks.update(task_id, mark_completed)
+        task.publish('completed', {'processed_files': task.processed_files})
+        task_seconds.observe(time.monotonic() - started_at, lane=task.lane)
         
     except Exception as e:
-        task.status = 'error'
-        task.error_message = str(e)
-        task.completed_at = datetime.now()
+        def mark_failed(task):
+            task.status = 'error'
+            task.error_message = str(e)
+            task.completed_at = datetime.now()
+        
+        task = tasks.update(task_id, mark_failed)
+        task.publish('error', {'error_message': task.error_message})
+
+def file_job_spec(task_folder, file_info, settings):
+    """Tâche de compression d'un fichier, avec ses paramètres propres et son aperçu"""
+    return (str(task_folder), file_info['path'], file_settings(settings, file_info), result_cache, True)
+
+def publish_file_progress(task_id, index, file_info, fraction):
+    """Progression d'un fichier (mise à jour atomique, la tâche a pu être supprimée entre-temps)"""
+    try:
+        progress = record_file_progress(tasks, task_id, index, fraction)
+    except KeyError:
+        return
+    if progress is None:
+        return
+    task, first = progress
+    if first:
+        task.publish('file_started', {'index': index, 'filename': file_info['filename']})
+    task.publish('file_progress', {
+        'index': index,
+        'filename': file_info['filename'],
+        'percent': round(fraction * 100, 1),
+        'task_progress': round(task.progress, 1)
+    })
+
+def compress_batch_file(task_id, index, file_info, queued_at):
+    """
+    Compression d'un fichier de lot ouvert, ordonnancée à sa réception dans la voie de son type
+    (comme un job du mode queue) : un lot sans fichier en cours n'occupe aucun worker.
+    La tâche se termine avec le dernier fichier une fois le lot fermé.
+    """
+    state = {}
+    
+    def mark_started(task):
+        state['started'] = task.status == 'queued'
+        if state['started']:
+            task.status = 'processing'
+    
+    try:
+        task = tasks.update(task_id, mark_started)
+    except KeyError:
+        return
+    queue_wait_seconds.observe(time.monotonic() - queued_at, lane=get_task_lane([file_info]))
+    if state['started']:
+        task.publish('started', {'total_files': task.total_files})
+    
+    task_folder = Path(app.config['COMPRESSED_FOLDER']) / task_id
+    task_folder.mkdir(exist_ok=True)
+    on_progress = lambda _, fraction: publish_file_progress(task_id, index, file_info, fraction)
+    spec = file_job_spec(task_folder, file_info, task.settings)
+    try:
+        for _, job_result, error in run_compression_jobs([spec], 1, on_progress, memory_budget, job_limits, compression_pool):
+            record_job_metrics(get_file_type(file_info['path']), file_info, job_result, error)
+            publish_file_result(task_id, build_file_result(index, file_info, job_result, error))
+    except Exception as e:
+        # Sans résultat pour ce fichier, le lot ne se terminerait jamais
+        publish_file_result(task_id, build_file_result(index, file_info, None, e))
+
+def publish_file_result(task_id, result):
+    """Résultat d'un fichier de lot ; la tâche se termine avec son dernier fichier une fois le lot fermé"""
+    try:
+        task, recorded, completed = record_file_result(tasks, task_id, result, complete=True)
+    except KeyError:
+        return
+    if recorded:
+        task.publish('file_completed', {**result, 'task_progress': round(task.progress, 1)})
+    if completed:
+        task.publish('completed', {'processed_files': task.processed_files})
+
+def enqueue_file(task_id, index, file_info, settings, priority):
+    """Place un fichier dans la file partagée des workers, dans sa propre voie"""
+    task_folder = Path(app.config['COMPRESSED_FOLDER']) / task_id
+    task_folder.mkdir(exist_ok=True)
+    job_queue.enqueue(task_id, get_task_lane([file_info]), {
+        'index': index,
+        'file': file_info,
+        'settings': file_settings(settings, file_info),
+        'output_dir': str(task_folder),
+        'queued_at': time.time()
+    }, priority=priority)
+
+def get_queue_position(task_id):
+    """Position de la tâche dans l'ordonnanceur local ou dans la file partagée"""
+    if job_queue is not None:
+        return job_queue.position(task_id)
+    return scheduler.position(task_id)
+
+def get_file_type(filename):
+    """Famille d'un fichier d'après son extension (image, pdf, video, audio, other)"""
+    return FileCompressor(app.config['COMPRESSED_FOLDER']).file_type(Path(filename))
+
+def get_task_lane(files):
+    """Les tâches contenant de la vidéo ou de l'audio passent par la voie lente"""
+    compressor = FileCompressor(app.config['COMPRESSED_FOLDER'])
+    heavy_extensions = compressor.video_extensions | compressor.audio_extensions
+    if any(Path(f['path']).suffix.lower() in heavy_extensions for f in files):
+        return 'heavy'
+    return 'light'
 
 @app.route('/')
 def index():
@@ -178,29 +343,48 @@ def upload_files():
     if not files or files[0].filename == '':
         return jsonify({'error': 'No files selected'}), 400
     
-    # Créer un ID de tâche unique
-    task_id = str(uuid.uuid4())
+    # Paramètres propres à chaque fichier (liste alignée sur files) ou communs à cet envoi (objet)
+    try:
+        per_file_settings = parse_upload_settings(request.form.get('settings'), len(files))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Ajout à une tâche existante (lot ouvert), ou nouvelle tâche
+    task_id = request.form.get('task_id')
+    if task_id:
+        if task_id not in tasks:
+            return jsonify({'error': 'Invalid task ID'}), 400
+        if not accepts_files(tasks[task_id]):
+            return jsonify({'error': 'Task already processed'}), 400
     uploaded_files = []
     
     try:
         # Sauvegarder les fichiers uploadés
-        for file in files:
+        for file, file_settings_override in zip(files, per_file_settings):
             if file.filename:
                 filename = secure_filename(file.filename)
                 # Ajouter un timestamp pour éviter les collisions
                 unique_filename = f"{int(time.time())}_{filename}"
                 file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(file_path)
+                with stage_seconds.time(stage='upload_write', file_type=get_file_type(filename)):
+                    file.save(file_path)
                 
-                uploaded_files.append({
+                file_info = {
                     'filename': filename,
                     'path': file_path,
                     'size': os.path.getsize(file_path)
-                })
+                }
+                if file_settings_override:
+                    file_info['settings'] = file_settings_override
+                uploaded_files.append(file_info)
         
-        # Créer la tâche
-        task = CompressionTask(task_id, uploaded_files)
-        tasks[task_id] = task
+        if task_id:
+            attach_files(task_id, uploaded_files)
+        else:
+            # Créer la tâche
+            task_id = str(uuid.uuid4())
+            task = CompressionTask(task_id, uploaded_files)
+            task.save()
         
         return jsonify({
             'task_id': task_id,
@@ -211,29 +395,371 @@ def upload_files():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Ouvrir un upload fragmenté et reprenable pour un fichier"""
+    data = request.get_json() or {}
+    filename = secure_filename(data.get('filename', ''))
+    size = data.get('size')
+    task_id = data.get('task_id')
+    
+    if not filename or not isinstance(size, int) or size < 0:
+        return jsonify({'error': 'filename and size are required'}), 400
+    
+    settings = data.get('settings')
+    if settings is not None and not isinstance(settings, dict):
+        return jsonify({'error': 'settings must be an object'}), 400
+    
+    if task_id:
+        if task_id not in tasks:
+            return jsonify({'error': 'Invalid task ID'}), 400
+        if not accepts_files(tasks[task_id]):
+            return jsonify({'error': 'Task already processed'}), 400
+    else:
+        task_id = str(uuid.uuid4())
+        CompressionTask(task_id, []).save()
+    
+    upload_id = str(uuid.uuid4())
+    # Le fichier est écrit directement à son emplacement final
+    unique_filename = f"{int(time.time())}_{upload_id[:8]}_{filename}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    open(file_path, 'wb').close()
+    
+    session = {
+        'task_id': task_id,
+        'filename': filename,
+        'path': file_path,
+        'size': size,
+        'settings': settings,
+        'complete': False
+    }
+    tasks.save_upload(upload_id, session)
+    if size == 0:
+        complete_upload(upload_id, session)
+    
+    return jsonify({
+        'upload_id': upload_id,
+        'task_id': task_id,
+        'offset': 0,
+        'size': size,
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE']
+    })
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'HEAD'])
+def get_upload_offset(upload_id):
+    """Position de reprise d'un upload fragmenté"""
+    session = tasks.load_upload(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    offset = os.path.getsize(session['path'])
+    response = jsonify({
+        'upload_id': upload_id,
+        'task_id': session['task_id'],
+        'offset': offset,
+        'size': session['size'],
+        'complete': session['complete']
+    })
+    response.headers['Upload-Offset'] = str(offset)
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def upload_chunk(upload_id):
+    """
+    Écrire un morceau à la position indiquée par l'en-tête Upload-Offset.
+    Le corps est lu en flux (pas de parsing multipart ni de fichier temporaire)
+    et haché au fil de l'eau ; X-Chunk-SHA256 permet de vérifier le morceau.
+    """
+    session = tasks.load_upload(upload_id)
+    if session is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    raw_offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+    try:
+        offset = int(raw_offset) if raw_offset is not None else None
+    except ValueError:
+        return jsonify({'error': 'Invalid offset'}), 400
+    
+    with open(session['path'], 'r+b') as f:
+        # Verrou sur le fichier partiel (tous processus confondus) : deux envois simultanés du même
+        # morceau ne peuvent pas passer tous deux la vérification de position. Libéré à la fermeture.
+        fcntl.flock(f, fcntl.LOCK_EX)
+        session = tasks.load_upload(upload_id)
+        if session is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        if session['complete']:
+            return jsonify({'error': 'Upload already complete'}), 400
+        
+        current_offset = os.fstat(f.fileno()).st_size
+        if offset is None:
+            offset = current_offset
+        # Reprise : le client doit repartir de ce que le serveur a réellement reçu
+        if offset != current_offset:
+            return jsonify({'error': 'Offset mismatch', 'offset': current_offset}), 409
+        
+        chunk_hash = hashlib.sha256()
+        written = 0
+        write_started = time.perf_counter()
+        f.seek(offset)
+        while True:
+            block = request.stream.read(1024 * 1024)
+            if not block:
+                break
+            if offset + written + len(block) > session['size']:
+                f.truncate(offset)
+                return jsonify({'error': 'Chunk exceeds declared size', 'offset': offset}), 400
+            f.write(block)
+            chunk_hash.update(block)
+            written += len(block)
+        
+        expected_hash = request.headers.get('X-Chunk-SHA256')
+        if expected_hash and expected_hash.lower() != chunk_hash.hexdigest():
+            f.truncate(offset)
+            return jsonify({'error': 'Chunk checksum mismatch', 'offset': offset}), 400
+        f.flush()
+        stage_seconds.observe(
+            time.perf_counter() - write_started, stage='upload_write', file_type=get_file_type(session['filename'])
+        )
+        
+        new_offset = offset + written
+        if new_offset == session['size']:
+            complete_upload(upload_id, session)
+    
+    return jsonify({
+        'upload_id': upload_id,
+        'offset': new_offset,
+        'chunk_sha256': chunk_hash.hexdigest(),
+        'complete': session['complete']
+    })
+
+def complete_upload(upload_id, session):
+    """Rattacher un fichier entièrement reçu à sa tâche"""
+    file_info = {
+        'filename': session['filename'],
+        'path': session['path'],
+        'size': session['size']
+    }
+    if session.get('settings'):
+        file_info['settings'] = session['settings']
+    # Rattaché avant d'être marqué complet : un upload complet est toujours dans task.files
+    attach_files(session['task_id'], [file_info])
+    
+    session['complete'] = True
+    tasks.save_upload(upload_id, session)
+
+def attach_files(task_id, file_infos):
+    """Rattacher des fichiers reçus à leur tâche ; dans un lot ouvert, leur compression démarre aussitôt"""
+    state = {}
+    
+    def attach(task):
+        state['first_index'] = len(task.files)
+        task.files.extend(file_infos)
+        task.total_files = len(task.files)
+        if task.batch_open:
+            task.lane = get_task_lane(task.files)
+            task.last_file_at = datetime.now()
+    
+    # Mise à jour atomique : plusieurs fichiers d'une tâche peuvent se terminer en même temps
+    task = tasks.update(task_id, attach)
+    if not task.batch_open:
+        return
+    
+    for offset, file_info in enumerate(file_infos):
+        index = state['first_index'] + offset
+        task.publish('file_received', {'index': index, 'filename': file_info['filename'], 'total_files': task.total_files})
+        if job_queue is not None:
+            enqueue_file(task_id, index, file_info, task.settings, task.priority)
+            continue
+        # Un job par fichier, dans la voie de son type
+        try:
+            scheduler.submit(
+                f"{task_id}/{index}", get_task_lane([file_info]), compress_batch_file,
+                task_id, index, file_info, time.monotonic(), priority=task.priority
+            )
+        except QueueFullError as e:
+            publish_file_result(task_id, build_file_result(index, file_info, None, e))
+
+def accepts_files(task):
+    """Une tâche reçoit des fichiers tant qu'elle n'est pas lancée, ou tant que son lot est ouvert"""
+    return task.status == 'pending' or task.batch_open
+
+def parse_upload_settings(raw, count):
+    """Paramètres par fichier d'un envoi multipart : liste alignée sur les fichiers, ou objet commun"""
+    if not raw:
+        return [None] * count
+    try:
+        settings = json.loads(raw)
+    except ValueError:
+        raise ValueError('settings must be valid JSON')
+    if isinstance(settings, dict):
+        return [settings] * count
+    if not isinstance(settings, list) or len(settings) != count:
+        raise ValueError('settings must be an object or a list with one entry per file')
+    if any(entry is not None and not isinstance(entry, dict) for entry in settings):
+        raise ValueError('each settings entry must be an object or null')
+    return settings
+
+def parse_priority(data):
+    """Priorité demandée (0 = plus prioritaire, 9 = moins), 5 par défaut"""
+    value = data.get('priority', 5)
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        priority = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('priority must be an integer between 0 and 9')
+    return max(0, min(priority, 9))
+
+def schedule_task(task):
+    """
+    Confie la tâche à l'ordonnanceur local ou, en mode queue, ses fichiers aux workers.
+    Retourne la position dans la file ; QueueFullError si l'ordonnanceur est saturé.
+    """
+    if job_queue is not None:
+        # Mode queue : un job par fichier, traité par les workers (worker.py)
+        for index, file_info in enumerate(task.files):
+            enqueue_file(task.task_id, index, file_info, task.settings, task.priority)
+        return job_queue.position(task.task_id)
+    
+    return scheduler.submit(
+        task.task_id, task.lane, compress_files_async,
+        task.task_id, task.files, task.settings, time.monotonic(),
+        priority=task.priority
+    )
+
 @app.route('/api/compress', methods=['POST'])
 def start_compression():
     """Démarrer la compression"""
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
     task_id = data.get('task_id')
     settings = data.get('settings', {})
     
     if not task_id or task_id not in tasks:
         return jsonify({'error': 'Invalid task ID'}), 400
     
+    if not isinstance(settings, dict):
+        return jsonify({'error': 'settings must be an object'}), 400
+    
     task = tasks[task_id]
     if task.status != 'pending':
         return jsonify({'error': 'Task already processed'}), 400
     
-    # Démarrer la compression en arrière-plan
-    thread = threading.Thread(
-        target=compress_files_async,
-        args=(task_id, task.files, settings)
-    )
-    thread.daemon = True
-    thread.start()
+    if any(not session['complete'] for session in tasks.uploads_for_task(task_id)):
+        return jsonify({'error': 'Uploads still in progress'}), 409
+    
+    if not task.files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    try:
+        priority = parse_priority(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Confier la compression à l'ordonnanceur (0 = plus prioritaire)
+    task.lane = get_task_lane(task.files)
+    task.settings = settings
+    task.priority = priority
+    task.status = 'queued'
+    task.save()
+    try:
+        queue_position = schedule_task(task)
+    except QueueFullError as e:
+        task.status = 'pending'
+        task.save()
+        return jsonify({'error': str(e)}), 503
+    # Un worker libre a pu démarrer la tâche entre-temps
+    if tasks[task_id].status == 'queued':
+        task.publish('queued', {'lane': task.lane, 'queue_position': queue_position})
+    
+    return jsonify({
+        'message': 'Compression started',
+        'task_id': task_id,
+        'lane': task.lane,
+        'queue_position': queue_position
+    })
+
+@app.route('/api/batches', methods=['POST'])
+def create_batch():
+    """
+    Ouvrir un lot : chaque fichier envoyé ensuite (/api/upload ou /api/uploads avec ce task_id)
+    est mis en file dès sa réception, dans la voie de son type et avec ses propres paramètres
+    s'il en a. Le lot se termine après sa fermeture (ou BATCH_IDLE_TIMEOUT sans nouveau fichier).
+    """
+    data = request.get_json() or {}
+    settings = data.get('settings', {})
+    if not isinstance(settings, dict):
+        return jsonify({'error': 'settings must be an object'}), 400
+    try:
+        priority = parse_priority(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if scheduler.draining:
+        return jsonify({'error': "Serveur en cours d'arrêt, réessayez plus tard"}), 503
+    
+    task = CompressionTask(str(uuid.uuid4()), [])
+    task.settings = settings
+    task.priority = priority
+    task.batch_open = True
+    task.status = 'queued'
+    task.save()
+    
+    return jsonify({
+        'task_id': task.task_id,
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE']
+    })
+
+def close_batch_task(task_id, idle_before=None):
+    """
+    Ferme un lot ouvert (avec idle_before, seulement s'il n'a rien reçu depuis).
+    Retourne la tâche, ou None si elle n'avait pas à être fermée.
+    """
+    state = {}
+    
+    def close(task):
+        idle_since = task.last_file_at or task.created_at
+        state['closed'] = task.batch_open and (idle_before is None or idle_since < idle_before)
+        if not state['closed']:
+            return
+        task.batch_open = False
+        # Aucun fichier en cours ne terminera un lot dont tous les fichiers sont déjà traités
+        state['completed'] = task.is_finished() and task.status in ('queued', 'processing')
+        if state['completed']:
+            task.status = 'completed'
+            task.completed_at = datetime.now()
+    
+    task = tasks.update(task_id, close)
+    if not state['closed']:
+        return None
+    task.publish('batch_closed', {'total_files': task.total_files})
+    if state['completed']:
+        task.publish('completed', {'processed_files': task.processed_files})
+    return task
+
+@app.route('/api/batches/<task_id>/close', methods=['POST'])
+def close_batch(task_id):
+    """Fermer un lot : plus aucun fichier ne s'y ajoute, la tâche se termine avec le dernier"""
+    if task_id not in tasks:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    if not tasks[task_id].batch_open:
+        return jsonify({'error': 'Batch already closed'}), 400
+    
+    if any(not session['complete'] for session in tasks.uploads_for_task(task_id)):
+        return jsonify({'error': 'Uploads still in progress'}), 409
     
-    return jsonify({'message': 'Compression started', 'task_id': task_id})
+    task = close_batch_task(task_id)
+    if task is None:
+        # Fermé entre-temps (par un autre appel ou pour inactivité)
+        return jsonify({'error': 'Batch already closed'}), 400
+    return jsonify({
+        'task_id': task_id,
+        'status': task.status,
+        'total_files': task.total_files,
+        'processed_files': task.processed_files
+    })
 
 @app.route('/api/status/<task_id>')
 def get_status(task_id):
@@ -248,12 +774,92 @@ def get_status(task_id):
         'progress': task.progress,
         'processed_files': task.processed_files,
         'total_files': task.total_files,
+        'lane': task.lane,
+        'batch_open': task.batch_open,
+        'queue_position': get_queue_position(task_id) if task.status == 'queued' else None,
         'results': task.results,
         'error_message': task.error_message,
         'created_at': task.created_at.isoformat() if task.created_at else None,
         'completed_at': task.completed_at.isoformat() if task.completed_at else None
     })
 
+@app.route('/api/preview/<task_id>/<int:file_index>')
+def get_preview(task_id, file_index):
+    """
+    Aperçu d'un fichier compressé (vignette d'image, image de la vidéo, première page du PDF),
+    disponible dès la fin du fichier. Il ne change plus : le navigateur le garde en cache.
+    """
+    if task_id not in tasks:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    task = tasks[task_id]
+    result = next((r for r in task.results if r.get('index') == file_index), None)
+    if result is None or not result.get('preview_path'):
+        return jsonify({'error': 'Preview not available'}), 404
+    
+    compressed_folder = Path(app.config['COMPRESSED_FOLDER']).resolve()
+    preview_path = Path(result['preview_path']).resolve()
+    if compressed_folder / task_id not in preview_path.parents or not preview_path.exists():
+        return jsonify({'error': 'Preview not available'}), 404
+    
+    response = send_file(str(preview_path), mimetype='image/jpeg', conditional=True, etag=True,
+                         max_age=app.config['TASK_TTL'])
+    # Fichiers de l'utilisateur : cache du navigateur uniquement
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/events/<task_id>')
+def stream_events(task_id):
+    """
+    Flux Server-Sent Events de la tâche : file d'attente, début/fin de chaque
+    fichier et progression interne. Last-Event-ID permet de reprendre le flux.
+    """
+    if task_id not in tasks:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', request.args.get('last_event_id', 0)))
+    except ValueError:
+        last_id = 0
+    
+    def generate():
+        nonlocal last_id
+        idle_since = time.monotonic()
+        while True:
+            pending = tasks.events_since(task_id, last_id)
+            if not pending:
+                # Réveil immédiat si la tâche tourne dans ce processus,
+                # sinon relecture périodique du stockage partagé
+                with task_events:
+                    task_events.wait(timeout=1)
+                pending = tasks.events_since(task_id, last_id)
+            
+            if not pending:
+                if task_id not in tasks:
+                    return
+                if time.monotonic() - idle_since >= 15:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    idle_since = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+            
+            idle_since = time.monotonic()
+            
+            for event in pending:
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            last_id = pending[-1]['id']
+            
+            if pending[-1]['event'] in ('completed', 'error'):
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/download/<task_id>')
 def download_compressed(task_id):
     """Télécharger les fichiers compressés (ZIP)"""
@@ -265,21 +871,118 @@ def download_compressed(task_id):
         return jsonify({'error': 'Task not completed'}), 400
     
     try:
-        # Créer un ZIP avec tous les fichiers compressés
         task_folder = Path(app.config['COMPRESSED_FOLDER']) / task_id
         zip_path = task_folder.parent / f"{task_id}_compressed.zip"
+        download_name = f"compressed_files_{task_id[:8]}.zip"
+        
+        # Archive déjà construite : servie directement (ETag, Range/reprise)
+        if zip_path.exists():
+            return send_file(
+                str(zip_path),
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True
+            )
+        
+        # Sinon l'archive est diffusée pendant sa construction ;
+        # un seul téléchargement à la fois l'enregistre pour les suivants
+        # (fichiers et dossiers cachés exclus : temporaires, aperçus)
+        entries = [
+            (path, path.relative_to(task_folder).as_posix())
+            for path in sorted(task_folder.rglob('*'))
+            if path.is_file() and not any(part.startswith('.') for part in path.relative_to(task_folder).parts)
+        ]
+        with zip_builds_lock:
+            cache_path = None if task_id in zip_builds else zip_path
+            if cache_path is not None:
+                zip_builds.add(task_id)
         
-        shutil.make_archive(str(zip_path.with_suffix('')), 'zip', str(task_folder))
+        def generate():
+            started = time.perf_counter()
+            try:
+                yield from stream_zip(entries, cache_path)
+            finally:
+                zip_seconds.observe(time.perf_counter() - started, mode='build' if cache_path else 'stream')
+                if cache_path is not None:
+                    with zip_builds_lock:
+                        zip_builds.discard(task_id)
         
-        return send_file(
-            str(zip_path),
-            as_attachment=True,
-            download_name=f"compressed_files_{task_id[:8]}.zip"
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{download_name}"',
+                'X-Accel-Buffering': 'no'
+            }
         )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/download/<task_id>/<int:file_index>')
+def download_file(task_id, file_index):
+    """
+    Télécharger un seul fichier compressé, dès qu'il est prêt.
+    Le transfert est délégué au proxy (X-Accel-Redirect / X-Sendfile) quand il est
+    configuré, sinon à sendfile via wsgi.file_wrapper, avec ETag, Last-Modified et Range.
+    """
+    if task_id not in tasks:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    task = tasks[task_id]
+    result = next((r for r in task.results if r.get('index') == file_index), None)
+    if result is None or result['status'] != 'success':
+        return jsonify({'error': 'File not available'}), 404
+    
+    compressed_folder = Path(app.config['COMPRESSED_FOLDER']).resolve()
+    output_path = Path(result['output_path']).resolve()
+    if compressed_folder / task_id not in output_path.parents or not output_path.exists():
+        return jsonify({'error': 'File not available'}), 404
+    
+    download_name = f"{Path(result['filename']).stem}_compressed{output_path.suffix}"
+    
+    if app.config['X_ACCEL_REDIRECT_PREFIX']:
+        # nginx sert le fichier lui-même (zero-copy, Range, ETag)
+        response = Response(status=200)
+        relative_path = output_path.relative_to(compressed_folder).as_posix()
+        response.headers['X-Accel-Redirect'] = f"{app.config['X_ACCEL_REDIRECT_PREFIX'].rstrip('/')}/{relative_path}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{secure_filename(download_name)}"'
+        return response
+    
+    return send_file(
+        str(output_path),
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True
+    )
+
+def delete_task_files(task):
+    """Supprimer les fichiers d'une tâche (uploads, sorties, archive ZIP)"""
+    # Retirer les fichiers encore en attente dans la file des workers
+    if job_queue is not None:
+        job_queue.cancel_task(task.task_id)
+    
+    # Supprimer les fichiers uploadés
+    for file_info in task.files:
+        if os.path.exists(file_info['path']):
+            os.remove(file_info['path'])
+    
+    # Supprimer les uploads fragmentés rattachés à la tâche
+    for session in tasks.uploads_for_task(task.task_id):
+        if os.path.exists(session['path']):
+            os.remove(session['path'])
+    
+    # Supprimer le dossier de sortie
+    task_folder = Path(app.config['COMPRESSED_FOLDER']) / task.task_id
+    if task_folder.exists():
+        shutil.rmtree(task_folder)
+    
+    # Supprimer le ZIP s'il existe
+    zip_path = task_folder.parent / f"{task.task_id}_compressed.zip"
+    if zip_path.exists():
+        zip_path.unlink()
+
 @app.route('/api/cleanup/<task_id>', methods=['DELETE'])
 def cleanup_task(task_id):
     """Nettoyer les fichiers d'une tâche"""
@@ -287,24 +990,9 @@ def cleanup_task(task_id):
         return jsonify({'error': 'Task not found'}), 404
     
     try:
-        task = tasks[task_id]
-        
-        # Supprimer les fichiers uploadés
-        for file_info in task.files:
-            if os.path.exists(file_info['path']):
-                os.remove(file_info['path'])
-        
-        # Supprimer le dossier de sortie
-        task_folder = Path(app.config['COMPRESSED_FOLDER']) / task_id
-        if task_folder.exists():
-            shutil.rmtree(task_folder)
-        
-        # Supprimer le ZIP s'il existe
-        zip_path = task_folder.parent / f"{task_id}_compressed.zip"
-        if zip_path.exists():
-            zip_path.unlink()
+        delete_task_files(tasks[task_id])
         
-        # Supprimer la tâche de la mémoire
+        # Supprimer la tâche du stockage
         del tasks[task_id]
         
         return jsonify({'message': 'Task cleaned up successfully'})
@@ -312,15 +1000,172 @@ def cleanup_task(task_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def disk_usage_ratio():
+    """Occupation la plus forte des volumes d'uploads et de sorties"""
+    ratios = []
+    for folder in (app.config['UPLOAD_FOLDER'], app.config['COMPRESSED_FOLDER']):
+        usage = shutil.disk_usage(folder)
+        ratios.append(usage.used / usage.total if usage.total else 0)
+    return max(ratios)
+
+def reap_tasks():
+    """
+    Expire les tâches terminées (ou abandonnées) au-delà de TASK_TTL, puis, si le
+    disque dépasse DISK_HIGH_WATERMARK, supprime les plus anciennes jusqu'à
+    repasser sous DISK_LOW_WATERMARK. Les tâches en cours ne sont pas touchées.
+    """
+    now = datetime.now()
+    ttl = app.config['TASK_TTL']
+    removable = sorted(tasks.values(), key=lambda task: task.completed_at or task.created_at)
+    
+    # Au-delà du seuil haut, on libère de la place jusqu'au seuil bas
+    reclaiming = disk_usage_ratio() > app.config['DISK_HIGH_WATERMARK']
+    
+    reaped = 0
+    for task in removable:
+        age = (now - (task.completed_at or task.created_at)).total_seconds()
+        if task.status in ('queued', 'processing'):
+            # Seules les tâches orphelines (processus arrêté en cours de route) expirent
+            if age < 2 * ttl:
+                continue
+        else:
+            if reclaiming and disk_usage_ratio() <= app.config['DISK_LOW_WATERMARK']:
+                reclaiming = False
+            if age < ttl and not reclaiming:
+                continue
+        try:
+            delete_task_files(task)
+            del tasks[task.task_id]
+            reaped += 1
+        except Exception as e:
+            print(f"Erreur lors du nettoyage de la tâche {task.task_id}: {e}")
+    return reaped
+
+def close_idle_batches():
+    """Ferme les lots ouverts qui n'ont reçu aucun fichier depuis BATCH_IDLE_TIMEOUT"""
+    timeout = app.config['BATCH_IDLE_TIMEOUT']
+    if not timeout:
+        return 0
+    idle_before = datetime.now() - timedelta(seconds=timeout)
+    
+    closed = 0
+    for task in tasks.values():
+        if not task.batch_open or (task.last_file_at or task.created_at) >= idle_before:
+            continue
+        # Un upload fragmenté en cours compte comme de l'activité
+        if any(not session['complete'] for session in tasks.uploads_for_task(task.task_id)):
+            continue
+        try:
+            if close_batch_task(task.task_id, idle_before) is not None:
+                print(f"Lot inactif fermé: {task.task_id}")
+                closed += 1
+        except KeyError:
+            continue
+    return closed
+
+def reaper_loop():
+    """Nettoyage périodique en arrière-plan"""
+    while True:
+        time.sleep(app.config['REAPER_INTERVAL'])
+        try:
+            close_idle_batches()
+            reap_tasks()
+        except Exception as e:
+            print(f"Erreur du nettoyage automatique: {e}")
+
+reaper_thread = threading.Thread(target=reaper_loop, name='task-reaper')
+reaper_thread.daemon = True
+reaper_thread.start()
+
+def drain(timeout=None):
+    """
+    Arrêt propre du processus : attend la fin des compressions en cours (au plus
+    timeout secondes) et signale en erreur les tâches qui n'ont pas pu aboutir
+    """
+    # Les fichiers de lot sont ordonnancés sous l'identifiant "tâche/index"
+    for task_id in dict.fromkeys(job_id.split('/')[0] for job_id in scheduler.shutdown(timeout)):
+        task = tasks.get(task_id)
+        if task is None:
+            continue
+        task.status = 'error'
+        task.error_message = "Serveur arrêté avant la fin de la compression, relancez la tâche"
+        task.completed_at = datetime.now()
+        task.save()
+        task.publish('error', {'error_message': task.error_message})
+    if compression_pool is not None:
+        compression_pool.shutdown(wait=False)
+
+@app.route('/healthz')
+def liveness():
+    """Le processus répond (sonde de vivacité)"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz')
+def readiness():
+    """
+    Sonde de disponibilité : stockage des tâches joignable, file d'attente non
+    saturée et processus non en cours d'arrêt. Détaille l'occupation de chaque voie.
+    """
+    try:
+        task_store_ok = tasks.ping()
+    except Exception as e:
+        print(f"Stockage des tâches injoignable: {e}")
+        task_store_ok = False
+    
+    lanes = scheduler.stats()
+    for stats in lanes.values():
+        stats['saturation'] = stats['running'] / stats['workers'] if stats['workers'] else 1.0
+    queued = sum(stats['queued'] for stats in lanes.values())
+    queue_full = queued >= scheduler.max_queued
+    
+    ready = task_store_ok and not queue_full and not scheduler.draining
+    status = {
+        'ready': ready,
+        'pid': os.getpid(),
+        'execution_mode': app.config['EXECUTION_MODE'],
+        'task_store': task_store_ok,
+        'draining': scheduler.draining,
+        'queued': queued,
+        'max_queued': scheduler.max_queued,
+        'queue_full': queue_full,
+        'lanes': lanes,
+        'memory_budget': memory_budget.stats(),
+        'disk_usage': round(disk_usage_ratio(), 3)
+    }
+    
+    if job_queue is not None:
+        # Les compressions tournent dans les workers : la file partagée doit être joignable
+        try:
+            status['job_queue'] = job_queue.stats()
+        except Exception as e:
+            print(f"File des workers injoignable: {e}")
+            status['job_queue'] = None
+            status['ready'] = False
+    
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Statistiques du cache de résultats"""
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+@app.route('/metrics')
+def get_metrics():
+    """Métriques au format texte de Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/api/supported-formats')
 def get_supported_formats():
-    """Retourner les formats supportés"""
-    return jsonify({
-        'images': ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.heic', '.heif'],
-        'videos': ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'],
-        'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'],
-        'documents': ['.pdf']
-    })
+    """Formats supportés par les backends disponibles, et état de chaque backend"""
+    return jsonify(supported_formats())
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Serveur de développement uniquement ; en production : gunicorn -c gunicorn.conf.py
+    app.run(
+        debug=os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes'),
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000))
+    )
\ No newline at end of file
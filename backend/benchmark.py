@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai des chemins de compression (images, PDF, vidéo, audio)
+Génère ses propres fichiers de test, mesure temps, débit, mémoire crête et taux
+de compression, puis écrit les résultats en JSON pour comparer les versions.
+
+Exemples:
+    python benchmark.py -o bench.json
+    python benchmark.py --quick --filter image
+    python benchmark.py --baseline bench-1.0.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from file_compressor import ENGINE_VERSION, FileCompressor, find_ffmpeg_tool
+
+
+# Fichiers générés : nom -> (fonction de génération, inclus en mode --quick)
+FIXTURES: Dict[str, tuple] = {}
+
+# Scénarios mesurés : (nom, fichier, réglages, inclus en mode --quick)
+SCENARIOS = [
+    ("image-jpeg-12mp-keep", "photo_12mp.jpg", {}, True),
+    ("image-jpeg-12mp-auto", "photo_12mp.jpg", {'output_format': 'auto'}, False),
+    ("image-jpeg-12mp-target-300k", "photo_12mp.jpg", {'target_size_kb': 300}, True),
+    ("image-jpeg-48mp-keep", "photo_48mp.jpg", {}, False),
+    ("image-png-screenshot-keep", "screenshot.png", {}, True),
+    ("image-png-screenshot-auto", "screenshot.png", {'output_format': 'auto'}, True),
+    ("image-png-rgba-auto", "logo_rgba.png", {'output_format': 'auto'}, True),
+    ("image-heic-keep", "photo.heic", {}, False),
+    ("pdf-scan-10-pages", "scan_10_pages.pdf", {}, True),
+    ("video-h264-bitrate", "clip_1080p.mp4", {'video_codec': 'h264', 'video_mode': 'bitrate'}, True),
+    ("video-h264-crf", "clip_1080p.mp4", {'video_codec': 'h264', 'video_mode': 'crf'}, False),
+    ("video-h265-crf", "clip_1080p.mp4", {'video_codec': 'h265', 'video_mode': 'crf'}, False),
+    ("video-vp9-crf", "clip_1080p.mp4", {'video_codec': 'vp9', 'video_mode': 'crf'}, False),
+    ("audio-wav-mp3", "podcast.wav", {'audio_format': 'mp3'}, True),
+    ("audio-wav-aac", "podcast.wav", {'audio_format': 'aac'}, False),
+    ("audio-flac-opus", "music.flac", {'audio_format': 'opus'}, True),
+]
+
+
+def fixture(name: str, quick: bool = True) -> Callable:
+    """Enregistre une fonction qui génère le fichier de test `name`"""
+    def register(generate: Callable[[Path], None]) -> Callable:
+        FIXTURES[name] = (generate, quick)
+        return generate
+    return register
+
+
+def _photo(size):
+    """Image RGB au contenu de type photo (dégradés + bruit), sans dépendance supplémentaire"""
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize(size)
+    radial = Image.radial_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 40)
+    return Image.merge('RGB', (gradient, radial, Image.blend(noise, gradient.transpose(Image.Transpose.ROTATE_180), 0.5)))
+
+
+@fixture("photo_12mp.jpg")
+def _make_photo_12mp(path: Path) -> None:
+    _photo((4000, 3000)).save(path, 'JPEG', quality=95)
+
+
+@fixture("photo_48mp.jpg", quick=False)
+def _make_photo_48mp(path: Path) -> None:
+    _photo((8000, 6000)).save(path, 'JPEG', quality=95)
+
+
+@fixture("photo.heic", quick=False)
+def _make_photo_heic(path: Path) -> None:
+    _photo((3000, 2000)).save(path, 'HEIF', quality=90)
+
+
+@fixture("screenshot.png")
+def _make_screenshot(path: Path) -> None:
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (1920, 1080), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1920, 60), fill=(40, 44, 52))
+    for line in range(40):
+        draw.text((40, 90 + line * 24), f"{line:03d} Lorem ipsum dolor sit amet, consectetur adipiscing elit " * 2, fill=(30, 30, 30))
+    draw.rectangle((1200, 200, 1800, 700), fill=(30, 120, 220))
+    image.save(path, 'PNG')
+
+
+@fixture("logo_rgba.png")
+def _make_logo(path: Path) -> None:
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGBA', (2000, 2000), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((200, 200, 1800, 1800), fill=(220, 40, 40, 255))
+    draw.ellipse((600, 600, 1400, 1400), fill=(255, 255, 255, 160))
+    image.save(path, 'PNG')
+
+
+@fixture("scan_10_pages.pdf")
+def _make_scan_pdf(path: Path) -> None:
+    pages = [_photo((2480, 3508)) for _ in range(10)]  # A4 à 300 dpi
+    pages[0].save(path, 'PDF', save_all=True, append_images=pages[1:], resolution=300, quality=92)
+
+
+def _ffmpeg(args: List[str]) -> None:
+    subprocess.run([find_ffmpeg_tool("ffmpeg"), "-hide_banner", "-loglevel", "error", "-y"] + args, check=True)
+
+
+@fixture("clip_1080p.mp4")
+def _make_clip(path: Path) -> None:
+    _ffmpeg([
+        "-f", "lavfi", "-i", "testsrc2=size=1920x1080:rate=30:duration=10",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=10:sample_rate=48000",
+        "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "8M",
+        "-c:a", "aac", "-b:a", "320k", "-shortest", str(path)
+    ])
+
+
+@fixture("podcast.wav")
+def _make_podcast(path: Path) -> None:
+    _ffmpeg(["-f", "lavfi", "-i", "sine=frequency=220:duration=300:sample_rate=48000", "-ac", "2", str(path)])
+
+
+@fixture("music.flac")
+def _make_music(path: Path) -> None:
+    _ffmpeg(["-f", "lavfi", "-i", "anoisesrc=duration=120:sample_rate=96000:amplitude=0.3", "-ac", "2", str(path)])
+
+
+def generate_fixtures(fixtures_dir: Path, names: List[str]) -> None:
+    """Génère les fichiers de test manquants (réutilisés d'une exécution à l'autre)"""
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        path = fixtures_dir / name
+        if path.exists():
+            continue
+        print(f"Génération de {name}...")
+        generate, _ = FIXTURES[name]
+        temp_path = path.with_name(f".{name}.tmp{path.suffix}")
+        generate(temp_path)
+        os.replace(temp_path, path)
+
+
+def _peak_rss_mb() -> float:
+    """
+    Mémoire crête du processus courant. VmHWM est remis à zéro par exec(), contrairement
+    à ru_maxrss qui hérite de la crête du processus parent au moment du fork.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_case(input_path: str, settings: dict, output_dir: str) -> dict:
+    """Exécuté dans un processus neuf : la mémoire crête mesurée est celle du seul scénario"""
+    compressor = FileCompressor(output_dir)
+    file_path = Path(input_path)
+    params = compressor.build_compression_params(file_path, settings)
+
+    start = time.perf_counter()
+    output_path = compressor.compress_file(file_path, **params)
+    wall_time = time.perf_counter() - start
+
+    # ru_maxrss est en Ko sous Linux ; RUSAGE_CHILDREN couvre ffmpeg/ffprobe
+    return {
+        'wall_time': wall_time,
+        'output_bytes': output_path.stat().st_size if output_path else None,
+        'action': (compressor.decision or {}).get('action'),
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_child_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }
+
+
+def run_scenario(name: str, input_path: Path, settings: dict, repeat: int) -> dict:
+    """Mesure un scénario `repeat` fois et agrège les résultats"""
+    runs = []
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix="bench-out-")
+        try:
+            # Processus « spawn » : aucune mémoire héritée du banc d'essai lui-même
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                runs.append(executor.submit(_run_case, str(input_path), settings, output_dir).result())
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    input_bytes = input_path.stat().st_size
+    wall_time = statistics.median(run['wall_time'] for run in runs)
+    output_bytes = runs[-1]['output_bytes']
+    return {
+        'name': name,
+        'fixture': input_path.name,
+        'settings': settings,
+        'action': runs[-1]['action'],
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'compression_ratio': (1 - output_bytes / input_bytes) * 100 if output_bytes else None,
+        'wall_time': wall_time,
+        'wall_times': [run['wall_time'] for run in runs],
+        'throughput_mb_s': input_bytes / 1024 ** 2 / wall_time if wall_time > 0 else None,
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'peak_child_rss_mb': max(run['peak_child_rss_mb'] for run in runs)
+    }
+
+
+def environment_info() -> dict:
+    """Contexte de l'exécution, pour ne comparer que des mesures comparables"""
+    try:
+        ffmpeg_version = subprocess.run(
+            [find_ffmpeg_tool("ffmpeg"), "-version"], capture_output=True, text=True
+        ).stdout.splitlines()[0]
+    except Exception:
+        ffmpeg_version = None
+    return {
+        'engine_version': ENGINE_VERSION,
+        'date': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': ffmpeg_version
+    }
+
+
+def print_comparison(results: List[dict], baseline_path: Path) -> None:
+    """Écarts de temps, de mémoire et de taille par rapport à une exécution précédente"""
+    with open(baseline_path) as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+
+    print(f"\nComparaison avec {baseline_path}:")
+    for result in results:
+        previous = baseline.get(result['name'])
+        if previous is None:
+            continue
+        time_delta = (result['wall_time'] / previous['wall_time'] - 1) * 100
+        rss_delta = (result['peak_rss_mb'] / previous['peak_rss_mb'] - 1) * 100
+        size_delta = 0.0
+        if result['output_bytes'] and previous['output_bytes']:
+            size_delta = (result['output_bytes'] / previous['output_bytes'] - 1) * 100
+        print(f"  {result['name']:<32} temps {time_delta:+6.1f}%  mémoire {rss_delta:+6.1f}%  taille {size_delta:+6.1f}%")
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Banc d'essai du compresseur de fichiers")
+    parser.add_argument("-o", "--output", help="Fichier JSON de résultats (défaut: benchmark-<date>.json)")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "compressor-bench-fixtures"),
+                        help="Répertoire des fichiers de test générés (conservés entre deux exécutions)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Nombre de mesures par scénario (défaut: 3)")
+    parser.add_argument("-k", "--filter", help="Ne lancer que les scénarios dont le nom contient ce texte")
+    parser.add_argument("--quick", action="store_true", help="Scénarios rapides uniquement (petits fichiers)")
+    parser.add_argument("--baseline", help="Résultats JSON d'une exécution précédente à comparer")
+
+    args = parser.parse_args()
+
+    scenarios = [
+        (name, fixture_name, settings)
+        for name, fixture_name, settings, quick in SCENARIOS
+        if (not args.quick or quick) and (not args.filter or args.filter in name)
+    ]
+    if not scenarios:
+        print("Aucun scénario sélectionné.")
+        sys.exit(1)
+
+    fixtures_dir = Path(args.fixtures_dir)
+    generate_fixtures(fixtures_dir, sorted({fixture_name for _, fixture_name, _ in scenarios}))
+
+    results = []
+    for name, fixture_name, settings in scenarios:
+        result = run_scenario(name, fixtures_dir / fixture_name, settings, max(1, args.repeat))
+        results.append(result)
+        ratio = f"{result['compression_ratio']:.1f}%" if result['compression_ratio'] is not None else "échec"
+        print(
+            f"{name:<32} {result['wall_time']:7.2f}s  {result['throughput_mb_s'] or 0:7.1f} Mo/s  "
+            f"RSS {result['peak_rss_mb']:6.0f} Mo (ffmpeg {result['peak_child_rss_mb']:4.0f} Mo)  réduction {ratio}"
+        )
+
+    output_path = Path(args.output or f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, 'w') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+    print(f"\nRésultats enregistrés dans: {output_path}")
+
+    if args.baseline:
+        print_comparison(results, Path(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
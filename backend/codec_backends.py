@@ -0,0 +1,138 @@
+# backend/codec_backends.py
+"""
+Registre des backends de compression (Pillow, pillow-heif, PyPDF2, FFmpeg...)
+Les bibliothèques ne sont importées qu'à la première utilisation d'un format :
+un backend absent ne désactive que ses propres formats.
+"""
+
+import importlib
+import importlib.util
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class BackendUnavailableError(RuntimeError):
+    """La bibliothèque ou l'outil nécessaire à ce format n'est pas installé"""
+
+
+class CodecBackend:
+    """
+    Backend d'une ou plusieurs familles de fichiers.
+    formats : {'image': {'.jpg', ...}, ...}
+    modules : modules Python requis (vérifiés sans être importés)
+    tools : exécutables requis, cherchés avec find_tool
+    setup : appelé une seule fois au premier chargement (enregistrement de plugins...)
+    """
+
+    def __init__(self, name: str, formats: Dict[str, set], modules: Sequence[str] = (),
+                 tools: Sequence[str] = (), find_tool: Callable[[str], Optional[str]] = shutil.which,
+                 setup: Optional[Callable[[], None]] = None, install_hint: str = ""):
+        self.name = name
+        self.formats = {file_type: set(extensions) for file_type, extensions in formats.items()}
+        self.modules = tuple(modules)
+        self.tools = tuple(tools)
+        self.find_tool = find_tool
+        self.setup = setup
+        self.install_hint = install_hint
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def extensions(self) -> set:
+        return set().union(*self.formats.values())
+
+    def _tool_found(self, tool: str) -> bool:
+        try:
+            return bool(self.find_tool(tool))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _module_found(module: str) -> bool:
+        try:
+            return importlib.util.find_spec(module) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def missing(self) -> List[str]:
+        """Dépendances absentes (modules introuvables, exécutables hors du PATH)"""
+        missing = [module for module in self.modules if not self._module_found(module)]
+        missing += [tool for tool in self.tools if not self._tool_found(tool)]
+        return missing
+
+    def available(self) -> bool:
+        return self._loaded or not self.missing()
+
+    def load(self) -> "CodecBackend":
+        """Importe les modules et exécute setup au premier appel"""
+        if self._loaded:
+            return self
+        with self._lock:
+            if self._loaded:
+                return self
+            missing = self.missing()
+            if missing:
+                hint = f" ({self.install_hint})" if self.install_hint else ""
+                raise BackendUnavailableError(
+                    f"Backend {self.name} indisponible, manquant: {', '.join(missing)}{hint}"
+                )
+            try:
+                for module in self.modules:
+                    importlib.import_module(module)
+                if self.setup is not None:
+                    self.setup()
+            except ImportError as e:
+                raise BackendUnavailableError(f"Backend {self.name} indisponible: {e}") from e
+            self._loaded = True
+        return self
+
+    def report(self) -> dict:
+        """État du backend pour /api/supported-formats"""
+        missing = [] if self._loaded else self.missing()
+        return {
+            'name': self.name,
+            'available': not missing,
+            'missing': missing,
+            'formats': {file_type: sorted(extensions) for file_type, extensions in self.formats.items()}
+        }
+
+
+# Backends enregistrés, dans l'ordre de priorité (le premier déclarant une extension la traite)
+BACKENDS: Dict[str, CodecBackend] = {}
+
+
+def register_backend(backend: CodecBackend) -> CodecBackend:
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str) -> CodecBackend:
+    return BACKENDS[name]
+
+
+def load_backend(name: str) -> CodecBackend:
+    """Charge un backend par son nom (BackendUnavailableError s'il manque une dépendance)"""
+    return BACKENDS[name].load()
+
+
+def backend_for(extension: str) -> Optional[CodecBackend]:
+    """Backend qui traite une extension ('.jpg'), None si elle n'est pas prise en charge"""
+    extension = extension.lower()
+    for backend in BACKENDS.values():
+        if extension in backend.extensions:
+            return backend
+    return None
+
+
+def file_type_for(extension: str) -> Optional[str]:
+    """Famille (image, pdf, video, audio) d'une extension"""
+    backend = backend_for(extension)
+    if backend is None:
+        return None
+    return next(file_type for file_type, extensions in backend.formats.items() if extension.lower() in extensions)
+
+
+def extensions_for(file_type: str) -> set:
+    """Toutes les extensions déclarées pour une famille, que leur backend soit disponible ou non"""
+    return set().union(*(backend.formats.get(file_type, set()) for backend in BACKENDS.values()))
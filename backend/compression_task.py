@@ -0,0 +1,179 @@
+# backend/compression_task.py
+"""
+Tâche de compression et enregistrement des résultats de ses fichiers
+Partagé par l'application web (ordonnanceur local) et les workers de la file (worker.py)
+"""
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+class CompressionTask:
+    def __init__(self, task_id, files):
+        self.task_id = task_id
+        self.files = files
+        self.status = 'pending'
+        self.progress = 0
+        self.total_files = len(files)
+        self.processed_files = 0
+        self.results = []
+        self.lane = None
+        self.error_message = None
+        self.created_at = datetime.now()
+        self.completed_at = None
+        self.file_progress = {}  # index du fichier -> progression interne (0-1)
+        self.settings = None  # Paramètres communs, complétés par ceux de chaque fichier
+        self.priority = 5  # 0 = plus prioritaire
+        self.batch_open = False  # Lot ouvert : des fichiers peuvent encore s'ajouter pendant la compression
+        self.last_file_at = None  # Réception du dernier fichier d'un lot ouvert
+
+    def to_dict(self):
+        """Représentation sérialisable pour le stockage des tâches"""
+        return {
+            'task_id': self.task_id,
+            'files': self.files,
+            'status': self.status,
+            'progress': self.progress,
+            'total_files': self.total_files,
+            'processed_files': self.processed_files,
+            'results': self.results,
+            'lane': self.lane,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'file_progress': {str(index): fraction for index, fraction in self.file_progress.items()},
+            'settings': self.settings,
+            'priority': self.priority,
+            'batch_open': self.batch_open,
+            'last_file_at': self.last_file_at.isoformat() if self.last_file_at else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        task = cls(data['task_id'], data['files'])
+        task.status = data['status']
+        task.progress = data['progress']
+        task.total_files = data['total_files']
+        task.processed_files = data['processed_files']
+        task.results = data['results']
+        task.lane = data.get('lane')
+        task.error_message = data.get('error_message')
+        task.created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else None
+        task.completed_at = datetime.fromisoformat(data['completed_at']) if data.get('completed_at') else None
+        task.file_progress = {int(index): fraction for index, fraction in data.get('file_progress', {}).items()}
+        task.settings = data.get('settings')
+        task.priority = data.get('priority', 5)
+        task.batch_open = data.get('batch_open', False)
+        task.last_file_at = datetime.fromisoformat(data['last_file_at']) if data.get('last_file_at') else None
+        return task
+
+    def update_progress(self):
+        """Progression globale, en tenant compte de l'avancement des fichiers en cours"""
+        in_flight = sum(self.file_progress.values())
+        self.progress = (self.processed_files + in_flight) / self.total_files * 100 if self.total_files else 100
+
+    def has_result(self, index):
+        return any(r.get('index') == index for r in self.results)
+
+    def add_result(self, result):
+        """
+        Enregistre le résultat d'un fichier. Sans effet si ce fichier a déjà un résultat
+        (job repris par un autre worker) : retourne alors False.
+        """
+        if self.has_result(result['index']):
+            return False
+        self.results.append(result)
+        self.processed_files += 1
+        self.file_progress.pop(result['index'], None)
+        self.update_progress()
+        return True
+
+    def is_finished(self):
+        """Tous les fichiers ont un résultat et aucun ne peut plus s'ajouter"""
+        return not self.batch_open and self.processed_files >= self.total_files
+
+
+def file_settings(settings: Optional[dict], file_info: dict) -> dict:
+    """Paramètres effectifs d'un fichier : ceux de la tâche, surchargés par les siens"""
+    return {**(settings or {}), **file_info.get('settings', {})}
+
+
+def record_file_result(tasks, task_id: str, result: dict, complete: bool = False):
+    """
+    Ajoute le résultat d'un fichier de façon atomique (une seule fois par fichier).
+    Avec complete=True, la tâche est terminée avec son dernier fichier.
+    Retourne (tâche, résultat ajouté, tâche terminée) ; KeyError si la tâche a été supprimée.
+    """
+    state = {}
+
+    def record(task):
+        state['recorded'] = task.add_result(result)
+        state['completed'] = complete and task.is_finished() and task.status not in ('completed', 'error')
+        if state['completed']:
+            task.status = 'completed'
+            task.completed_at = datetime.now()
+
+    task = tasks.update(task_id, record)
+    return task, state['recorded'], state['completed']
+
+
+def record_file_progress(tasks, task_id: str, index: int, fraction: float):
+    """
+    Met à jour la progression d'un fichier de façon atomique.
+    Retourne (tâche, premier message du fichier), ou None si le fichier a déjà son résultat.
+    """
+    state = {}
+
+    def set_progress(task):
+        # Une progression peut arriver après le résultat du fichier
+        state['done'] = task.has_result(index)
+        if state['done']:
+            return
+        state['first'] = index not in task.file_progress
+        task.file_progress[index] = fraction
+        task.update_progress()
+
+    task = tasks.update(task_id, set_progress)
+    if state['done']:
+        return None
+    return task, state['first']
+
+
+def build_file_result(index: int, file_info: dict, job_result: Optional[dict], error: Optional[Exception]) -> dict:
+    """Résultat publié pour un fichier, à partir du retour de compress_file_job ou de son erreur"""
+    if error is not None:
+        return {
+            'index': index,
+            'filename': file_info['filename'],
+            'status': 'error',
+            'error': str(error)
+        }
+
+    if job_result['output_path'] and Path(job_result['output_path']).exists():
+        output_path = Path(job_result['output_path'])
+        original_size = os.path.getsize(file_info['path'])
+        compressed_size = os.path.getsize(output_path)
+        compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+
+        return {
+            'index': index,
+            'filename': file_info['filename'],
+            'original_size': original_size,
+            'compressed_size': compressed_size,
+            'compression_ratio': compression_ratio,
+            'output_path': str(output_path),
+            # Décision de l'analyse préalable : compress, cached, copy ou skip (avec sa raison)
+            'action': job_result['action'],
+            'reason': job_result['reason'],
+            'preview_path': job_result.get('preview_path'),
+            'status': 'success'
+        }
+
+    return {
+        'index': index,
+        'filename': file_info['filename'],
+        'status': 'error',
+        'error': 'Compression failed'
+    }
@@ -7,38 +7,869 @@ Supporte: PDF, Images (JPEG, PNG, WebP), Vidéos (MP4, AVI, MOV), Audio (MP3, WA
 import os
 import sys
 import argparse
+import hashlib
+import io
+import json
+import subprocess
+import tempfile
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Callable, Tuple, Optional, Iterator, List
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import collections
+import itertools
+import multiprocessing
+import resource
+import signal
 import shutil
+import threading
+import time
 
-# Importation des bibliothèques (à installer avec pip)
-try:
-    from PIL import Image, ImageOps
-    from PyPDF2 import PdfReader, PdfWriter
-    import moviepy.editor as mp
-    from pydub import AudioSegment
+from result_cache import ResultCache
+from manifest import MANIFEST_NAME, CompressionManifest, settings_digest, source_snapshot
+from codec_backends import (
+    BACKENDS, CodecBackend, backend_for, extensions_for, file_type_for,
+    get_backend, load_backend, register_backend
+)
+
+# Pillow, PyPDF2, pillow-heif et numpy sont importés à la première utilisation
+# (voir les backends enregistrés plus bas) : démarrage rapide, formats indépendants
+
+# Version du moteur de compression : à incrémenter quand une sortie change,
+# pour invalider les résultats déjà en cache
+ENGINE_VERSION = "7"
+
+# Réduction entière (Image.reduce) avant le rééchantillonnage final tant que l'écart
+# dépasse ce facteur : 3.0 donne un résultat indiscernable d'un LANCZOS complet
+IMAGE_REDUCING_GAP = 3.0
+
+# Recherche de qualité (taille ou SSIM cible) : bornes de qualité et taille du plan comparé
+IMAGE_MIN_QUALITY = 20
+SSIM_MAX_SIDE = 512
+
+# Formats de sortie des images : format Pillow et extension
+IMAGE_OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'webp': ('WebP', '.webp'),
+    'avif': ('AVIF', '.avif'),
+    'png': ('PNG', '.png'),
+    'png-quantized': ('PNG', '.png')
+}
+# Politique 'keep' : format d'origine quand on sait l'écrire, JPEG sinon
+IMAGE_KEEP_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png', '.webp': 'webp', '.avif': 'avif'}
+# Politique 'auto' : similarité minimale d'un candidat (si target_ssim n'est pas fourni)
+IMAGE_AUTO_MIN_SSIM = 0.95
+
+# Au-delà de ce nombre de couleurs, l'image est une photo : PNG n'est pas essayé
+IMAGE_GRAPHIC_MAX_COLORS = 4096
+
+# Garde-fou contre les bombes de décompression : au-delà, l'image est refusée sans être décodée
+# (Pillow se contente par défaut d'un avertissement jusqu'à 2 x 89 Mpx)
+IMAGE_MAX_PIXELS = 100_000_000
+
+# Estimation de la mémoire d'un fichier (estimate_job_memory), en octets
+JOB_BASE_MEMORY = 64 * 1024 * 1024
+FFMPEG_BASE_MEMORY = 128 * 1024 * 1024
+VIDEO_BUFFERED_FRAMES = 80  # Images décodées en mémoire par ffmpeg (lookahead, threads)
+
+# Threads de chaque ffmpeg (décodage, filtres, encodage), 0 = automatique (tous les cœurs).
+# Fixé dans les processus d'un CompressionPool à leur part des cœurs.
+FFMPEG_MAX_THREADS = 0
+
+# Aperçus (vignettes) produits avec les fichiers, dans un sous-dossier caché de la sortie
+PREVIEW_DIR = ".previews"
+PREVIEW_SIZE = (320, 320)
+PREVIEW_QUALITY = 70
+# Images candidates (réduites) parmi lesquelles ffmpeg choisit la plus représentative
+PREVIEW_VIDEO_FRAMES = 50
+
+def _ssim_plane(image: "Image.Image", size: Optional[Tuple[int, int]] = None):
+    """Luminance (tableau numpy) réduite pour la comparaison SSIM"""
+    import numpy as np
+    from PIL import Image
+    
+    plane = image.convert('L')
+    if size is None:
+        plane.thumbnail((SSIM_MAX_SIDE, SSIM_MAX_SIDE), Image.Resampling.BILINEAR)
+    elif plane.size != size:
+        plane = plane.resize(size, Image.Resampling.BILINEAR)
+    return np.asarray(plane, dtype=np.float64)
+
+
+def structural_similarity(reference, candidate, window: int = 7) -> float:
+    """SSIM moyen entre deux plans de luminance de même taille (fenêtre uniforme)"""
+    import numpy as np
+    
+    window = max(1, min(window, *reference.shape))
+    
+    def box_mean(values):
+        # Moyenne glissante window x window par sommes cumulées
+        summed = np.pad(values.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+        return (
+            summed[window:, window:] - summed[:-window, window:]
+            - summed[window:, :-window] + summed[:-window, :-window]
+        ) / window ** 2
+    
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mean_x, mean_y = box_mean(reference), box_mean(candidate)
+    var_x = box_mean(reference * reference) - mean_x ** 2
+    var_y = box_mean(candidate * candidate) - mean_y ** 2
+    covariance = box_mean(reference * candidate) - mean_x * mean_y
+    ssim_map = ((2 * mean_x * mean_y + c1) * (2 * covariance + c2)) / (
+        (mean_x ** 2 + mean_y ** 2 + c1) * (var_x + var_y + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def smallest_passing_quality(low: int, high: int, passes: Callable[[int], bool]) -> Optional[int]:
+    """Recherche dichotomique de la plus petite qualité qui satisfait passes (monotone croissant)"""
+    found = None
+    while low <= high:
+        middle = (low + high) // 2
+        if passes(middle):
+            found, high = middle, middle - 1
+        else:
+            low = middle + 1
+    return found
+
+
+def _has_alpha(image: "Image.Image") -> bool:
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def to_working_mode(image: "Image.Image") -> "Image.Image":
+    """
+    Ramène l'image à un mode 8 bits rééchantillonnable (RGB, RGBA, L, LA).
+    Les niveaux de gris 16 bits (modes I, I;16...) sont divisés par 256 et non écrêtés
+    (une conversion directe rendrait presque toute l'image blanche).
+    Lève ValueError pour une image en virgule flottante (mode F), dont la plage est inconnue.
+    """
+    if image.mode in ('RGB', 'RGBA', 'L', 'LA'):
+        return image
+    # Une palette ne se rééchantillonne pas (plus proche voisin uniquement)
+    if image.mode == 'P':
+        return image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    if image.mode == 'I' or image.mode.startswith('I;16'):
+        return image.convert('I').point(lambda value: value / 256).convert('L')
+    if image.mode == 'F':
+        raise ValueError("image en virgule flottante (mode F) non prise en charge")
+    return image.convert('RGB')
+
+
+def prepare_image_mode(image: "Image.Image", output_format: str) -> "Image.Image":
+    """Convertit l'image vers un mode que le format de sortie sait écrire"""
+    from PIL import Image
+    
+    if output_format == 'jpeg':
+        if _has_alpha(image):
+            # JPEG sans transparence : fond blanc plutôt que noir
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return image if image.mode in ('RGB', 'L') else image.convert('RGB')
+    if output_format in ('png', 'png-quantized'):
+        return image if image.mode in ('RGB', 'RGBA', 'L', 'LA') else image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    return image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+
+def encode_image(image: "Image.Image", output_format: str, quality: int) -> bytes:
+    """Encode une image en mémoire dans l'un des IMAGE_OUTPUT_FORMATS"""
+    from PIL import Image
+    
+    save_kwargs = {}
+    if output_format == 'jpeg':
+        save_kwargs = {'quality': quality, 'optimize': True, 'progressive': True}
+    elif output_format == 'webp':
+        save_kwargs = {'quality': quality}
+    elif output_format == 'avif':
+        # L'encodeur AVIF est fourni par pillow-heif
+        load_backend('heif')
+        # Vitesse 8 : ~10x plus rapide que le réglage par défaut pour une taille comparable
+        save_kwargs = {'quality': quality, 'enc_params': {'speed': '8'}}
+    elif output_format == 'png':
+        save_kwargs = {'optimize': True}
+    elif output_format == 'png-quantized':
+        # Palette de 256 couleurs (transparence comprise) : captures d'écran, logos, graphiques
+        method = Image.Quantize.FASTOCTREE if image.mode in ('RGBA', 'LA') else Image.Quantize.MEDIANCUT
+        image = image.convert('RGBA' if image.mode == 'LA' else image.mode).quantize(256, method=method)
+        save_kwargs = {'optimize': True}
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format=IMAGE_OUTPUT_FORMATS[output_format][0], **save_kwargs)
+    return buffer.getvalue()
+
+
+def image_similarity(reference, data: bytes) -> float:
+    """SSIM entre le plan de référence et une image encodée"""
+    from PIL import Image
+    
+    reference_size = (reference.shape[1], reference.shape[0])
+    with Image.open(io.BytesIO(data)) as candidate:
+        candidate.draft('L', reference_size)
+        if _has_alpha(candidate):
+            # Comparer ce qui s'affiche : transparence composée sur fond blanc
+            candidate = prepare_image_mode(candidate, 'jpeg')
+        plane = _ssim_plane(candidate, reference_size)
+    return structural_similarity(reference, plane)
+
+
+# Préréglages d'encodage vidéo (encodeur ffmpeg, conteneur, audio compatible)
+VIDEO_CODECS = {
+    'h264': {
+        'encoder': 'libx264',
+        'codec_name': 'h264',
+        'extension': '.mp4',
+        'audio_encoder': 'aac',
+        'audio_codecs': {'aac'},
+        'args': ['-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+    },
+    'h265': {
+        'encoder': 'libx265',
+        'codec_name': 'hevc',
+        'extension': '.mp4',
+        'audio_encoder': 'aac',
+        'audio_codecs': {'aac'},
+        'args': ['-pix_fmt', 'yuv420p', '-tag:v', 'hvc1', '-movflags', '+faststart']
+    },
+    'vp9': {
+        'encoder': 'libvpx-vp9',
+        'codec_name': 'vp9',
+        'extension': '.webm',
+        'audio_encoder': 'libopus',
+        'audio_codecs': {'opus', 'vorbis'},
+        'args': ['-pix_fmt', 'yuv420p', '-row-mt', '1', '-deadline', 'good', '-cpu-used', '4']
+    }
+}
+
+# Préréglages d'encodage audio (encodeur ffmpeg, conteneur, codecs recopiables tels quels)
+AUDIO_CODECS = {
+    'mp3': {
+        'encoder': 'libmp3lame',
+        'extension': '.mp3',
+        'codecs': {'mp3'},
+        'max_sample_rate': 44100,
+        'args': []
+    },
+    'aac': {
+        'encoder': 'aac',
+        'extension': '.m4a',
+        'codecs': {'aac'},
+        'max_sample_rate': 44100,
+        'args': ['-movflags', '+faststart']
+    },
+    'opus': {
+        'encoder': 'libopus',
+        'extension': '.opus',
+        'codecs': {'opus'},
+        'max_sample_rate': 48000,  # Opus travaille nativement à 48 kHz
+        'args': ['-vbr', 'on']
+    }
+}
+
+
+def find_ffmpeg_tool(name: str = "ffmpeg") -> str:
+    """Chemin de ffmpeg/ffprobe (PATH, sinon binaire fourni par imageio-ffmpeg)"""
+    path = shutil.which(name)
+    if path:
+        return path
+    if name == "ffmpeg":
+        try:
+            import imageio_ffmpeg
+            return imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            pass
+    raise FileNotFoundError(f"{name} introuvable, installez FFmpeg")
+
+
+def probe_media(input_path: Path) -> dict:
+    """Métadonnées d'un fichier audio/vidéo via ffprobe (en-têtes uniquement, sans décodage)"""
+    result = subprocess.run(
+        [
+            find_ffmpeg_tool("ffprobe"), "-v", "error",
+            "-print_format", "json", "-show_format", "-show_streams",
+            str(input_path)
+        ],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout or "{}")
+
+
+def parse_bitrate(bitrate: str) -> int:
+    """Convertit un bitrate ffmpeg ('128k', '1.5M', '96000') en bits/s"""
+    value = str(bitrate).strip().lower()
+    multipliers = {'k': 1000, 'm': 1000 ** 2}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(float(value))
+
+
+def estimate_jpeg_quality(quantization: dict) -> int:
+    """Qualité (échelle libjpeg 1-100) estimée à partir des tables de quantification d'un JPEG"""
+    # Table de luminance de référence (qualité 50) de la norme JPEG
+    standard_luminance = [
+        16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+        14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+        18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+        49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99
+    ]
+    luminance = quantization.get(0)
+    if not luminance:
+        return 100
+    scale = sum(luminance) / sum(standard_luminance) * 100
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return max(1, min(100, round(quality)))
+
+
+def stream_bit_rate(metadata: dict, stream: dict) -> int:
+    """Débit d'un flux (à défaut, celui du conteneur), 0 si inconnu"""
+    return int(stream.get('bit_rate') or metadata.get('format', {}).get('bit_rate') or 0)
+
+
+def audio_track_args(metadata: dict, audio_codecs: set, audio_encoder: str, audio_bitrate: str) -> List[str]:
+    """Arguments audio : copie de la première piste si elle respecte déjà la cible, sinon réencodage"""
+    audio_streams = [
+        stream for stream in metadata.get('streams', [])
+        if stream.get('codec_type') == 'audio'
+    ]
+    if audio_streams:
+        audio = audio_streams[0]
+        audio_bit_rate = int(audio.get('bit_rate') or 0)
+        if audio.get('codec_name') in audio_codecs and 0 < audio_bit_rate <= parse_bitrate(audio_bitrate) * 1.1:
+            return ["-c:a", "copy"]
+    return ["-c:a", audio_encoder, "-b:a", audio_bitrate]
+
+
+class ResourceLimitError(RuntimeError):
+    """Un fichier a dépassé la mémoire, la durée ou la taille d'image qui lui sont allouées"""
+
+
+class _LimitExceeded(BaseException):
+    """
+    Dépassement détecté pendant le traitement (SIGALRM, surveillance de ffmpeg).
+    Hérite de BaseException pour traverser les `except Exception` des compresseurs.
+    """
+
+
+# Plafond mémoire du fichier en cours dans ce processus (voir job_limits), None si aucun
+_active_memory_limit = None
+
+
+@contextmanager
+def job_limits(memory_limit: Optional[int] = None, time_limit: Optional[float] = None) -> Iterator[None]:
+    """
+    Plafonne la mémoire et la durée du fichier en cours ; tout dépassement devient ResourceLimitError.
+    La mémoire est bornée par RLIMIT_AS : memory_limit s'ajoute à l'espace d'adressage déjà
+    occupé par le processus (hérité du serveur web). Les limites portent sur tout le processus :
+    à réserver aux processus du pool. ffmpeg échappe à RLIMIT_AS mais est arrêté si sa
+    mémoire résidente dépasse memory_limit.
+    """
+    global _active_memory_limit
+    previous_limit = resource.getrlimit(resource.RLIMIT_AS)
+    previous_handler = None
+    if memory_limit:
+        hard = previous_limit[1]
+        soft = process_memory(os.getpid())[0] + memory_limit
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+        _active_memory_limit = memory_limit
+    if time_limit:
+        def on_timeout(signum, frame):
+            raise _LimitExceeded(f"Durée maximale dépassée ({time_limit:.0f} s)")
+        previous_handler = signal.signal(signal.SIGALRM, on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        yield
+    except _LimitExceeded as e:
+        raise ResourceLimitError(str(e)) from None
+    except MemoryError:
+        raise ResourceLimitError(f"Mémoire insuffisante : limite de {memory_limit // (1024 * 1024)} Mo dépassée") from None
+    finally:
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, previous_limit)
+            _active_memory_limit = None
+
+
+@contextmanager
+def _unlimited_address_space() -> Iterator[None]:
+    """Lève RLIMIT_AS le temps de créer un processus fils (ffmpeg réserve beaucoup d'espace virtuel)"""
+    if _active_memory_limit is None:
+        yield
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (hard, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def process_memory(pid: int) -> Tuple[int, int]:
+    """(espace d'adressage, mémoire résidente) d'un processus en octets, (0, 0) si inconnus"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            size, resident = f.read().split()[:2]
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        return int(size) * page_size, int(resident) * page_size
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def _watch_memory(process: subprocess.Popen, limit: int, exceeded: threading.Event) -> None:
+    """Arrête le processus si sa mémoire résidente dépasse limit"""
+    while process.poll() is None:
+        if process_memory(process.pid)[1] > limit:
+            exceeded.set()
+            process.kill()
+            return
+        time.sleep(0.25)
+
+
+def run_ffmpeg(args: List[str], duration: float = 0, on_progress: Optional[Callable[[float], None]] = None) -> None:
+    """
+    Lance ffmpeg et remonte la fin de stderr en cas d'échec.
+    Si on_progress est fourni, la progression (0-1) est lue sur -progress pipe:1.
+    Sous job_limits, ffmpeg est arrêté s'il dépasse la mémoire allouée ou la durée restante.
+    """
+    command = [find_ffmpeg_tool("ffmpeg"), "-hide_banner", "-nostdin", "-y"]
+    if FFMPEG_MAX_THREADS:
+        # Placé avant la première entrée : s'applique à son décodage
+        command += ["-filter_threads", str(FFMPEG_MAX_THREADS), "-threads", str(FFMPEG_MAX_THREADS)]
+    track_progress = on_progress is not None and duration > 0
+    if track_progress:
+        command += ["-nostats", "-progress", "pipe:1"]
+    
+    # stderr part dans un fichier : le tube stdout est lu en continu sans risque d'interblocage
+    with tempfile.TemporaryFile(mode='w+') as stderr_file:
+        with _unlimited_address_space():
+            process = subprocess.Popen(
+                command + args,
+                stdout=subprocess.PIPE if track_progress else subprocess.DEVNULL, stderr=stderr_file, text=True
+            )
+        exceeded = threading.Event()
+        if _active_memory_limit is not None:
+            threading.Thread(target=_watch_memory, args=(process, _active_memory_limit, exceeded), daemon=True).start()
+        try:
+            if track_progress:
+                for line in process.stdout:
+                    key, _, value = line.strip().partition("=")
+                    if key == "out_time_us" and value.isdigit():
+                        on_progress(min(int(value) / 1_000_000 / duration, 1.0))
+            returncode = process.wait()
+        except BaseException:
+            # Durée dépassée (SIGALRM) ou interruption : ffmpeg ne doit pas survivre au fichier
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            if process.stdout is not None:
+                process.stdout.close()
+        stderr_file.seek(0)
+        errors = stderr_file.read()
+    if exceeded.is_set():
+        raise _LimitExceeded(f"Mémoire insuffisante : ffmpeg a dépassé {_active_memory_limit // (1024 * 1024)} Mo")
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg a échoué ({returncode}): {errors.strip()[-500:]}")
+
+
+# Images PDF que l'on sait ré-encoder en JPEG sans changer leur rendu
+PDF_IMAGE_COLORSPACES = {'/DeviceRGB': 'RGB', '/DeviceGray': 'L'}
+PDF_LOSSLESS_IMAGE_FILTERS = {'/JBIG2Decode', '/CCITTFaxDecode', '/JPXDecode'}
+
+
+def _pdf_image_mode(image: "StreamObject") -> Optional[str]:
+    """Mode Pillow d'une image PDF, ou None si elle doit rester telle quelle"""
+    from PyPDF2.generic import ArrayObject, IndirectObject
+    
+    # Masques, palettes, 1 bit/pixel (scans N&B) : le JPEG dégraderait ou grossirait le fichier
+    if image.get('/ImageMask') or '/Mask' in image or '/Decode' in image:
+        return None
+    if image.get('/BitsPerComponent') != 8:
+        return None
+    
+    colorspace = image.get('/ColorSpace')
+    if isinstance(colorspace, IndirectObject):
+        colorspace = colorspace.get_object()
+    if isinstance(colorspace, ArrayObject) and colorspace and colorspace[0] == '/ICCBased':
+        components = colorspace[1].get_object().get('/N')
+        return {1: 'L', 3: 'RGB'}.get(components)
+    return PDF_IMAGE_COLORSPACES.get(colorspace)
+
+
+def recompress_pdf_image(image: "StreamObject", max_pixels: int, quality: int,
+                         on_decoded: Optional[Callable[["Image.Image"], None]] = None) -> Optional["StreamObject"]:
+    """
+    Ré-encode une image PDF en JPEG, réduite à max_pixels sur son plus grand côté.
+    Renvoie None si l'image n'est pas éligible ou si le résultat n'est pas plus petit.
+    on_decoded reçoit l'image décodée et réduite (aperçu sans second décodage).
+    """
+    from PIL import Image
+    from PyPDF2.generic import NameObject, NumberObject, StreamObject
+    
+    mode = _pdf_image_mode(image)
+    filters = image.get('/Filter', [])
+    if not isinstance(filters, list):
+        filters = [filters]
+    if mode is None or PDF_LOSSLESS_IMAGE_FILTERS.intersection(filters):
+        return None
+    
+    width, height = image['/Width'], image['/Height']
+    scale = min(1.0, max_pixels / max(width, height))
+    if filters == ['/DCTDecode']:
+        if scale == 1.0:
+            # Déjà en JPEG à la bonne résolution : un ré-encodage ne ferait que dégrader
+            return None
+        pil_image = Image.open(io.BytesIO(image._data))
+        pil_image.draft(mode, (int(width * scale), int(height * scale)))
+    else:
+        pil_image = Image.frombytes(mode, (width, height), image.get_data())
+    
+    if pil_image.mode != mode:
+        pil_image = pil_image.convert(mode)
+    if scale < 1.0:
+        pil_image = pil_image.resize(
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            Image.Resampling.LANCZOS
+        )
+    if on_decoded is not None:
+        on_decoded(pil_image)
+    
+    buffer = io.BytesIO()
+    pil_image.save(buffer, 'JPEG', quality=quality, optimize=True)
+    data = buffer.getvalue()
+    if len(data) >= len(image._data):
+        return None
+    
+    recompressed = StreamObject()
+    recompressed.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(pil_image.width),
+        NameObject('/Height'): NumberObject(pil_image.height),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+        NameObject('/Filter'): NameObject('/DCTDecode')
+    })
+    # Le masque de transparence (/SMask) peut garder sa propre résolution
+    for key in ('/ColorSpace', '/SMask', '/Intent', '/Interpolate'):
+        if key in image:
+            recompressed[NameObject(key)] = image.raw_get(key)
+    recompressed._data = data
+    return recompressed
+
+
+def _pdf_resources_images(resources, seen: set) -> Iterator["IndirectObject"]:
+    """Références des images d'un dictionnaire de ressources (formulaires XObject inclus)"""
+    from PyPDF2.generic import IndirectObject
+    
+    if resources is None:
+        return
+    xobjects = resources.get_object().get('/XObject')
+    if xobjects is None:
+        return
+    for name in list(xobjects.get_object()):
+        reference = xobjects.get_object().raw_get(name)
+        if not isinstance(reference, IndirectObject) or reference.idnum in seen:
+            continue
+        seen.add(reference.idnum)
+        xobject = reference.get_object()
+        if xobject.get('/Subtype') == '/Image':
+            yield reference
+        elif xobject.get('/Subtype') == '/Form':
+            yield from _pdf_resources_images(xobject.get('/Resources'), seen)
+
+
+def _remap_pdf_references(value, mapping: dict, writer: "PdfWriter"):
+    """Remplace récursivement les références vers des doublons par l'objet conservé"""
+    from PyPDF2.generic import IndirectObject
+    
+    if isinstance(value, IndirectObject):
+        if value.idnum in mapping:
+            return IndirectObject(mapping[value.idnum], 0, writer)
+        return value
+    if isinstance(value, dict):
+        for key in list(value):
+            value[key] = _remap_pdf_references(dict.__getitem__(value, key), mapping, writer)
+    elif isinstance(value, list):
+        for position, item in enumerate(value):
+            value[position] = _remap_pdf_references(item, mapping, writer)
+    return value
+
+
+def compress_page_contents(page: "PageObject", writer: "PdfWriter") -> None:
+    """
+    Compresse (Flate) les flux de contenu d'une page. PyPDF2 remplace /Contents par un flux
+    direct, que l'écriture placerait sans ses données dans le dictionnaire de la page (page
+    blanche) : le flux est replacé dans un objet indirect, celui d'origine s'il était unique.
+    """
+    from PyPDF2.generic import IndirectObject, NameObject
+    
+    original = page.raw_get('/Contents')
+    page.compress_content_streams()
+    compressed = page.raw_get('/Contents')
+    if isinstance(compressed, IndirectObject):
+        return
+    if isinstance(original, IndirectObject) and not isinstance(original.get_object(), list):
+        writer._objects[original.idnum - 1] = compressed
+        page[NameObject('/Contents')] = original
+    else:
+        # Plusieurs flux fusionnés en un seul : nouvel objet
+        page[NameObject('/Contents')] = writer._add_object(compressed)
+
+
+def optimize_pdf_streams(writer: "PdfWriter") -> None:
+    """
+    Compresse (Flate) les flux stockés sans filtre puis fusionne les flux identiques
+    (polices, profils ICC et images répétés d'une page ou d'un document fusionné à l'autre).
+    """
+    from PyPDF2.generic import NullObject, StreamObject
+    
+    for position, obj in enumerate(writer._objects):
+        if isinstance(obj, StreamObject) and '/Filter' not in obj and len(obj._data) > 64:
+            encoded = obj.flate_encode()
+            # flate_encode ne conserve que /Filter : recopier le reste du dictionnaire
+            for key, value in dict.items(obj):
+                if key not in ('/Filter', '/Length'):
+                    encoded[key] = value
+            writer._objects[position] = encoded
+    
+    canonical = {}
+    mapping = {}
+    for position, obj in enumerate(writer._objects):
+        if not isinstance(obj, StreamObject):
+            continue
+        serialized = io.BytesIO()
+        obj.write_to_stream(serialized, None)
+        digest = hashlib.sha256(serialized.getvalue()).digest()
+        if digest in canonical:
+            mapping[position + 1] = canonical[digest]
+        else:
+            canonical[digest] = position + 1
+    
+    if not mapping:
+        return
+    for obj in writer._objects:
+        if obj is not None:
+            _remap_pdf_references(obj, mapping, writer)
+    # Les emplacements libérés restent en place (table xref séquentielle) mais ne pèsent plus rien
+    for idnum in mapping:
+        writer._objects[idnum - 1] = NullObject()
+
+
+def render_pdf_page(input_path: Path, max_size: Tuple[int, int], page_index: int = 0) -> Optional["Image.Image"]:
+    """
+    Rendu d'une page PDF tenant dans max_size, avec pypdfium2 (optionnel : pip install pypdfium2).
+    Renvoie None s'il n'est pas installé.
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+    
+    document = pypdfium2.PdfDocument(str(input_path))
+    try:
+        page = document[page_index]
+        width, height = page.get_size()
+        return page.render(scale=min(max_size[0] / width, max_size[1] / height)).to_pil()
+    finally:
+        document.close()
+
+
+def preview_output_args(preview_path: Path) -> List[str]:
+    """
+    Sortie ffmpeg supplémentaire produisant l'image d'aperçu d'une vidéo à partir du flux
+    déjà décodé : la plus représentative des PREVIEW_VIDEO_FRAMES premières, réduites avant la sélection
+    """
+    width, height = PREVIEW_SIZE
+    return [
+        "-map", "0:v:0", "-an", "-sn", "-dn",
+        "-vf", (
+            f"scale=w='min(iw,{width})':h='min(ih,{height})':force_original_aspect_ratio=decrease,"
+            f"thumbnail={PREVIEW_VIDEO_FRAMES}"
+        ),
+        "-frames:v", "1", "-q:v", "5", "-f", "image2", "-update", "1", str(preview_path)
+    ]
+
+
+def configure_pillow() -> None:
+    """Applique IMAGE_MAX_PIXELS : une image plus grande lève une erreur au lieu d'un simple avertissement"""
+    import warnings
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+
+def set_image_pixel_limit(max_pixels: int) -> None:
+    """Modifie IMAGE_MAX_PIXELS, y compris si Pillow est déjà chargé"""
+    global IMAGE_MAX_PIXELS
+    IMAGE_MAX_PIXELS = max_pixels
+    if 'PIL.Image' in sys.modules:
+        configure_pillow()
+
+
+def _register_heif_openers() -> None:
+    """Lecture des formats HEIF/HEIC et AVIF, écriture AVIF, par Pillow"""
+    configure_pillow()
     import pillow_heif
-except ImportError as e:
-    print(f"Erreur d'importation: {e}")
-    print("Installez les dépendances avec:")
-    print("pip install Pillow PyPDF2 moviepy pydub pillow-heif")
-    sys.exit(1)
+    pillow_heif.register_heif_opener()
+    pillow_heif.register_avif_opener()
+
+
+# Backends de compression : le premier qui déclare une extension la traite
+register_backend(CodecBackend(
+    'pillow', {'image': {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}},
+    modules=('PIL',), setup=configure_pillow, install_hint="pip install Pillow"
+))
+register_backend(CodecBackend(
+    'heif', {'image': {'.heic', '.heif', '.avif'}},
+    modules=('PIL', 'pillow_heif'), setup=_register_heif_openers, install_hint="pip install pillow-heif"
+))
+register_backend(CodecBackend(
+    'pypdf', {'pdf': {'.pdf'}},
+    modules=('PyPDF2', 'PIL'), setup=configure_pillow, install_hint="pip install PyPDF2 Pillow"
+))
+register_backend(CodecBackend(
+    'ffmpeg', {
+        'video': {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'},
+        'audio': {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'}
+    },
+    tools=('ffmpeg', 'ffprobe'), find_tool=find_ffmpeg_tool, install_hint="installez FFmpeg"
+))
+
+
+def supported_formats() -> dict:
+    """Extensions traitables par famille (backends disponibles) et état de chaque backend"""
+    formats = {'images': set(), 'videos': set(), 'audio': set(), 'documents': set()}
+    families = {'image': 'images', 'video': 'videos', 'audio': 'audio', 'pdf': 'documents'}
+    reports = [backend.report() for backend in BACKENDS.values()]
+    for report in reports:
+        if report['available']:
+            for file_type, extensions in report['formats'].items():
+                formats[families[file_type]].update(extensions)
+    return {
+        **{family: sorted(extensions) for family, extensions in formats.items()},
+        'backends': reports
+    }
 
-# Enregistrer les formats HEIF/HEIC
-pillow_heif.register_heif_opener()
 
 class FileCompressor:
     """Classe principale pour la compression de fichiers"""
     
-    def __init__(self, output_dir: str = "compressed"):
+    def __init__(self, output_dir: str = "compressed", cache: Optional[ResultCache] = None,
+                 progress_callback: Optional[Callable[[float], None]] = None, previews: bool = False):
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = cache
+        self.progress_callback = progress_callback
+        self._last_progress = -1.0
+        # Aperçus (PREVIEW_DIR) produits avec chaque fichier ; chemin de celui du dernier fichier traité
+        self.previews = previews
+        self.preview_path = None
+        # Décision de l'étape d'analyse pour le dernier fichier traité (action + raison)
+        self.decision = None
+        # Durée de chaque étape (secondes) et type d'erreur éventuel du dernier fichier traité
+        self.timings = {}
+        self.error_type = None
         
-        # Extensions supportées
-        self.image_extensions = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.heic', '.heif'}
-        self.video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'}
-        self.audio_extensions = {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'}
-        self.pdf_extensions = {'.pdf'}
+        # Extensions déclarées par les backends (disponibles ou non)
+        self.image_extensions = extensions_for('image')
+        self.video_extensions = extensions_for('video')
+        self.audio_extensions = extensions_for('audio')
+        self.pdf_extensions = extensions_for('pdf')
+    
+    def report_progress(self, fraction: float) -> None:
+        """Transmet la progression du fichier en cours (0-1), par pas d'au moins 1%"""
+        if self.progress_callback is None:
+            return
+        if fraction >= 1.0 or fraction <= 0.0 or fraction - self._last_progress >= 0.01:
+            self._last_progress = fraction
+            self.progress_callback(fraction)
+    
+    def record_stage(self, stage: str, started: float) -> float:
+        """Ajoute le temps écoulé depuis started à l'étape stage et renvoie l'instant courant"""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - started
+        return now
+    
+    def output_target(self, input_path: Path, extension: str) -> Path:
+        """
+        Chemin de sortie d'un fichier : l'extension d'origine reste dans le nom quand le format change,
+        pour que x.bmp et x.jpg d'un même dossier ne produisent pas tous deux x_compressed.jpg
+        """
+        name = input_path.stem if extension == input_path.suffix else input_path.name
+        return self.output_dir / f"{name}_compressed{extension}"
+    
+    def preview_target(self, input_path: Path) -> Path:
+        preview_dir = self.output_dir / PREVIEW_DIR
+        preview_dir.mkdir(exist_ok=True)
+        return preview_dir / f"{input_path.name}.jpg"
+    
+    def save_image_preview(self, image: "Image.Image", input_path: Path) -> None:
+        """
+        Aperçu JPEG d'une image déjà décodée, réduite à PREVIEW_SIZE (le premier fourni est conservé).
+        Un échec de l'aperçu n'interrompt jamais la compression.
+        """
+        if not self.previews or self.preview_path is not None:
+            return
+        from PIL import Image
+        
+        try:
+            started = time.perf_counter()
+            image = to_working_mode(image)
+            scale = min(1.0, PREVIEW_SIZE[0] / image.width, PREVIEW_SIZE[1] / image.height)
+            preview = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.Resampling.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP
+            )
+            
+            # Écriture atomique : l'aperçu peut être servi pendant que la compression continue
+            preview_path = self.preview_target(input_path)
+            temp_path = preview_path.with_name(f".{preview_path.name}.{uuid.uuid4().hex}")
+            prepare_image_mode(preview, 'jpeg').save(temp_path, 'JPEG', quality=PREVIEW_QUALITY)
+            os.replace(temp_path, preview_path)
+            self.preview_path = preview_path
+            self.record_stage('preview', started)
+        except Exception as e:
+            print(f"Aperçu impossible pour {input_path}: {e}")
+    
+    def preview_from_file(self, input_path: Path, source: Path) -> None:
+        """
+        Aperçu tiré d'un fichier : sortie livrée sans décodage (cache, fichier déjà optimal,
+        changement de conteneur) ou rendu de la première page d'un PDF
+        """
+        try:
+            file_type = self.file_type(source)
+            backend = backend_for(source.suffix)
+            if backend is not None:
+                backend.load()
+            
+            if file_type == 'image':
+                from PIL import Image, ImageOps
+                with Image.open(source) as image:
+                    # JPEG : décodage DCT réduit, au plus près de la taille de l'aperçu
+                    image.draft('RGB', PREVIEW_SIZE)
+                    self.save_image_preview(ImageOps.exif_transpose(image), input_path)
+            elif file_type == 'pdf':
+                page = render_pdf_page(source, PREVIEW_SIZE)
+                if page is not None:
+                    self.save_image_preview(page, input_path)
+            elif file_type == 'video':
+                started = time.perf_counter()
+                preview_path = self.preview_target(input_path)
+                run_ffmpeg(["-i", str(source)] + preview_output_args(preview_path))
+                self.preview_path = preview_path
+                self.record_stage('preview', started)
+        except Exception as e:
+            print(f"Aperçu impossible pour {input_path}: {e}")
+    
+    def file_type(self, input_path: Path) -> str:
+        """Famille du fichier : image, pdf, video, audio ou other"""
+        return file_type_for(input_path.suffix) or 'other'
     
     def get_file_size(self, filepath: Path) -> int:
         """Retourne la taille du fichier en octets"""
@@ -52,185 +883,704 @@ class FileCompressor:
             size_bytes /= 1024.0
         return f"{size_bytes:.2f} TB"
     
-    def compress_image(self, input_path: Path, quality: int = 85, max_resolution: Tuple[int, int] = (1920, 1080)) -> Optional[Path]:
-        """Compresse une image"""
+    def compress_image(self, input_path: Path, quality: int = 85, max_resolution: Tuple[int, int] = (1920, 1080),
+                       target_size: Optional[int] = None, target_ssim: Optional[float] = None,
+                       output_format: str = "keep") -> Optional[Path]:
+        """
+        Compresse une image (décodée directement à une résolution proche de la cible si possible).
+        target_size (octets) / target_ssim (0-1) : la qualité est cherchée par dichotomie
+        entre IMAGE_MIN_QUALITY et quality, en mémoire, sur l'image déjà redimensionnée.
+        output_format : 'keep' (format d'origine), 'jpeg', 'webp', 'avif', 'png' ou 'auto'
+        (plus petit résultat parmi les formats adaptés qui atteint la similarité minimale).
+        """
+        from PIL import ExifTags, Image, ImageOps
+        
         try:
+            started = time.perf_counter()
             with Image.open(input_path) as img:
-                # Convertir en RGB si nécessaire
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
+                # Boîte cible dans le sens de stockage : une rotation EXIF de 90° inverse largeur et hauteur
+                target_box = max_resolution
+                if img.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+                    target_box = (max_resolution[1], max_resolution[0])
+                scale = min(1.0, target_box[0] / img.width, target_box[1] / img.height)
                 
-                # Redimensionner si nécessaire
-                img.thumbnail(max_resolution, Image.Resampling.LANCZOS)
+                # JPEG : décodage DCT réduit (1/2, 1/4, 1/8), jamais en dessous de la taille cible
+                if img.format == 'JPEG' and scale < 1.0:
+                    img.draft(img.mode, (int(img.width * scale), int(img.height * scale)))
                 
-                # Optimiser l'orientation
+                # Orientation appliquée avant le redimensionnement, sur l'image déjà réduite
                 img = ImageOps.exif_transpose(img)
                 
-                # Déterminer le format de sortie
-                output_format = 'JPEG'
-                if input_path.suffix.lower() == '.png':
-                    output_format = 'PNG'
-                elif input_path.suffix.lower() == '.webp':
-                    output_format = 'WebP'
+                if img.mode == 'F' and output_format in ('keep', 'auto'):
+                    # Plage de valeurs inconnue : l'original est livré tel quel
+                    self.record_stage('decode', started)
+                    return self.keep_original(input_path)
+                img = to_working_mode(img)
+                started = self.record_stage('decode', started)
+                
+                # Redimensionner si nécessaire
+                img.thumbnail(max_resolution, Image.Resampling.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP)
+                
+                # Canal alpha entièrement opaque : inutile de le conserver
+                if _has_alpha(img) and img.getchannel('A').getextrema()[0] == 255:
+                    img = img.convert('RGB' if img.mode == 'RGBA' else 'L')
+                started = self.record_stage('resize', started)
+                
+                # Aperçu tiré de l'image déjà décodée et réduite
+                self.save_image_preview(img, input_path)
+                started = time.perf_counter()
+                
+                # Formats candidats selon la politique demandée
+                if output_format == 'auto':
+                    candidates = ['webp', 'avif'] if _has_alpha(img) else ['jpeg', 'webp', 'avif']
+                    if not get_backend('heif').available():
+                        candidates.remove('avif')
+                    if img.getcolors(IMAGE_GRAPHIC_MAX_COLORS) is not None:
+                        candidates += ['png-quantized', 'png']
+                elif output_format == 'keep':
+                    candidates = [IMAGE_KEEP_FORMATS.get(input_path.suffix.lower(), 'jpeg')]
+                else:
+                    candidates = [output_format]
+                
+                reference = None
+                if target_ssim or len(candidates) > 1:
+                    reference = _ssim_plane(prepare_image_mode(img, 'jpeg'))
                 
-                # Créer le nom de fichier de sortie
-                output_path = self.output_dir / f"{input_path.stem}_compressed{input_path.suffix}"
+                # (taille, similarité, format, données) de chaque candidat
+                results = []
+                for candidate_format in candidates:
+                    candidate_image = prepare_image_mode(img, candidate_format)
+                    encodings = {}
+                    
+                    def encode(encode_quality):
+                        if encode_quality not in encodings:
+                            encodings[encode_quality] = encode_image(candidate_image, candidate_format, encode_quality)
+                        return encodings[encode_quality]
+                    
+                    chosen_quality = quality
+                    if candidate_format in ('jpeg', 'webp', 'avif') and (target_size or target_ssim):
+                        low = min(IMAGE_MIN_QUALITY, quality)
+                        
+                        if target_ssim:
+                            chosen_quality = smallest_passing_quality(
+                                low, quality,
+                                lambda candidate_quality: image_similarity(reference, encode(candidate_quality)) >= target_ssim
+                            ) or quality
+                        
+                        if target_size and len(encode(chosen_quality)) > target_size:
+                            # Plus grande qualité qui tient dans la taille cible (à défaut, la plus basse)
+                            too_big = smallest_passing_quality(
+                                low, chosen_quality, lambda candidate_quality: len(encode(candidate_quality)) > target_size
+                            )
+                            chosen_quality = max(low, too_big - 1)
+                    
+                    data = encode(chosen_quality)
+                    similarity = image_similarity(reference, data) if len(candidates) > 1 else 1.0
+                    results.append((len(data), similarity, candidate_format, data))
                 
-                # Sauvegarder l'image compressée
-                save_kwargs = {'optimize': True}
-                if output_format == 'JPEG':
-                    save_kwargs['quality'] = quality
-                elif output_format == 'WebP':
-                    save_kwargs['quality'] = quality
+                # Plus petit candidat qui atteint la similarité minimale (à défaut, le plus fidèle)
+                minimum_similarity = target_ssim or IMAGE_AUTO_MIN_SSIM
+                acceptable = [result for result in results if result[1] >= minimum_similarity]
+                if not acceptable:
+                    acceptable = [max(results, key=lambda result: result[1])]
+                _, _, chosen_format, data = min(acceptable, key=lambda result: result[0])
+                started = self.record_stage('encode', started)
                 
-                img.save(output_path, format=output_format, **save_kwargs)
+                # Créer le nom de fichier de sortie (extension d'origine conservée si le format est le même)
+                extension = IMAGE_OUTPUT_FORMATS[chosen_format][1]
+                if IMAGE_KEEP_FORMATS.get(input_path.suffix.lower()) == chosen_format:
+                    extension = input_path.suffix
+                output_path = self.output_target(input_path, extension)
+                
+                # La compression n'apporte rien : conserver l'original (sauf format imposé)
+                if output_format in ('keep', 'auto') and len(data) >= input_path.stat().st_size:
+                    output_path = self.output_target(input_path, input_path.suffix)
+                    shutil.copyfile(input_path, output_path)
+                    self.record_stage('write', started)
+                    return output_path
+                
+                with open(output_path, 'wb') as output_file:
+                    output_file.write(data)
+                self.record_stage('write', started)
                 return output_path
                 
         except Exception as e:
             print(f"Erreur lors de la compression de l'image {input_path}: {e}")
+            self.error_type = type(e).__name__
             return None
     
-    def compress_pdf(self, input_path: Path) -> Optional[Path]:
-        """Compresse un PDF en supprimant les métadonnées et en optimisant"""
+    def compress_pdf(self, input_path: Path, image_quality: int = 75, image_dpi: int = 150) -> Optional[Path]:
+        """
+        Compresse un PDF : images ré-échantillonnées à image_dpi et ré-encodées en JPEG,
+        flux de contenu compressés, objets identiques fusionnés, métadonnées supprimées.
+        Les pages sont traitées une à une (une seule image décodée à la fois).
+        """
+        from PyPDF2 import PdfReader, PdfWriter
+        
         try:
+            started = time.perf_counter()
+            if self.previews:
+                # Rendu de la première page (pypdfium2) ; à défaut, la première image décodée ci-dessous
+                self.preview_from_file(input_path, input_path)
+                started = time.perf_counter()
             reader = PdfReader(input_path)
             writer = PdfWriter()
+            seen_images = set()
+            
+            total_pages = len(reader.pages)
+            for page_number, page in enumerate(reader.pages, start=1):
+                page = writer.add_page(page)
+                started = self.record_stage('decode', started)
+                
+                # Flux de contenu stockés en clair
+                contents = page.get('/Contents')
+                streams = contents.get_object() if contents is not None else []
+                if not isinstance(streams, list):
+                    streams = [streams]
+                if any('/Filter' not in stream.get_object() for stream in streams):
+                    compress_page_contents(page, writer)
+                
+                # Résolution d'affichage maximale : l'image couvre au plus toute la page
+                page_inches = max(float(page.mediabox.width), float(page.mediabox.height)) / 72
+                max_pixels = max(1, int(page_inches * image_dpi))
+                on_decoded = None
+                if self.previews and page_number == 1:
+                    on_decoded = lambda image: self.save_image_preview(image, input_path)
+                for reference in _pdf_resources_images(page.get('/Resources'), seen_images):
+                    try:
+                        recompressed = recompress_pdf_image(reference.get_object(), max_pixels, image_quality, on_decoded)
+                    except Exception as e:
+                        print(f"Image {reference.idnum} conservée ({input_path.name}): {e}")
+                        continue
+                    if recompressed is not None:
+                        writer._objects[reference.idnum - 1] = recompressed
+                started = self.record_stage('encode', started)
+                
+                self.report_progress(page_number / total_pages * 0.8)
             
-            # Copier toutes les pages
-            for page in reader.pages:
-                writer.add_page(page)
+            optimize_pdf_streams(writer)
+            started = self.record_stage('encode', started)
+            self.report_progress(0.9)
             
             # Supprimer les métadonnées
             writer.add_metadata({})
             
             # Créer le nom de fichier de sortie
-            output_path = self.output_dir / f"{input_path.stem}_compressed.pdf"
+            output_path = self.output_target(input_path, '.pdf')
             
             # Sauvegarder le PDF compressé
             with open(output_path, 'wb') as output_file:
                 writer.write(output_file)
             
+            # Document déjà optimisé : ne jamais livrer un fichier plus gros
+            if output_path.stat().st_size >= input_path.stat().st_size:
+                shutil.copyfile(input_path, output_path)
+            self.record_stage('write', started)
+            
             return output_path
             
         except Exception as e:
             print(f"Erreur lors de la compression du PDF {input_path}: {e}")
+            self.error_type = type(e).__name__
             return None
     
-    def compress_video(self, input_path: Path, bitrate: str = "1000k", resolution: Tuple[int, int] = (1280, 720)) -> Optional[Path]:
-        """Compresse une vidéo"""
+    def compress_video(self, input_path: Path, bitrate: str = "1000k", resolution: Tuple[int, int] = (1280, 720),
+                       codec: str = "h264", mode: str = "bitrate", crf: int = 23, preset: str = "medium",
+                       threads: int = 0, audio_bitrate: str = "128k") -> Optional[Path]:
+        """
+        Compresse une vidéo en un seul processus ffmpeg (décodage, mise à l'échelle, encodage).
+        mode: 'bitrate' (débit cible), 'crf' (qualité constante) ou 'two-pass' (débit cible, 2 passes)
+        """
+        temp_output = None
+        passlog_dir = None
         try:
-            # Charger la vidéo
-            video = mp.VideoFileClip(str(input_path))
+            codec_preset = VIDEO_CODECS[codec]
+            output_path = self.output_target(input_path, codec_preset['extension'])
+            # Fichier temporaire unique : plusieurs tâches peuvent encoder en parallèle
+            temp_output = self.output_dir / f".{input_path.stem}.{uuid.uuid4().hex}{codec_preset['extension']}"
             
-            # Redimensionner si nécessaire
-            if video.w > resolution[0] or video.h > resolution[1]:
-                video = video.resize(newsize=resolution)
+            # Réduire sans déformer, uniquement si la vidéo dépasse la résolution cible
+            max_width, max_height = resolution
+            scale_filter = (
+                f"scale=w='min(iw,{max_width})':h='min(ih,{max_height})'"
+                f":force_original_aspect_ratio=decrease:force_divisible_by=2"
+            )
             
-            # Créer le nom de fichier de sortie
-            output_path = self.output_dir / f"{input_path.stem}_compressed.mp4"
-            
-            # Sauvegarder la vidéo compressée
-            video.write_videofile(
-                str(output_path),
-                bitrate=bitrate,
-                audio_bitrate="128k",
-                temp_audiofile="temp-audio.m4a",
-                remove_temp=True,
-                verbose=False,
-                logger=None
+            if FFMPEG_MAX_THREADS:
+                threads = min(threads, FFMPEG_MAX_THREADS) if threads > 0 else FFMPEG_MAX_THREADS
+            video_args = ["-c:v", codec_preset['encoder'], "-threads", str(threads)] + codec_preset['args']
+            if codec != 'vp9':
+                video_args += ["-preset", preset]
+            if mode == 'crf':
+                video_args += ["-crf", str(crf)]
+                if codec == 'vp9':
+                    video_args += ["-b:v", "0"]
+            else:
+                video_args += ["-b:v", bitrate]
+            
+            # Copier la piste audio telle quelle si elle respecte déjà la cible
+            started = time.perf_counter()
+            metadata = probe_media(input_path)
+            started = self.record_stage('probe', started)
+            duration = float(metadata.get('format', {}).get('duration') or 0)
+            audio_args = audio_track_args(
+                metadata, codec_preset['audio_codecs'], codec_preset['audio_encoder'], audio_bitrate
             )
             
-            video.close()
+            input_args = ["-i", str(input_path), "-map", "0:v:0", "-map", "0:a:0?", "-vf", scale_filter]
+            # Aperçu écrit par le même processus ffmpeg, sur le flux déjà décodé
+            preview_args = []
+            if self.previews:
+                preview_path = self.preview_target(input_path)
+                preview_args = preview_output_args(preview_path)
+            
+            if mode == 'two-pass':
+                passlog_dir = tempfile.mkdtemp(prefix="ffmpeg-pass-")
+                passlog = os.path.join(passlog_dir, "pass")
+                run_ffmpeg(
+                    ["-i", str(input_path), "-map", "0:v:0", "-vf", scale_filter]
+                    + video_args + ["-pass", "1", "-passlogfile", passlog, "-an", "-f", "null", os.devnull],
+                    duration, lambda fraction: self.report_progress(fraction / 2)
+                )
+                run_ffmpeg(
+                    input_args + video_args + ["-pass", "2", "-passlogfile", passlog]
+                    + audio_args + [str(temp_output)] + preview_args,
+                    duration, lambda fraction: self.report_progress(0.5 + fraction / 2)
+                )
+            else:
+                run_ffmpeg(
+                    input_args + video_args + audio_args + [str(temp_output)] + preview_args,
+                    duration, self.report_progress
+                )
+            if preview_args:
+                self.preview_path = preview_path
+            # ffmpeg décode, redimensionne et encode en flux : une seule étape mesurable
+            started = self.record_stage('encode', started)
+            
+            os.replace(temp_output, output_path)
+            self.record_stage('write', started)
             return output_path
             
         except Exception as e:
             print(f"Erreur lors de la compression de la vidéo {input_path}: {e}")
+            self.error_type = type(e).__name__
+            return None
+        
+        finally:
+            if temp_output is not None and temp_output.exists():
+                temp_output.unlink()
+            if passlog_dir:
+                shutil.rmtree(passlog_dir, ignore_errors=True)
+    
+    def remux_video(self, input_path: Path, codec: str = "h264", audio_bitrate: str = "128k") -> Optional[Path]:
+        """Change de conteneur sans réencoder la vidéo (piste audio recopiée si elle est compatible)"""
+        temp_output = None
+        try:
+            codec_preset = VIDEO_CODECS[codec]
+            output_path = self.output_target(input_path, codec_preset['extension'])
+            temp_output = self.output_dir / f".{input_path.stem}.{uuid.uuid4().hex}{codec_preset['extension']}"
+            
+            started = time.perf_counter()
+            metadata = probe_media(input_path)
+            started = self.record_stage('probe', started)
+            duration = float(metadata.get('format', {}).get('duration') or 0)
+            audio_args = audio_track_args(
+                metadata, codec_preset['audio_codecs'], codec_preset['audio_encoder'], audio_bitrate
+            )
+            # Options du conteneur uniquement (étiquette hvc1, faststart), pas celles de l'encodeur
+            container_args = [arg for arg in codec_preset['args'] if arg in ('-tag:v', 'hvc1', '-movflags', '+faststart')]
+            
+            run_ffmpeg(
+                ["-i", str(input_path), "-map", "0:v:0", "-map", "0:a:0?", "-c:v", "copy"]
+                + container_args + audio_args + [str(temp_output)],
+                duration, self.report_progress
+            )
+            started = self.record_stage('encode', started)
+            
+            os.replace(temp_output, output_path)
+            self.record_stage('write', started)
+            return output_path
+            
+        except Exception as e:
+            print(f"Erreur lors du changement de conteneur de la vidéo {input_path}: {e}")
+            self.error_type = type(e).__name__
             return None
+        
+        finally:
+            if temp_output is not None and temp_output.exists():
+                temp_output.unlink()
     
     def compress_audio(self, input_path: Path, bitrate: str = "128k", format: str = "mp3") -> Optional[Path]:
-        """Compresse un fichier audio"""
+        """
+        Compresse un fichier audio en un seul processus ffmpeg (décodage, rééchantillonnage,
+        encodage en flux : mémoire constante quelle que soit la durée).
+        La piste est recopiée sans réencodage si elle respecte déjà le codec, le débit et la fréquence cibles.
+        """
+        temp_output = None
         try:
-            # Charger le fichier audio
-            audio = AudioSegment.from_file(input_path)
+            codec_preset = AUDIO_CODECS[format]
+            output_path = self.output_target(input_path, codec_preset['extension'])
+            # Fichier temporaire unique : plusieurs tâches peuvent encoder en parallèle
+            temp_output = self.output_dir / f".{input_path.stem}.{uuid.uuid4().hex}{codec_preset['extension']}"
             
-            # Réduire la qualité si nécessaire
-            if audio.frame_rate > 44100:
-                audio = audio.set_frame_rate(44100)
+            started = time.perf_counter()
+            metadata = probe_media(input_path)
+            started = self.record_stage('probe', started)
+            duration = float(metadata.get('format', {}).get('duration') or 0)
+            audio_streams = [
+                stream for stream in metadata.get('streams', [])
+                if stream.get('codec_type') == 'audio'
+            ]
+            if not audio_streams:
+                raise ValueError("aucune piste audio")
+            audio = audio_streams[0]
+            audio_bit_rate = int(audio.get('bit_rate') or metadata.get('format', {}).get('bit_rate') or 0)
+            sample_rate = int(audio.get('sample_rate') or 0)
             
-            # Créer le nom de fichier de sortie
-            output_path = self.output_dir / f"{input_path.stem}_compressed.{format}"
-            
-            # Sauvegarder l'audio compressé
-            audio.export(
-                output_path,
-                format=format,
-                bitrate=bitrate,
-                parameters=["-q:a", "2"]  # Qualité variable pour MP3
+            if (audio.get('codec_name') in codec_preset['codecs']
+                    and 0 < audio_bit_rate <= parse_bitrate(bitrate) * 1.1
+                    and sample_rate <= codec_preset['max_sample_rate']):
+                audio_args = ["-c:a", "copy"]
+            else:
+                audio_args = ["-c:a", codec_preset['encoder'], "-b:a", bitrate] + codec_preset['args']
+                if sample_rate > codec_preset['max_sample_rate']:
+                    audio_args += ["-ar", str(codec_preset['max_sample_rate'])]
+            
+            # Pochette et autres flux ignorés : seule la première piste audio est conservée
+            run_ffmpeg(
+                ["-i", str(input_path), "-map", "0:a:0", "-vn", "-sn", "-dn"] + audio_args + [str(temp_output)],
+                duration, self.report_progress
             )
+            started = self.record_stage('encode', started)
             
+            os.replace(temp_output, output_path)
+            self.record_stage('write', started)
             return output_path
             
         except Exception as e:
             print(f"Erreur lors de la compression de l'audio {input_path}: {e}")
+            self.error_type = type(e).__name__
             return None
+        
+        finally:
+            if temp_output is not None and temp_output.exists():
+                temp_output.unlink()
     
-    def compress_file(self, input_path: Path, **kwargs) -> Optional[Path]:
-        """Compresse un fichier selon son type"""
+    def build_compression_params(self, input_path: Path, settings: dict) -> dict:
+        """Prépare les paramètres de compression selon le type de fichier"""
         extension = input_path.suffix.lower()
         
         if extension in self.image_extensions:
-            return self.compress_image(input_path, **kwargs)
-        elif extension in self.pdf_extensions:
-            return self.compress_pdf(input_path)
+            target_size_kb = settings.get('target_size_kb')
+            return {
+                'quality': settings.get('quality', 85),
+                'max_resolution': (
+                    settings.get('max_width', 1920),
+                    settings.get('max_height', 1080)
+                ),
+                'target_size': int(target_size_kb) * 1024 if target_size_kb else None,
+                'target_ssim': settings.get('target_ssim'),
+                'output_format': settings.get('output_format', 'keep')
+            }
         elif extension in self.video_extensions:
-            return self.compress_video(input_path, **kwargs)
+            return {
+                'bitrate': settings.get('video_bitrate', '1000k'),
+                'resolution': (
+                    settings.get('max_width', 1280),
+                    settings.get('max_height', 720)
+                ),
+                'codec': settings.get('video_codec', 'h264'),
+                'mode': settings.get('video_mode', 'bitrate'),
+                'crf': settings.get('video_crf', 23),
+                'preset': settings.get('video_preset', 'medium'),
+                'threads': settings.get('video_threads', 0),
+                'audio_bitrate': settings.get('audio_bitrate', '128k')
+            }
         elif extension in self.audio_extensions:
-            return self.compress_audio(input_path, **kwargs)
-        else:
-            print(f"Type de fichier non supporté: {extension}")
+            return {
+                'bitrate': settings.get('audio_bitrate', '128k'),
+                'format': settings.get('audio_format', 'mp3')
+            }
+        elif extension in self.pdf_extensions:
+            return {
+                'image_quality': settings.get('pdf_image_quality', 75),
+                'image_dpi': settings.get('pdf_image_dpi', 150)
+            }
+        return {}
+    
+    def plan_compression(self, input_path: Path, **kwargs) -> dict:
+        """
+        Analyse rapide (en-têtes / ffprobe, sans décodage) : 'skip' si le fichier respecte déjà
+        les paramètres demandés, 'copy' si un simple recopiage des flux suffit, sinon 'compress'.
+        """
+        extension = input_path.suffix.lower()
+        try:
+            if extension in self.image_extensions:
+                decision = self._plan_image(input_path, **kwargs)
+            elif extension in self.video_extensions:
+                decision = self._plan_video(input_path, **kwargs)
+            elif extension in self.audio_extensions:
+                decision = self._plan_audio(input_path, **kwargs)
+            else:
+                decision = None
+        except Exception as e:
+            print(f"Analyse impossible pour {input_path}: {e}")
+            decision = None
+        return decision or {'action': 'compress', 'reason': None}
+    
+    def _plan_image(self, input_path: Path, quality: int = 85, max_resolution: Tuple[int, int] = (1920, 1080),
+                    target_size: Optional[int] = None, target_ssim: Optional[float] = None,
+                    output_format: str = "keep") -> Optional[dict]:
+        if target_ssim or output_format not in ('keep', IMAGE_KEEP_FORMATS.get(input_path.suffix.lower())):
             return None
+        
+        from PIL import ExifTags, Image
+        
+        with Image.open(input_path) as img:
+            width, height = img.size
+            if img.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+                width, height = height, width
+            if width > max_resolution[0] or height > max_resolution[1]:
+                return None
+            
+            if target_size:
+                if input_path.stat().st_size <= target_size:
+                    return {'action': 'skip', 'reason': f"{width}x{height}, déjà sous la taille cible"}
+                return None
+            
+            if img.format == 'JPEG' and hasattr(img, 'quantization'):
+                estimated_quality = estimate_jpeg_quality(img.quantization)
+                if estimated_quality <= quality:
+                    return {
+                        'action': 'skip',
+                        'reason': f"JPEG {width}x{height} de qualité ~{estimated_quality} (cible {quality})"
+                    }
+        return None
     
-    def compress_directory(self, input_dir: Path, **kwargs) -> None:
-        """Compresse tous les fichiers supportés dans un répertoire"""
-        supported_extensions = (
-            self.image_extensions | self.pdf_extensions | 
-            self.video_extensions | self.audio_extensions
+    def _plan_video(self, input_path: Path, bitrate: str = "1000k", resolution: Tuple[int, int] = (1280, 720),
+                    codec: str = "h264", audio_bitrate: str = "128k", **kwargs) -> Optional[dict]:
+        codec_preset = VIDEO_CODECS[codec]
+        metadata = probe_media(input_path)
+        video_streams = [stream for stream in metadata.get('streams', []) if stream.get('codec_type') == 'video']
+        if not video_streams:
+            return None
+        video = video_streams[0]
+        width, height = int(video.get('width') or 0), int(video.get('height') or 0)
+        video_bit_rate = stream_bit_rate(metadata, video)
+        
+        if (video.get('codec_name') != codec_preset['codec_name']
+                or width > resolution[0] or height > resolution[1]
+                or not 0 < video_bit_rate <= parse_bitrate(bitrate) * 1.1):
+            return None
+        
+        reason = f"{codec_preset['codec_name']} {width}x{height} à {video_bit_rate // 1000}k (cible {bitrate})"
+        audio_args = audio_track_args(
+            metadata, codec_preset['audio_codecs'], codec_preset['audio_encoder'], audio_bitrate
         )
+        has_audio = any(stream.get('codec_type') == 'audio' for stream in metadata.get('streams', []))
+        if input_path.suffix.lower() == codec_preset['extension'] and (not has_audio or audio_args == ["-c:a", "copy"]):
+            return {'action': 'skip', 'reason': reason}
+        return {'action': 'copy', 'reason': f"{reason}, vidéo recopiée sans réencodage"}
+    
+    def _plan_audio(self, input_path: Path, bitrate: str = "128k", format: str = "mp3") -> Optional[dict]:
+        codec_preset = AUDIO_CODECS[format]
+        metadata = probe_media(input_path)
+        audio_streams = [stream for stream in metadata.get('streams', []) if stream.get('codec_type') == 'audio']
+        if not audio_streams:
+            return None
+        audio = audio_streams[0]
+        audio_bit_rate = stream_bit_rate(metadata, audio)
+        sample_rate = int(audio.get('sample_rate') or 0)
+        
+        if (audio.get('codec_name') not in codec_preset['codecs']
+                or not 0 < audio_bit_rate <= parse_bitrate(bitrate) * 1.1
+                or sample_rate > codec_preset['max_sample_rate']):
+            return None
+        
+        reason = f"{audio.get('codec_name')} à {audio_bit_rate // 1000}k, {sample_rate} Hz (cible {bitrate})"
+        if input_path.suffix.lower() == codec_preset['extension']:
+            return {'action': 'skip', 'reason': reason}
+        # compress_audio recopie alors la piste dans le conteneur cible
+        return {'action': 'copy', 'reason': f"{reason}, piste recopiée sans réencodage"}
+    
+    def keep_original(self, input_path: Path) -> Path:
+        """Livre le fichier d'origine tel quel (déjà optimal)"""
+        output_path = self.output_target(input_path, input_path.suffix)
+        shutil.copyfile(input_path, output_path)
+        return output_path
+    
+    def compress_file(self, input_path: Path, **kwargs) -> Optional[Path]:
+        """
+        Compresse un fichier selon son type (en réutilisant le cache si disponible),
+        après une analyse rapide qui peut conclure qu'il n'y a rien à gagner (voir self.decision).
+        Avec previews, l'aperçu est produit au passage (voir self.preview_path).
+        Lève BackendUnavailableError si la bibliothèque nécessaire à ce format n'est pas installée.
+        """
+        self.preview_path = None
+        output_path = self._compress_file(input_path, **kwargs)
+        if self.previews and output_path is not None and self.preview_path is None:
+            # Rien n'a été décodé (cache, fichier déjà optimal, changement de conteneur)
+            self.preview_from_file(input_path, output_path)
+        return output_path
+    
+    def _compress_file(self, input_path: Path, **kwargs) -> Optional[Path]:
+        self.timings = {}
+        self.error_type = None
+        started = time.perf_counter()
+        backend = backend_for(input_path.suffix)
+        if backend is not None:
+            backend.load()
+            self.record_stage('load', started)
+            started = time.perf_counter()
+        self.decision = self.plan_compression(input_path, **kwargs)
+        self.record_stage('plan', started)
+        if self.decision['action'] == 'skip':
+            return self.keep_original(input_path)
+        if self.decision['action'] == 'copy' and input_path.suffix.lower() in self.video_extensions:
+            return self.remux_video(input_path, kwargs.get('codec', 'h264'), kwargs.get('audio_bitrate', '128k'))
+        
+        if self.cache is None or not self.is_supported(input_path):
+            return self._compress_by_type(input_path, **kwargs)
+        
+        try:
+            started = time.perf_counter()
+            cache_key = self.cache.make_key(input_path, kwargs, ENGINE_VERSION)
+            cached_path = self.cache.fetch(
+                cache_key, lambda extension: self.output_target(input_path, extension)
+            )
+            self.record_stage('cache', started)
+            if cached_path:
+                self.decision = {'action': 'cached', 'reason': None}
+                return cached_path
+        except Exception as e:
+            print(f"Cache indisponible pour {input_path}: {e}")
+            return self._compress_by_type(input_path, **kwargs)
         
-        files_to_compress = []
-        for ext in supported_extensions:
-            files_to_compress.extend(input_dir.rglob(f"*{ext}"))
+        output_path = self._compress_by_type(input_path, **kwargs)
+        
+        if output_path and output_path.exists():
+            try:
+                started = time.perf_counter()
+                self.cache.store(cache_key, output_path)
+                self.record_stage('cache', started)
+            except Exception as e:
+                print(f"Impossible de mettre en cache {output_path}: {e}")
+        
+        return output_path
+    
+    def is_supported(self, input_path: Path) -> bool:
+        """Indique si l'extension du fichier est déclarée par un backend"""
+        return backend_for(input_path.suffix) is not None
+    
+    def _compress_by_type(self, input_path: Path, **kwargs) -> Optional[Path]:
+        """Aiguille vers le compresseur correspondant au type de fichier"""
+        handlers = {
+            'image': self.compress_image,
+            'pdf': self.compress_pdf,
+            'video': self.compress_video,
+            'audio': self.compress_audio
+        }
+        handler = handlers.get(self.file_type(input_path))
+        if handler is None:
+            print(f"Type de fichier non supporté: {input_path.suffix.lower()}")
+            return None
+        return handler(input_path, **kwargs)
+    
+    def iter_supported_files(self, input_dir: Path) -> Iterator[Path]:
+        """Fichiers supportés de l'arborescence, en un seul parcours (répertoire de sortie exclu)"""
+        output_dir = self.output_dir.resolve()
+        for root, dirs, files in os.walk(input_dir):
+            # Sorties rangées sous l'entrée : ne pas les recompresser au passage suivant
+            dirs[:] = sorted(name for name in dirs if (Path(root) / name).resolve() != output_dir)
+            for name in sorted(files):
+                path = Path(root) / name
+                if self.is_supported(path):
+                    yield path
+    
+    def compress_directory(self, input_dir: Path, settings: Optional[dict] = None, jobs: int = 1,
+                           incremental: bool = False, manifest_path: Optional[Path] = None) -> None:
+        """
+        Compresse tous les fichiers supportés d'un répertoire en reproduisant ses
+        sous-dossiers dans le répertoire de sortie (pas de collision entre homonymes).
+        incremental : seuls les fichiers nouveaux, modifiés ou dont les paramètres ont changé
+        sont traités, d'après le manifeste (MANIFEST_NAME dans la sortie par défaut) ;
+        enregistré au fil de l'eau, il permet de reprendre un lot interrompu.
+        """
+        settings = settings or {}
+        files_to_compress = list(self.iter_supported_files(input_dir))
+        
+        manifest = None
+        if incremental:
+            manifest = CompressionManifest(manifest_path or self.output_dir / MANIFEST_NAME)
+            relative_paths = [path.relative_to(input_dir).as_posix() for path in files_to_compress]
+            forgotten = manifest.prune(relative_paths)
+            if forgotten:
+                print(f"{forgotten} fichier(s) disparu(s) de la source retiré(s) du manifeste")
+            
+            pending = []
+            for path, relative_path in zip(files_to_compress, relative_paths):
+                key = settings_digest(self.build_compression_params(path, settings), ENGINE_VERSION)
+                if not manifest.is_current(relative_path, path, key, self.output_dir):
+                    pending.append((path, key, source_snapshot(path)))
+            unchanged = len(files_to_compress) - len(pending)
+            if unchanged:
+                print(f"{unchanged} fichier(s) inchangé(s) depuis le dernier passage")
+            files_to_compress = [path for path, _, _ in pending]
+            manifest.save(force=True)
         
         if not files_to_compress:
-            print("Aucun fichier supporté trouvé dans le répertoire.")
+            print("Aucun fichier supporté trouvé dans le répertoire." if manifest is None else "Rien à compresser.")
             return
         
-        print(f"Trouvé {len(files_to_compress)} fichier(s) à compresser...")
+        print(f"Trouvé {len(files_to_compress)} fichier(s) à compresser ({jobs} processus)...")
         
         total_original_size = 0
         total_compressed_size = 0
         successful_compressions = 0
         
-        for file_path in files_to_compress:
-            print(f"\nCompression de: {file_path.name}")
-            original_size = self.get_file_size(file_path)
-            total_original_size += original_size
-            
-            output_path = self.compress_file(file_path, **kwargs)
-            
-            if output_path and output_path.exists():
-                compressed_size = self.get_file_size(output_path)
-                total_compressed_size += compressed_size
-                successful_compressions += 1
+        job_specs = [
+            (str(self.output_dir / file_path.relative_to(input_dir).parent), str(file_path), settings, self.cache)
+            for file_path in files_to_compress
+        ]
+        
+        try:
+            for index, job_result, error in run_compression_jobs(job_specs, jobs):
+                file_path = files_to_compress[index]
+                print(f"\nCompression de: {file_path.relative_to(input_dir)}")
+                original_size = self.get_file_size(file_path)
+                total_original_size += original_size
                 
-                compression_ratio = (1 - compressed_size / original_size) * 100
-                print(f"✓ Compressé: {self.format_size(original_size)} → {self.format_size(compressed_size)} ({compression_ratio:.1f}% de réduction)")
-            else:
-                print("✗ Échec de la compression")
+                output_path = Path(job_result['output_path']) if job_result and job_result['output_path'] else None
+                if job_result and job_result['action'] in ('skip', 'copy'):
+                    print(f"  Analyse ({job_result['action']}): {job_result['reason']}")
+                
+                if output_path and output_path.exists():
+                    compressed_size = self.get_file_size(output_path)
+                    total_compressed_size += compressed_size
+                    successful_compressions += 1
+                    
+                    compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+                    print(f"✓ Compressé: {self.format_size(original_size)} → {self.format_size(compressed_size)} ({compression_ratio:.1f}% de réduction)")
+                    
+                    if manifest is not None:
+                        _, key, (stat, digest) = pending[index]
+                        manifest.record(
+                            file_path.relative_to(input_dir).as_posix(), stat, digest, key,
+                            output_path, self.output_dir, job_result['action']
+                        )
+                        manifest.save()
+                elif error:
+                    print(f"✗ Échec de la compression: {error}")
+                else:
+                    print("✗ Échec de la compression")
+        finally:
+            # Interruption comprise : les fichiers terminés ne seront pas retraités
+            if manifest is not None:
+                manifest.save(force=True)
         
         # Statistiques finales
         if successful_compressions > 0:
-            total_compression_ratio = (1 - total_compressed_size / total_original_size) * 100
+            total_compression_ratio = (1 - total_compressed_size / total_original_size) * 100 if total_original_size > 0 else 0
             print(f"\n{'='*50}")
             print(f"RÉSUMÉ DE LA COMPRESSION:")
             print(f"Fichiers traités: {successful_compressions}/{len(files_to_compress)}")
@@ -240,16 +1590,296 @@ class FileCompressor:
             print(f"Fichiers sauvegardés dans: {self.output_dir}")
 
 
+def compress_file_job(output_dir: str, input_path: str, settings: dict, cache: Optional[ResultCache] = None,
+                      previews: bool = False, progress_callback: Optional[Callable[[float], None]] = None) -> dict:
+    """
+    Compresse un fichier isolément (exécutable dans un processus du pool).
+    Renvoie {'output_path': chemin ou None, 'action': ..., 'reason': ..., 'file_type': ...,
+    'timings': durée de chaque étape en secondes, 'error_type': classe de l'erreur éventuelle,
+    'preview_path': aperçu (avec previews) ou None}
+    """
+    compressor = FileCompressor(output_dir, cache, progress_callback, previews)
+    file_path = Path(input_path)
+    params = compressor.build_compression_params(file_path, settings)
+    compressor.report_progress(0.0)
+    output_path = compressor.compress_file(file_path, **params)
+    decision = compressor.decision or {'action': 'compress', 'reason': None}
+    return {
+        'output_path': str(output_path) if output_path else None,
+        **decision,
+        'file_type': compressor.file_type(file_path),
+        'timings': compressor.timings,
+        'error_type': compressor.error_type,
+        'preview_path': str(compressor.preview_path) if compressor.preview_path else None
+    }
+
+
+# File de progression partagée avec les processus du pool (définie par l'initialiseur)
+_progress_queue = None
+
+
+def init_progress_queue(queue) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+def init_pool_process(queue, ffmpeg_threads: int) -> None:
+    """Initialiseur des processus d'un CompressionPool"""
+    global FFMPEG_MAX_THREADS
+    init_progress_queue(queue)
+    FFMPEG_MAX_THREADS = ffmpeg_threads
+
+
+# Erreurs des compresseurs (error_type) qui traduisent un dépassement de ressources
+RESOURCE_ERROR_TYPES = {'MemoryError', '_ArrayMemoryError', 'DecompressionBombError', 'DecompressionBombWarning'}
+
+
+def compress_file_job_in_pool(key, spec: tuple, limits: Optional[Tuple[Optional[int], Optional[float]]] = None) -> dict:
+    """
+    Exécute une tâche dans le pool en renvoyant sa progression au processus parent,
+    sous la forme (key, fraction) ; key identifie la tâche (index du fichier, id de job...).
+    limits = (mémoire en octets, durée en secondes), voir job_limits ; un dépassement
+    lève ResourceLimitError.
+    """
+    progress_callback = None
+    if _progress_queue is not None:
+        progress_callback = lambda fraction: _progress_queue.put((key, fraction))
+    memory_limit, time_limit = limits or (None, None)
+    with job_limits(memory_limit, time_limit):
+        result = compress_file_job(*spec, progress_callback=progress_callback)
+    # Les compresseurs interceptent leurs erreurs : un manque de mémoire n'y est qu'un error_type
+    if result['error_type'] in ('MemoryError', '_ArrayMemoryError'):
+        limit = f" : limite de {memory_limit // (1024 * 1024)} Mo dépassée" if memory_limit else ""
+        raise ResourceLimitError(f"Mémoire insuffisante{limit}")
+    if result['error_type'] in RESOURCE_ERROR_TYPES:
+        raise ResourceLimitError(f"Image trop grande : plus de {IMAGE_MAX_PIXELS} pixels")
+    return result
+
+
+def estimate_job_memory(input_path: str, settings: dict) -> int:
+    """
+    Estimation grossière de la mémoire nécessaire à un fichier, à partir d'une lecture
+    rapide de ses en-têtes (dimensions de l'image ou de la vidéo, taille du PDF).
+    Sert à l'admission des fichiers dans le budget mémoire, pas à leur limite.
+    """
+    path = Path(input_path)
+    try:
+        file_type = file_type_for(path.suffix)
+        if file_type == 'image':
+            from PIL import Image
+            backend_for(path.suffix).load()
+            # Lecture paresseuse : seul l'en-tête est décodé. Image source en RGBA,
+            # copie convertie et redimensionnée, encodages d'essai
+            with Image.open(path) as image:
+                width, height = image.size
+            return JOB_BASE_MEMORY + width * height * 4 * 3
+        if file_type == 'pdf':
+            # Le PDF est chargé entier, ses images décodées une à une
+            return JOB_BASE_MEMORY + path.stat().st_size * 3
+        if file_type == 'video':
+            stream = next(s for s in probe_media(path)['streams'] if s.get('codec_type') == 'video')
+            # Images YUV 4:2:0 en attente dans les décodeurs, filtres et l'encodeur
+            return FFMPEG_BASE_MEMORY + int(stream['width'] * stream['height'] * 1.5 * VIDEO_BUFFERED_FRAMES)
+        if file_type == 'audio':
+            return FFMPEG_BASE_MEMORY
+    except Exception:
+        pass
+    return JOB_BASE_MEMORY
+
+
+class CompressionPool:
+    """
+    Pool de processus de compression, partagé par tous les appels à run_compression_jobs
+    d'un processus (toutes tâches et voies confondues) : au plus size fichiers à la fois.
+    Les processus sont tous créés dès la construction, avant que l'appelant ne démarre
+    ses threads ; ffmpeg y est limité à ffmpeg_threads threads (0 = automatique).
+    Un pool cassé (processus tué) est remplacé par renew().
+    """
+    
+    def __init__(self, size: int, ffmpeg_threads: int = 0):
+        self.size = max(1, size)
+        self.ffmpeg_threads = ffmpeg_threads
+        self._progress_queue = multiprocessing.Queue()
+        self._listeners = {}  # appel -> on_progress(index, fraction)
+        self._calls = itertools.count()
+        self._lock = threading.Lock()
+        self.executor = self._new_executor()
+        # Premier envoi : avec fork, tous les processus du pool sont lancés à ce moment
+        self.executor.submit(os.getpid).result()
+        self._progress_thread = threading.Thread(target=self._drain_progress, name='compression-pool-progress', daemon=True)
+        self._progress_thread.start()
+    
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            initializer=init_pool_process,
+            initargs=(self._progress_queue, self.ffmpeg_threads)
+        )
+    
+    def renew(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Remplace le pool cassé, une seule fois même si plusieurs appels l'ont constaté"""
+        with self._lock:
+            if self.executor is broken:
+                broken.shutdown(wait=False)
+                self.executor = self._new_executor()
+            return self.executor
+    
+    def listen(self, on_progress: Callable[[int, float], None]) -> int:
+        """Inscrit le suivi de progression d'un appel ; retourne la clé à joindre à ses tâches"""
+        call = next(self._calls)
+        self._listeners[call] = on_progress
+        return call
+    
+    def forget(self, call: int) -> None:
+        self._listeners.pop(call, None)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+        self._progress_queue.put(None)
+        if wait:
+            self._progress_thread.join()
+    
+    def _drain_progress(self) -> None:
+        for (call, index), fraction in iter(self._progress_queue.get, None):
+            on_progress = self._listeners.get(call)
+            if on_progress is None:
+                continue
+            try:
+                on_progress(index, fraction)
+            except Exception as e:
+                print(f"Erreur de progression: {e}")
+
+
+def run_compression_jobs(job_specs: List[tuple], jobs: int = 1,
+                         on_progress: Optional[Callable[[int, float], None]] = None,
+                         budget: Optional["MemoryBudget"] = None,
+                         limits: Optional[Tuple[Optional[int], Optional[float]]] = None,
+                         pool: Optional[CompressionPool] = None
+                         ) -> Iterator[Tuple[int, Optional[dict], Optional[Exception]]]:
+    """
+    Exécute des tâches (output_dir, input_path, settings[, cache[, previews]]) et renvoie
+    (index, résultat de compress_file_job, erreur) au fur et à mesure qu'elles se terminent.
+    Avec jobs > 1, les fichiers sont traités en parallèle par un pool de processus
+    (Pillow/PyPDF2 ne sont ainsi pas limités par le GIL) : pool s'il est fourni (partagé
+    avec d'autres appels), sinon un pool créé pour l'occasion.
+    on_progress(index, fraction) reçoit la progression interne de chaque fichier.
+    budget (scheduler.MemoryBudget, partageable entre plusieurs appels) : un fichier ne démarre
+    que si sa mémoire estimée y tient, jobs reste le nombre maximal de fichiers simultanés.
+    limits = (mémoire, durée) plafonne chaque fichier (voir job_limits) ; les fichiers passent
+    alors toujours par le pool, les limites ne devant pas s'appliquer au processus appelant.
+    """
+    isolated = pool is not None or budget is not None or limits is not None
+    if not isolated and (jobs <= 1 or len(job_specs) <= 1):
+        for index, spec in enumerate(job_specs):
+            progress_callback = None
+            if on_progress is not None:
+                progress_callback = lambda fraction, index=index: on_progress(index, fraction)
+            try:
+                yield index, compress_file_job(*spec, progress_callback=progress_callback), None
+            except Exception as e:
+                yield index, None, e
+        return
+    
+    jobs = max(1, min(jobs, len(job_specs)))
+    owned = pool is None
+    if owned:
+        pool = CompressionPool(jobs)
+    call = pool.listen(on_progress) if on_progress is not None else None
+    try:
+        yield from _run_admitted_jobs(pool, call, job_specs, jobs, budget, limits)
+    finally:
+        if owned:
+            pool.shutdown()
+        if call is not None:
+            pool.forget(call)
+
+
+def _run_admitted_jobs(pool: CompressionPool, call: Optional[int], job_specs: List[tuple], jobs: int,
+                       budget: Optional["MemoryBudget"], limits: Optional[tuple]
+                       ) -> Iterator[Tuple[int, Optional[dict], Optional[Exception]]]:
+    """
+    Soumet les tâches dans l'ordre, au plus jobs à la fois et dans la limite
+    du budget mémoire, et renvoie les résultats à mesure.
+    Si un processus du pool meurt (mémoire, signal), les fichiers alors en cours sont
+    en erreur (ResourceLimitError) et les suivants continuent dans un nouveau pool.
+    """
+    # [index, spec, mémoire estimée ou None]
+    pending = collections.deque([index, spec, None] for index, spec in enumerate(job_specs))
+    futures = {}  # future -> (index, mémoire réservée, pool)
+    try:
+        while pending or futures:
+            # Admission dans l'ordre : un gros fichier n'est pas doublé indéfiniment par de petits
+            while pending and len(futures) < jobs:
+                entry = pending[0]
+                if budget is not None:
+                    if entry[2] is None:
+                        entry[2] = estimate_job_memory(entry[1][1], entry[1][2])
+                    if not budget.try_acquire(entry[2]):
+                        break
+                pending.popleft()
+                index, spec, cost = entry
+                executor = pool.executor
+                try:
+                    future = executor.submit(compress_file_job_in_pool, (call, index), spec, limits)
+                except BrokenProcessPool:
+                    # Pool cassé avant que l'échec de ses fichiers n'ait été constaté
+                    executor = pool.renew(executor)
+                    future = executor.submit(compress_file_job_in_pool, (call, index), spec, limits)
+                futures[future] = (index, cost, executor)
+            
+            if not futures:
+                if pending:
+                    # Budget occupé par d'autres tâches
+                    budget.wait(1.0)
+                continue
+            done, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, cost, executor = futures.pop(future)
+                if budget is not None:
+                    budget.release(cost)
+                try:
+                    yield index, future.result(), None
+                except BrokenProcessPool:
+                    # Un processus du pool est mort : le pool est inutilisable
+                    pool.renew(executor)
+                    yield index, None, ResourceLimitError("Processus de compression arrêté (mémoire ou signal)")
+                except Exception as e:
+                    yield index, None, e
+    finally:
+        # Appelant interrompu : les fichiers pas encore démarrés ne le seront pas (pool partagé)
+        # et la mémoire de ceux encore en cours est rendue au budget
+        for future, (index, cost, executor) in futures.items():
+            future.cancel()
+            if budget is not None:
+                budget.release(cost)
+
+
 def main():
     """Fonction principale"""
     parser = argparse.ArgumentParser(description="Compresseur de fichiers multimédia")
     parser.add_argument("input", help="Fichier ou répertoire à compresser")
     parser.add_argument("-o", "--output", default="compressed", help="Répertoire de sortie (défaut: compressed)")
     parser.add_argument("-q", "--quality", type=int, default=85, help="Qualité pour images (1-100, défaut: 85)")
+    parser.add_argument("--target-size", type=int, help="Taille cible des images en Ko (qualité ajustée automatiquement)")
+    parser.add_argument("--target-ssim", type=float, help="Similarité minimale des images (SSIM 0-1, ex: 0.95)")
+    parser.add_argument("--image-format", choices=["keep", "auto"] + sorted(f for f in IMAGE_OUTPUT_FORMATS if f != "png-quantized"), default="keep", help="Format de sortie des images (défaut: keep)")
     parser.add_argument("--video-bitrate", default="1000k", help="Bitrate vidéo (défaut: 1000k)")
+    parser.add_argument("--video-codec", choices=sorted(VIDEO_CODECS), default="h264", help="Codec vidéo (défaut: h264)")
+    parser.add_argument("--video-mode", choices=["bitrate", "crf", "two-pass"], default="bitrate", help="Mode d'encodage vidéo (défaut: bitrate)")
+    parser.add_argument("--video-crf", type=int, default=23, help="CRF en mode crf (défaut: 23)")
+    parser.add_argument("--video-preset", default="medium", help="Préréglage x264/x265 (défaut: medium)")
+    parser.add_argument("--video-threads", type=int, default=0, help="Threads ffmpeg par vidéo (0 = auto)")
     parser.add_argument("--audio-bitrate", default="128k", help="Bitrate audio (défaut: 128k)")
+    parser.add_argument("--audio-format", choices=sorted(AUDIO_CODECS), default="mp3", help="Format audio (défaut: mp3)")
+    parser.add_argument("--pdf-image-quality", type=int, default=75, help="Qualité JPEG des images de PDF (défaut: 75)")
+    parser.add_argument("--pdf-image-dpi", type=int, default=150, help="Résolution max des images de PDF (défaut: 150)")
     parser.add_argument("--max-width", type=int, default=1920, help="Largeur max pour images/vidéos (défaut: 1920)")
     parser.add_argument("--max-height", type=int, default=1080, help="Hauteur max pour images/vidéos (défaut: 1080)")
+    parser.add_argument("--cache-dir", help="Répertoire du cache de résultats (désactivé par défaut)")
+    parser.add_argument("--cache-size", type=int, default=2048, help="Taille max du cache en Mo (défaut: 2048)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Nombre de processus de compression en parallèle (0 = tous les cœurs, défaut: 1)")
+    parser.add_argument("--incremental", action="store_true", help="Répertoire : ne traiter que les fichiers nouveaux ou modifiés depuis le dernier passage")
+    parser.add_argument("--manifest", help=f"Manifeste du mode incrémental (défaut: <sortie>/{MANIFEST_NAME})")
     
     args = parser.parse_args()
     
@@ -259,21 +1889,39 @@ def main():
         sys.exit(1)
     
     # Créer le compresseur
-    compressor = FileCompressor(args.output)
+    cache = ResultCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    compressor = FileCompressor(args.output, cache)
     
     # Paramètres de compression
-    compression_params = {
+    settings = {
         'quality': args.quality,
-        'bitrate': args.video_bitrate,
-        'max_resolution': (args.max_width, args.max_height)
+        'target_size_kb': args.target_size,
+        'target_ssim': args.target_ssim,
+        'output_format': args.image_format,
+        'video_bitrate': args.video_bitrate,
+        'video_codec': args.video_codec,
+        'video_mode': args.video_mode,
+        'video_crf': args.video_crf,
+        'video_preset': args.video_preset,
+        'video_threads': args.video_threads,
+        'audio_bitrate': args.audio_bitrate,
+        'audio_format': args.audio_format,
+        'pdf_image_quality': args.pdf_image_quality,
+        'pdf_image_dpi': args.pdf_image_dpi,
+        'max_width': args.max_width,
+        'max_height': args.max_height
     }
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
     # Compresser
     if input_path.is_file():
         print(f"Compression du fichier: {input_path}")
         original_size = compressor.get_file_size(input_path)
         
+        compression_params = compressor.build_compression_params(input_path, settings)
         output_path = compressor.compress_file(input_path, **compression_params)
+        if compressor.decision['action'] in ('skip', 'copy'):
+            print(f"Analyse ({compressor.decision['action']}): {compressor.decision['reason']}")
         
         if output_path and output_path.exists():
             compressed_size = compressor.get_file_size(output_path)
@@ -289,7 +1937,10 @@ def main():
             
     elif input_path.is_dir():
         print(f"Compression du répertoire: {input_path}")
-        compressor.compress_directory(input_path, **compression_params)
+        compressor.compress_directory(
+            input_path, settings, jobs=jobs,
+            incremental=args.incremental, manifest_path=Path(args.manifest) if args.manifest else None
+        )
     
     else:
         print("Erreur: L'entrée n'est ni un fichier ni un répertoire valide.")
@@ -0,0 +1,49 @@
+# backend/gunicorn.conf.py
+"""
+Configuration gunicorn pour la production : gunicorn -c backend/gunicorn.conf.py
+Workers à threads (gthread) : chaque upload, téléchargement ou flux SSE occupe un
+thread sans bloquer le processus. L'état des tâches est partagé entre les workers
+par le stockage des tâches (TASK_STORE_URL) ; chaque worker possède son propre
+ordonnanceur (SCHEDULER_*_WORKERS s'entendent donc par worker).
+"""
+
+import os
+import sys
+
+wsgi_app = 'app:app'
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('WEB_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 16))
+
+# Avec gthread, le battement du worker ne dépend pas de la durée des requêtes :
+# un long upload ou téléchargement ne provoque pas de redémarrage
+timeout = 120
+keepalive = 5
+
+# Temps laissé aux compressions en cours pour se terminer à l'arrêt (SIGTERM)
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 600))
+
+# Battement en mémoire : un disque lent (overlayfs) ne fait pas passer le worker pour bloqué
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Pas de préchargement : l'ordonnanceur et le nettoyage démarrent des threads,
+# qui ne survivraient pas au fork des workers
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Vidange de l'ordonnanceur avant la sortie du worker (appelé juste après SIGTERM)"""
+    # Le hook est aussi appelé par l'arbitre pour un worker déjà disparu : rien à vidanger
+    application = sys.modules.get('app')
+    if application is None or worker.pid != os.getpid():
+        return
+    # Marge pour marquer les tâches interrompues avant le SIGKILL de l'arbitre
+    application.drain(max(0, graceful_timeout - 10))
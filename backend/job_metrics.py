@@ -0,0 +1,40 @@
+# backend/job_metrics.py
+"""
+Métriques des fichiers compressés, communes à l'application web (ordonnanceur local)
+et aux workers de la file (worker.py) : mêmes noms, quel que soit le mode d'exécution
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from metrics import BYTES_BUCKETS, counter, histogram
+
+stage_seconds = histogram(
+    'compressor_stage_seconds', "Durée des étapes de traitement d'un fichier", ('stage', 'file_type')
+)
+queue_wait_seconds = histogram(
+    'compressor_queue_wait_seconds', "Attente des tâches dans la file de l'ordonnanceur", ('lane',)
+)
+input_bytes = histogram('compressor_input_bytes', "Taille des fichiers reçus", ('file_type',), BYTES_BUCKETS)
+output_bytes = histogram('compressor_output_bytes', "Taille des fichiers produits", ('file_type',), BYTES_BUCKETS)
+files_total = counter('compressor_files_total', "Fichiers traités, par décision", ('file_type', 'action'))
+errors_total = counter('compressor_errors_total', "Échecs de compression, par type d'erreur", ('file_type', 'error'))
+
+
+def record_job_metrics(file_type: str, file_info: dict, job_result: Optional[dict], error: Optional[Exception]) -> None:
+    """Durées par étape, tailles et décision (ou type d'erreur) d'un fichier traité"""
+    if error is not None:
+        errors_total.inc(file_type=file_type, error=type(error).__name__)
+        return
+
+    for stage, seconds in job_result.get('timings', {}).items():
+        stage_seconds.observe(seconds, stage=stage, file_type=file_type)
+
+    output_path = Path(job_result['output_path']) if job_result['output_path'] else None
+    if output_path is None or not output_path.exists():
+        errors_total.inc(file_type=file_type, error=job_result.get('error_type') or 'CompressionFailed')
+        return
+
+    input_bytes.observe(file_info['size'], file_type=file_type)
+    output_bytes.observe(output_path.stat().st_size, file_type=file_type)
+    files_total.inc(file_type=file_type, action=job_result['action'])
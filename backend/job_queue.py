@@ -0,0 +1,406 @@
+# backend/job_queue.py
+"""
+File d'attente partagée des compressions, à la granularité du fichier
+Consommée par les workers (worker.py) : réservation atomique, battements de cœur,
+nouvelle tentative si un worker disparaît. SQLite en local, Redis entre plusieurs machines.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class JobQueue:
+    """
+    Interface commune des files de tâches.
+    Un job est un dict {'job_id', 'task_id', 'lane', 'payload', 'attempts'} ;
+    il reste en file (queued) ou réservé (running) jusqu'à complete() ou abandon.
+    """
+
+    def __init__(self, lanes: Sequence[str] = ('light', 'heavy'), max_attempts: int = 3):
+        self.lanes = tuple(lanes)
+        self.max_attempts = max_attempts
+
+    def enqueue(self, task_id: str, lane: str, payload: dict, priority: int = 0) -> str:
+        """Ajoute un job (0 = plus prioritaire) et retourne son identifiant"""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, lanes: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Réserve le prochain job des voies demandées, None si la file est vide"""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id: str, job_ids: Sequence[str]) -> None:
+        """Signale que les jobs réservés par ce worker sont toujours en cours"""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """Retire un job terminé ; False s'il avait été repris par un autre worker"""
+        raise NotImplementedError
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """
+        Rend un job interrompu (crash du processus de compression) : remis en file
+        tant qu'il reste des tentatives. Retourne False si le job est abandonné.
+        """
+        raise NotImplementedError
+
+    def reclaim_stale(self, timeout: float) -> List[dict]:
+        """
+        Remet en file les jobs dont le worker ne donne plus signe de vie depuis timeout
+        secondes. Retourne les jobs abandonnés (tentatives épuisées), déjà retirés de la file.
+        """
+        raise NotImplementedError
+
+    def cancel_task(self, task_id: str) -> None:
+        """Retire tous les jobs d'une tâche (suppression de la tâche)"""
+        raise NotImplementedError
+
+    def position(self, task_id: str) -> Optional[int]:
+        """Position du premier job en attente de la tâche dans sa voie (1 = prochain)"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, dict]:
+        """Jobs en attente et en cours, par voie"""
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """File SQLite (mode WAL) : workers d'une même machine, ou démonstration locale"""
+
+    def __init__(self, db_path: str, lanes: Sequence[str] = ('light', 'heavy'), max_attempts: int = 3):
+        super().__init__(lanes, max_attempts)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, task_id TEXT NOT NULL, lane TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, created_at REAL NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker_id TEXT, heartbeat_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, lane, priority, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_task ON jobs (task_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaction en écriture (verrou pris dès le début : deux workers ne réservent jamais le même job)"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    @contextmanager
+    def _query(self) -> Iterator[sqlite3.Connection]:
+        db = self._connect()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def enqueue(self, task_id, lane, payload, priority=0):
+        job_id = str(uuid.uuid4())
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, task_id, lane, priority, created_at, payload, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued')",
+                (job_id, task_id, lane, priority, time.time(), json.dumps(payload))
+            )
+        return job_id
+
+    def claim(self, worker_id, lanes=None):
+        lanes = tuple(lanes or self.lanes)
+        placeholders = ", ".join("?" * len(lanes))
+        with self._transaction() as db:
+            row = db.execute(
+                f"SELECT job_id, task_id, lane, payload, attempts FROM jobs "
+                f"WHERE status = 'queued' AND lane IN ({placeholders}) "
+                f"ORDER BY priority, created_at LIMIT 1",
+                lanes
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE job_id = ?",
+                (worker_id, time.time(), row[0])
+            )
+        return {'job_id': row[0], 'task_id': row[1], 'lane': row[2], 'payload': json.loads(row[3]), 'attempts': row[4] + 1}
+
+    def heartbeat(self, worker_id, job_ids):
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" * len(job_ids))
+        with self._transaction() as db:
+            db.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE worker_id = ? AND status = 'running' AND job_id IN ({placeholders})",
+                (time.time(), worker_id, *job_ids)
+            )
+
+    def complete(self, job_id, worker_id):
+        with self._transaction() as db:
+            deleted = db.execute(
+                "DELETE FROM jobs WHERE job_id = ? AND worker_id = ? AND status = 'running'", (job_id, worker_id)
+            ).rowcount
+        return deleted > 0
+
+    def release(self, job_id, worker_id):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM jobs WHERE job_id = ? AND worker_id = ? AND status = 'running'", (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] >= self.max_attempts:
+                db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                return False
+            db.execute(
+                "UPDATE jobs SET status = 'queued', worker_id = NULL, heartbeat_at = NULL WHERE job_id = ?", (job_id,)
+            )
+        return True
+
+    def reclaim_stale(self, timeout):
+        abandoned = []
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT job_id, task_id, lane, payload, attempts FROM jobs WHERE status = 'running' AND heartbeat_at < ?",
+                (time.time() - timeout,)
+            ).fetchall()
+            for job_id, task_id, lane, payload, attempts in rows:
+                if attempts >= self.max_attempts:
+                    db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                    abandoned.append({
+                        'job_id': job_id, 'task_id': task_id, 'lane': lane,
+                        'payload': json.loads(payload), 'attempts': attempts
+                    })
+                else:
+                    db.execute(
+                        "UPDATE jobs SET status = 'queued', worker_id = NULL, heartbeat_at = NULL WHERE job_id = ?",
+                        (job_id,)
+                    )
+        return abandoned
+
+    def cancel_task(self, task_id):
+        with self._transaction() as db:
+            db.execute("DELETE FROM jobs WHERE task_id = ?", (task_id,))
+
+    def position(self, task_id):
+        with self._query() as db:
+            row = db.execute(
+                "SELECT lane, priority, created_at FROM jobs WHERE task_id = ? AND status = 'queued' "
+                "ORDER BY priority, created_at LIMIT 1",
+                (task_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            ahead = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND lane = ? "
+                "AND (priority < ? OR (priority = ? AND created_at < ?))",
+                (row[0], row[1], row[1], row[2])
+            ).fetchone()[0]
+        return ahead + 1
+
+    def stats(self):
+        stats = {lane: {'queued': 0, 'running': 0} for lane in self.lanes}
+        with self._query() as db:
+            for lane, status, count in db.execute("SELECT lane, status, COUNT(*) FROM jobs GROUP BY lane, status"):
+                stats.setdefault(lane, {'queued': 0, 'running': 0})[status] = count
+        return stats
+
+    def ping(self):
+        with self._query() as db:
+            db.execute("SELECT 1").fetchone()
+        return True
+
+
+class RedisJobQueue(JobQueue):
+    """
+    File Redis, partagée entre machines. Un job est un hash ; les jobs en attente sont
+    classés par voie dans un ensemble trié (priorité puis ordre d'arrivée), les jobs
+    réservés dans un ensemble trié par date du dernier battement de cœur.
+    """
+
+    def __init__(self, url: str, lanes: Sequence[str] = ('light', 'heavy'), max_attempts: int = 3,
+                 prefix: str = "compressor"):
+        if redis is None:
+            raise RuntimeError("La file Redis nécessite le paquet redis (pip install redis)")
+        super().__init__(lanes, max_attempts)
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _score(self, priority: int) -> float:
+        # Priorité d'abord, puis ordre d'arrivée (compteur global)
+        return priority * 1e12 + self.client.incr(self._key("jobs", "sequence"))
+
+    def enqueue(self, task_id, lane, payload, priority=0):
+        job_id = str(uuid.uuid4())
+        score = self._score(priority)
+        pipe = self.client.pipeline()
+        pipe.hset(self._key("job", job_id), mapping={
+            'task_id': task_id, 'lane': lane, 'priority': priority, 'score': score,
+            'payload': json.dumps(payload), 'status': 'queued', 'attempts': 0, 'worker_id': ''
+        })
+        pipe.zadd(self._key("jobs", "queued", lane), {job_id: score})
+        pipe.sadd(self._key("task-jobs", task_id), job_id)
+        pipe.execute()
+        return job_id
+
+    def claim(self, worker_id, lanes=None):
+        lanes = tuple(lanes or self.lanes)
+        queued_keys = [self._key("jobs", "queued", lane) for lane in lanes]
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*queued_keys)
+                    heads = []
+                    for lane, key in zip(lanes, queued_keys):
+                        head = pipe.zrange(key, 0, 0, withscores=True)
+                        if head:
+                            heads.append((head[0][1], lane, head[0][0]))
+                    if not heads:
+                        pipe.unwatch()
+                        return None
+                    _, lane, job_id = min(heads)
+                    job_key = self._key("job", job_id)
+                    pipe.multi()
+                    pipe.zrem(self._key("jobs", "queued", lane), job_id)
+                    pipe.zadd(self._key("jobs", "running"), {job_id: time.time()})
+                    pipe.hset(job_key, mapping={'status': 'running', 'worker_id': worker_id})
+                    pipe.hincrby(job_key, 'attempts', 1)
+                    pipe.hgetall(job_key)
+                    data = pipe.execute()[-1]
+                    return {
+                        'job_id': job_id, 'task_id': data['task_id'], 'lane': data['lane'],
+                        'payload': json.loads(data['payload']), 'attempts': int(data['attempts'])
+                    }
+                except redis.WatchError:
+                    continue
+
+    def heartbeat(self, worker_id, job_ids):
+        now = time.time()
+        for job_id in job_ids:
+            if self.client.hget(self._key("job", job_id), 'worker_id') == worker_id:
+                self.client.zadd(self._key("jobs", "running"), {job_id: now}, xx=True)
+
+    def _finish(self, job_id: str, worker_id: Optional[str], requeue: bool) -> Optional[dict]:
+        """Retire un job réservé (ou le remet en file) ; None s'il n'appartient plus à worker_id"""
+        job_key = self._key("job", job_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(job_key)
+                    data = pipe.hgetall(job_key)
+                    if not data or data['status'] != 'running' or (worker_id is not None and data['worker_id'] != worker_id):
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.zrem(self._key("jobs", "running"), job_id)
+                    if requeue:
+                        pipe.hset(job_key, mapping={'status': 'queued', 'worker_id': ''})
+                        pipe.zadd(self._key("jobs", "queued", data['lane']), {job_id: float(data['score'])})
+                    else:
+                        pipe.delete(job_key)
+                        pipe.srem(self._key("task-jobs", data['task_id']), job_id)
+                    pipe.execute()
+                    return data
+                except redis.WatchError:
+                    continue
+
+    def complete(self, job_id, worker_id):
+        return self._finish(job_id, worker_id, requeue=False) is not None
+
+    def release(self, job_id, worker_id):
+        attempts = self.client.hget(self._key("job", job_id), 'attempts')
+        if attempts is None:
+            return False
+        requeue = int(attempts) < self.max_attempts
+        return self._finish(job_id, worker_id, requeue=requeue) is not None and requeue
+
+    def reclaim_stale(self, timeout):
+        abandoned = []
+        stale = self.client.zrangebyscore(self._key("jobs", "running"), '-inf', time.time() - timeout)
+        for job_id in stale:
+            attempts = self.client.hget(self._key("job", job_id), 'attempts')
+            if attempts is None:
+                self.client.zrem(self._key("jobs", "running"), job_id)
+                continue
+            requeue = int(attempts) < self.max_attempts
+            data = self._finish(job_id, None, requeue=requeue)
+            if data is not None and not requeue:
+                abandoned.append({
+                    'job_id': job_id, 'task_id': data['task_id'], 'lane': data['lane'],
+                    'payload': json.loads(data['payload']), 'attempts': int(data['attempts'])
+                })
+        return abandoned
+
+    def cancel_task(self, task_id):
+        job_ids = self.client.smembers(self._key("task-jobs", task_id))
+        pipe = self.client.pipeline()
+        for job_id in job_ids:
+            pipe.delete(self._key("job", job_id))
+            pipe.zrem(self._key("jobs", "running"), job_id)
+            for lane in self.lanes:
+                pipe.zrem(self._key("jobs", "queued", lane), job_id)
+        pipe.delete(self._key("task-jobs", task_id))
+        pipe.execute()
+
+    def position(self, task_id):
+        best = None
+        for job_id in self.client.smembers(self._key("task-jobs", task_id)):
+            lane = self.client.hget(self._key("job", job_id), 'lane')
+            rank = self.client.zrank(self._key("jobs", "queued", lane), job_id) if lane else None
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return None if best is None else best + 1
+
+    def stats(self):
+        stats = {lane: {'queued': self.client.zcard(self._key("jobs", "queued", lane)), 'running': 0} for lane in self.lanes}
+        for job_id in self.client.zrange(self._key("jobs", "running"), 0, -1):
+            lane = self.client.hget(self._key("job", job_id), 'lane')
+            if lane in stats:
+                stats[lane]['running'] += 1
+        return stats
+
+    def ping(self):
+        return bool(self.client.ping())
+
+
+def create_job_queue(url: str, lanes: Sequence[str] = ('light', 'heavy'), max_attempts: int = 3) -> JobQueue:
+    """Crée la file à partir d'une URL : sqlite:////chemin/jobs.db ou redis://hôte:6379/0"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        # Convention SQLAlchemy : sqlite:///relatif.db, sqlite:////absolu.db
+        return SQLiteJobQueue(parsed.path[1:], lanes, max_attempts)
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisJobQueue(url, lanes, max_attempts)
+    raise ValueError(f"File de tâches non supportée: {url}")
@@ -0,0 +1,151 @@
+# backend/manifest.py
+"""
+Manifeste du mode incrémental de compression de répertoire
+Pour chaque fichier source : taille, date de modification, empreinte, paramètres
+et fichier produit. Enregistré de façon atomique pour pouvoir reprendre un lot interrompu.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+MANIFEST_NAME = ".compress-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Empreinte SHA-256 du contenu, lu par morceaux"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_snapshot(path: Path, attempts: int = 3) -> tuple:
+    """
+    (stat, empreinte) relevés ensemble avant la compression : la lecture est recommencée
+    si le fichier change pendant le calcul de l'empreinte
+    """
+    for _ in range(attempts):
+        stat = path.stat()
+        digest = file_digest(path)
+        after = path.stat()
+        if (after.st_size, after.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            break
+    return stat, digest
+
+
+def settings_digest(params: dict, engine_version: str) -> str:
+    """Empreinte des paramètres effectifs d'un fichier et de la version du moteur"""
+    payload = json.dumps({'params': params, 'engine': engine_version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class CompressionManifest:
+    """
+    Entrées indexées par chemin relatif (POSIX) du fichier source.
+    save() est limité à une écriture toutes les save_interval secondes, sauf force=True.
+    """
+
+    def __init__(self, path: Path, save_interval: float = 5.0):
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self.entries = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Manifeste illisible, tous les fichiers seront traités ({self.path}): {e}")
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.entries = data.get('files', {})
+
+    def save(self, force: bool = False) -> None:
+        """Écriture atomique (fichier temporaire puis renommage) : jamais de manifeste tronqué"""
+        if not self._dirty or (not force and time.monotonic() - self._last_save < self.save_interval):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".manifest-", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f, indent=1, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def is_current(self, key: str, source: Path, settings_key: str, output_root: Path) -> bool:
+        """
+        Vrai si le fichier a déjà été traité avec ces paramètres et que sa sortie existe.
+        Taille et date identiques suffisent ; si seule la date a changé, l'empreinte tranche.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry['settings'] != settings_key:
+            return False
+        if not (output_root / entry['output']).exists():
+            return False
+
+        stat = source.stat()
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if file_digest(source) != entry['sha256']:
+            return False
+        # Contenu identique (copie, restauration de sauvegarde...) : mémoriser la nouvelle date
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(self, key: str, stat: os.stat_result, digest: str, settings_key: str,
+               output_path: Path, output_root: Path, action: str) -> None:
+        """
+        Mémorise le résultat d'un fichier. stat et digest sont relevés ensemble avant la compression
+        (voir source_snapshot) : une source modifiée pendant le traitement sera retraitée au prochain passage.
+        """
+        output = output_path.relative_to(output_root).as_posix()
+        previous = self.entries.get(key)
+        if previous is not None and previous['output'] != output:
+            # Format de sortie changé : l'ancienne sortie n'a plus de source,
+            # sauf si une autre entrée produit le même fichier
+            shared = any(other_key != key and entry['output'] == previous['output']
+                         for other_key, entry in self.entries.items())
+            if not shared:
+                (output_root / previous['output']).unlink(missing_ok=True)
+
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'settings': settings_key,
+            'output': output,
+            'action': action
+        }
+        self._dirty = True
+
+    def prune(self, present_keys: Iterable[str]) -> int:
+        """Oublie les fichiers qui ont disparu de la source (leurs sorties sont conservées)"""
+        present = set(present_keys)
+        removed = [key for key in self.entries if key not in present]
+        for key in removed:
+            del self.entries[key]
+        if removed:
+            self._dirty = True
+        return len(removed)
@@ -0,0 +1,149 @@
+# backend/result_cache.py
+"""
+Cache disque des résultats de compression
+Clé = empreinte SHA-256 du contenu + paramètres de compression effectifs
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+class ResultCache:
+    """
+    Cache adressé par contenu, partagé entre processus.
+    L'index SQLite garde la taille et la date du dernier accès de chaque entrée
+    (éviction LRU) ainsi que les compteurs de hits/misses.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / "index.sqlite3"
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, filename TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connexion à l'index, dans une transaction validée à la sortie"""
+        db = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def file_digest(path: Path) -> str:
+        """Empreinte SHA-256 du contenu d'un fichier (lecture par blocs)"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def make_key(self, input_path: Path, params: dict, version: str = "") -> str:
+        """Clé de cache : contenu + extension + paramètres + version du moteur"""
+        settings = json.dumps(params, sort_keys=True, default=str)
+        material = "|".join([self.file_digest(input_path), input_path.suffix.lower(), settings, version])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def fetch(self, key: str, target: Callable[[str], Path]) -> Optional[Path]:
+        """Restaure le résultat en cache vers target(extension) (None si absent)"""
+        with self._connect() as db:
+            row = db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+            counter = 'hits' if row else 'misses'
+            db.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (counter,))
+            if row:
+                db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        if not row:
+            return None
+
+        cached_path = self.cache_dir / row[0]
+        if not cached_path.exists():
+            self._forget(key)
+            return None
+
+        output_path = target(cached_path.suffix)
+        self._atomic_copy(cached_path, output_path)
+        return output_path
+
+    def store(self, key: str, output_path: Path) -> None:
+        """Ajoute un résultat de compression au cache puis applique la limite de taille"""
+        size = output_path.stat().st_size
+        if size > self.max_bytes:
+            return
+
+        filename = f"{key}{output_path.suffix}"
+        self._atomic_copy(output_path, self.cache_dir / filename)
+
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, filename, size, time.time())
+            )
+        self._evict()
+
+    def stats(self) -> dict:
+        """Compteurs et occupation du cache"""
+        with self._connect() as db:
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_ratio': counters['hits'] / lookups if lookups else 0,
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes
+        }
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = db.execute("SELECT key, filename, size FROM entries ORDER BY last_access").fetchall()
+            for key, filename, size in rows:
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                (self.cache_dir / filename).unlink(missing_ok=True)
+                total -= size
+
+    def _forget(self, key: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    @staticmethod
+    def _atomic_copy(source: Path, destination: Path) -> None:
+        """
+        Copie puis remplacement atomique. Pas de lien physique : une écriture
+        ultérieure sur le fichier de sortie corromprait l'entrée du cache.
+        """
+        temp_path = destination.with_name(f".{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, destination)
+        finally:
+            temp_path.unlink(missing_ok=True)
@@ -0,0 +1,188 @@
+# backend/scheduler.py
+"""
+Ordonnanceur global des tâches de compression
+Nombre fixe de workers par voie (light/heavy) et file de priorité FIFO
+Budget mémoire partagé par les fichiers en cours de compression
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """La file d'attente a atteint sa capacité maximale"""
+
+
+class JobScheduler:
+    """
+    Exécute les tâches sur un budget fixe de threads.
+    Chaque voie possède sa propre file et ses propres workers, ce qui évite
+    qu'une compression d'image attende derrière un long encodage vidéo.
+    """
+
+    def __init__(self, lanes: Dict[str, int], max_queued: int = 100):
+        self.lanes = dict(lanes)
+        self.max_queued = max_queued
+        self._condition = threading.Condition()
+        self._queues = {lane: [] for lane in self.lanes}
+        self._running = {lane: set() for lane in self.lanes}
+        self._counter = itertools.count()
+        self._threads = []
+        self._closed = False
+
+        for lane, workers in self.lanes.items():
+            for i in range(workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(lane,),
+                    name=f"scheduler-{lane}-{i}"
+                )
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job_id: str, lane: str, func: Callable, *args, priority: int = 0) -> int:
+        """Ajoute une tâche dans une voie et retourne sa position dans la file (1 = prochaine)"""
+        if lane not in self._queues:
+            raise ValueError(f"Voie inconnue: {lane}")
+
+        with self._condition:
+            if self._closed:
+                raise QueueFullError("Serveur en cours d'arrêt, réessayez plus tard")
+            if self.queued_count() >= self.max_queued:
+                raise QueueFullError("Trop de tâches en attente, réessayez plus tard")
+
+            # (priorité, ordre d'arrivée) : FIFO à priorité égale
+            heapq.heappush(self._queues[lane], (priority, next(self._counter), job_id, func, args))
+            self._condition.notify_all()
+            return self._position_locked(job_id, lane)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Position de la tâche dans sa file (None si elle n'attend plus)"""
+        with self._condition:
+            for lane in self._queues:
+                position = self._position_locked(job_id, lane)
+                if position is not None:
+                    return position
+            return None
+
+    def queued_count(self) -> int:
+        """Nombre total de tâches en attente"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict:
+        """Occupation des voies (tâches en cours / workers / en attente)"""
+        with self._condition:
+            return {
+                lane: {
+                    'workers': self.lanes[lane],
+                    'running': len(self._running[lane]),
+                    'queued': len(self._queues[lane])
+                }
+                for lane in self.lanes
+            }
+
+    @property
+    def draining(self) -> bool:
+        """Vrai une fois shutdown() appelé : plus aucune tâche n'est acceptée"""
+        return self._closed
+
+    def shutdown(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Arrêt propre : refuse les nouvelles tâches, retire celles qui attendent
+        et laisse jusqu'à timeout secondes aux tâches en cours pour se terminer.
+        Retourne les identifiants des tâches qui n'ont pas pu aller à leur terme.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._closed = True
+            abandoned = [entry[2] for queue in self._queues.values() for entry in sorted(queue)]
+            for queue in self._queues.values():
+                queue.clear()
+
+            while any(self._running.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            return abandoned + [job_id for running in self._running.values() for job_id in running]
+
+    def _position_locked(self, job_id: str, lane: str) -> Optional[int]:
+        for position, entry in enumerate(sorted(self._queues[lane]), start=1):
+            if entry[2] == job_id:
+                return position
+        return None
+
+    def _worker_loop(self, lane: str) -> None:
+        queue = self._queues[lane]
+        while True:
+            with self._condition:
+                while not queue:
+                    self._condition.wait()
+                _, _, job_id, func, args = heapq.heappop(queue)
+                self._running[lane].add(job_id)
+
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Erreur dans la tâche {job_id}: {e}")
+            finally:
+                with self._condition:
+                    self._running[lane].discard(job_id)
+                    self._condition.notify_all()
+
+
+class MemoryBudget:
+    """
+    Mémoire (octets) répartie entre les fichiers en cours de compression, toutes tâches confondues.
+    Un fichier plus gros que le budget entier compte pour le budget entier : il s'exécute seul.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._used = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self, amount: int) -> bool:
+        """Réserve amount octets s'ils sont disponibles, sans attendre"""
+        amount = min(amount, self.capacity)
+        with self._condition:
+            if self._used + amount > self.capacity:
+                return False
+            self._used += amount
+            return True
+
+    def release(self, amount: int) -> None:
+        with self._condition:
+            self._used = max(0, self._used - min(amount, self.capacity))
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Attend qu'une réservation soit rendue (au plus timeout secondes)"""
+        with self._condition:
+            self._condition.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {'capacity': self.capacity, 'used': self._used}
+
+
+def available_memory() -> int:
+    """Mémoire utilisable par le conteneur : limite du cgroup (v2 puis v1), bornée par la mémoire physique"""
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) ou une valeur démesurée (v1) : pas de limite
+        if value.isdigit() and int(value) < 1 << 60:
+            return min(int(value), physical)
+    return physical
@@ -0,0 +1,332 @@
+# backend/task_store.py
+"""
+Stockage persistant des tâches, de leurs événements et des uploads fragmentés
+SQLite en local, Redis (optionnel) pour partager l'état entre plusieurs machines
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class TaskStore:
+    """
+    Interface commune des stockages de tâches.
+    Les tâches y sont sérialisées avec to_dict() et reconstruites avec
+    task_factory ; l'accès façon dict (tasks[task_id]) est conservé.
+    """
+
+    def __init__(self, task_factory: Callable[[dict], object]):
+        self.task_factory = task_factory
+
+    # Accès façon dict
+
+    def __contains__(self, task_id) -> bool:
+        return self.load_task(task_id) is not None
+
+    def __getitem__(self, task_id):
+        data = self.load_task(task_id)
+        if data is None:
+            raise KeyError(task_id)
+        return self.task_factory(data)
+
+    def __setitem__(self, task_id, task) -> None:
+        self.save_task(task_id, task.to_dict())
+
+    def __delitem__(self, task_id) -> None:
+        self.delete_task(task_id)
+
+    def get(self, task_id, default=None):
+        try:
+            return self[task_id]
+        except KeyError:
+            return default
+
+    def values(self) -> List:
+        return [self.task_factory(data) for data in self.list_tasks()]
+
+    def update(self, task_id: str, mutator: Callable) -> object:
+        """Modifie une tâche de façon atomique (lecture, mutator(task), écriture)"""
+        raise NotImplementedError
+
+    # Opérations propres à chaque stockage
+
+    def load_task(self, task_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def save_task(self, task_id: str, data: dict) -> None:
+        raise NotImplementedError
+
+    def delete_task(self, task_id: str) -> None:
+        raise NotImplementedError
+
+    def list_tasks(self) -> List[dict]:
+        raise NotImplementedError
+
+    def append_event(self, task_id: str, event_type: str, data: dict) -> int:
+        raise NotImplementedError
+
+    def events_since(self, task_id: str, last_id: int) -> List[dict]:
+        raise NotImplementedError
+
+    def load_upload(self, upload_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def save_upload(self, upload_id: str, data: dict) -> None:
+        raise NotImplementedError
+
+    def delete_upload(self, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def uploads_for_task(self, task_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        """Vérifie que le stockage répond"""
+        raise NotImplementedError
+
+
+class SQLiteTaskStore(TaskStore):
+    """Stockage SQLite (mode WAL), partageable entre les workers d'une même machine"""
+
+    def __init__(self, db_path: str, task_factory: Callable[[dict], object]):
+        super().__init__(task_factory)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS tasks (task_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "task_id TEXT NOT NULL, id INTEGER NOT NULL, event TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (task_id, id))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "upload_id TEXT PRIMARY KEY, task_id TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS uploads_task ON uploads (task_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaction en écriture (verrou pris dès le début pour éviter les interblocages)"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    @contextmanager
+    def _query(self) -> Iterator[sqlite3.Connection]:
+        db = self._connect()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def load_task(self, task_id):
+        with self._query() as db:
+            row = db.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_task(self, task_id, data):
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?)", (task_id, json.dumps(data)))
+
+    def update(self, task_id, mutator):
+        with self._transaction() as db:
+            row = db.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                raise KeyError(task_id)
+            task = self.task_factory(json.loads(row[0]))
+            mutator(task)
+            db.execute("UPDATE tasks SET data = ? WHERE task_id = ?", (json.dumps(task.to_dict()), task_id))
+        return task
+
+    def delete_task(self, task_id):
+        with self._transaction() as db:
+            db.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            db.execute("DELETE FROM events WHERE task_id = ?", (task_id,))
+            db.execute("DELETE FROM uploads WHERE task_id = ?", (task_id,))
+
+    def list_tasks(self):
+        with self._query() as db:
+            rows = db.execute("SELECT data FROM tasks").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def append_event(self, task_id, event_type, data):
+        with self._transaction() as db:
+            event_id = db.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM events WHERE task_id = ?", (task_id,)
+            ).fetchone()[0]
+            db.execute(
+                "INSERT INTO events VALUES (?, ?, ?, ?)",
+                (task_id, event_id, event_type, json.dumps(data))
+            )
+        return event_id
+
+    def events_since(self, task_id, last_id):
+        with self._query() as db:
+            rows = db.execute(
+                "SELECT id, event, data FROM events WHERE task_id = ? AND id > ? ORDER BY id",
+                (task_id, last_id)
+            ).fetchall()
+        return [{'id': row[0], 'event': row[1], 'data': json.loads(row[2])} for row in rows]
+
+    def load_upload(self, upload_id):
+        with self._query() as db:
+            row = db.execute("SELECT data FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_upload(self, upload_id, data):
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?)",
+                (upload_id, data['task_id'], json.dumps(data))
+            )
+
+    def delete_upload(self, upload_id):
+        with self._transaction() as db:
+            db.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def uploads_for_task(self, task_id):
+        with self._query() as db:
+            rows = db.execute("SELECT upload_id, data FROM uploads WHERE task_id = ?", (task_id,)).fetchall()
+        return [{'upload_id': row[0], **json.loads(row[1])} for row in rows]
+
+    def ping(self):
+        with self._query() as db:
+            db.execute("SELECT 1").fetchone()
+        return True
+
+
+class RedisTaskStore(TaskStore):
+    """Stockage Redis (ou compatible : KeyDB, Valkey...), partagé entre machines"""
+
+    def __init__(self, url: str, task_factory: Callable[[dict], object], prefix: str = "compressor"):
+        if redis is None:
+            raise RuntimeError("Le stockage Redis nécessite le paquet redis (pip install redis)")
+        super().__init__(task_factory)
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def load_task(self, task_id):
+        data = self.client.get(self._key("task", task_id))
+        return json.loads(data) if data else None
+
+    def save_task(self, task_id, data):
+        pipe = self.client.pipeline()
+        pipe.set(self._key("task", task_id), json.dumps(data))
+        pipe.sadd(self._key("tasks"), task_id)
+        pipe.execute()
+
+    def update(self, task_id, mutator):
+        key = self._key("task", task_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    data = pipe.get(key)
+                    if data is None:
+                        raise KeyError(task_id)
+                    task = self.task_factory(json.loads(data))
+                    mutator(task)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(task.to_dict()))
+                    pipe.execute()
+                    return task
+                except redis.WatchError:
+                    continue
+
+    def delete_task(self, task_id):
+        upload_ids = self.client.smembers(self._key("task-uploads", task_id))
+        pipe = self.client.pipeline()
+        pipe.delete(self._key("task", task_id), self._key("events", task_id), self._key("task-uploads", task_id))
+        for upload_id in upload_ids:
+            pipe.delete(self._key("upload", upload_id))
+        pipe.srem(self._key("tasks"), task_id)
+        pipe.execute()
+
+    def list_tasks(self):
+        task_ids = list(self.client.smembers(self._key("tasks")))
+        if not task_ids:
+            return []
+        values = self.client.mget([self._key("task", task_id) for task_id in task_ids])
+        return [json.loads(value) for value in values if value]
+
+    def append_event(self, task_id, event_type, data):
+        # La longueur de la liste après RPUSH sert d'identifiant d'événement
+        return self.client.rpush(
+            self._key("events", task_id),
+            json.dumps({'event': event_type, 'data': data})
+        )
+
+    def events_since(self, task_id, last_id):
+        raw_events = self.client.lrange(self._key("events", task_id), last_id, -1)
+        return [
+            {'id': last_id + offset, **json.loads(raw)}
+            for offset, raw in enumerate(raw_events, start=1)
+        ]
+
+    def load_upload(self, upload_id):
+        data = self.client.get(self._key("upload", upload_id))
+        return json.loads(data) if data else None
+
+    def save_upload(self, upload_id, data):
+        pipe = self.client.pipeline()
+        pipe.set(self._key("upload", upload_id), json.dumps(data))
+        pipe.sadd(self._key("task-uploads", data['task_id']), upload_id)
+        pipe.execute()
+
+    def delete_upload(self, upload_id):
+        data = self.load_upload(upload_id)
+        pipe = self.client.pipeline()
+        pipe.delete(self._key("upload", upload_id))
+        if data:
+            pipe.srem(self._key("task-uploads", data['task_id']), upload_id)
+        pipe.execute()
+
+    def uploads_for_task(self, task_id):
+        uploads = []
+        for upload_id in self.client.smembers(self._key("task-uploads", task_id)):
+            data = self.load_upload(upload_id)
+            if data:
+                uploads.append({'upload_id': upload_id, **data})
+        return uploads
+
+    def ping(self):
+        return bool(self.client.ping())
+
+
+def create_task_store(url: str, task_factory: Callable[[dict], object]) -> TaskStore:
+    """Crée le stockage à partir d'une URL : sqlite:////chemin/tasks.db ou redis://hôte:6379/0"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        # Convention SQLAlchemy : sqlite:///relatif.db, sqlite:////absolu.db
+        return SQLiteTaskStore(parsed.path[1:], task_factory)
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisTaskStore(url, task_factory)
+    raise ValueError(f"Stockage de tâches non supporté: {url}")
@@ -0,0 +1,32 @@
+# backend/tests/conftest.py
+"""
+Tests du moteur de compression : python -m pytest backend/tests
+Les modules du backend s'importent à plat (from file_compressor import ...), comme dans app.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """Application web (ordonnanceur local), avec ses stockages et dossiers dans un répertoire temporaire"""
+    root = tmp_path_factory.mktemp('app')
+    os.environ['TASK_STORE_URL'] = f"sqlite:///{root / 'tasks.db'}"
+    os.environ['CACHE_FOLDER'] = str(root / 'cache')
+    os.environ['EXECUTION_MODE'] = 'local'
+    import app
+    for key, folder in (('UPLOAD_FOLDER', 'uploads'), ('COMPRESSED_FOLDER', 'compressed')):
+        (root / folder).mkdir()
+        app.app.config[key] = str(root / folder)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,33 @@
+# backend/tests/test_api.py
+"""Validation des requêtes de l'API"""
+
+import io
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def task_id(client):
+    image = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(image, 'PNG')
+    image.seek(0)
+    response = client.post('/api/upload', data={'files': [(image, 'a.png')]}, content_type='multipart/form-data')
+    return response.json['task_id']
+
+
+@pytest.mark.parametrize('body', [
+    {'settings': ['quality', 50]},
+    {'settings': 'quality=50'},
+    {'priority': 'urgent'},
+    {'priority': True},
+])
+def test_start_compression_rejects_malformed_fields(client, task_id, body):
+    response = client.post('/api/compress', json={'task_id': task_id, **body})
+    assert response.status_code == 400
+    # La tâche reste utilisable
+    assert client.get(f'/api/status/{task_id}').json['status'] == 'pending'
+
+
+def test_start_compression_rejects_non_object_body(client):
+    assert client.post('/api/compress', json=['task']).status_code == 400
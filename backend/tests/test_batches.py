@@ -0,0 +1,47 @@
+# backend/tests/test_batches.py
+"""Lots ouverts : chaque fichier est compressé à sa réception"""
+
+import io
+import time
+
+from PIL import Image
+
+import file_compressor
+
+
+def wait_for_task(client, task_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f'/api/status/{task_id}').json
+        if status['status'] in ('completed', 'error'):
+            return status
+        time.sleep(0.1)
+    raise AssertionError(f"tâche {task_id} non terminée")
+
+
+def test_batch_files_run_in_shared_pool(client, app_module, monkeypatch):
+    created = []
+
+    def counting_executor(*args, **kwargs):
+        created.append(kwargs)
+        return ProcessPoolExecutor(*args, **kwargs)
+
+    ProcessPoolExecutor = file_compressor.ProcessPoolExecutor
+    monkeypatch.setattr(file_compressor, 'ProcessPoolExecutor', counting_executor)
+
+    task_id = client.post('/api/batches', json={}).json['task_id']
+    files = []
+    for name in ('a', 'b'):
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), (200, 20, 20)).save(image, 'PNG')
+        image.seek(0)
+        files.append((image, f'{name}.png'))
+    response = client.post('/api/upload', data={'task_id': task_id, 'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert client.post(f'/api/batches/{task_id}/close').status_code == 200
+
+    status = wait_for_task(client, task_id)
+    assert status['status'] == 'completed'
+    assert [result['status'] for result in status['results']] == ['success', 'success']
+    # Aucun pool créé par fichier : ils passent tous par celui du processus web
+    assert created == []
@@ -0,0 +1,50 @@
+# backend/tests/test_events.py
+"""Flux Server-Sent Events d'une tâche (/api/events)"""
+
+import io
+import json
+
+from PIL import Image
+
+
+def parse_events(body):
+    """Événements SSE (id, type, données), sans les commentaires keep-alive"""
+    events = []
+    for block in body.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_event_stream_follows_task_and_resumes(client):
+    files = []
+    for name in ('a', 'b'):
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), (200, 20, 20)).save(image, 'PNG')
+        image.seek(0)
+        files.append((image, f'{name}.png'))
+    task_id = client.post('/api/upload', data={'files': files}, content_type='multipart/form-data').json['task_id']
+    client.post('/api/compress', json={'task_id': task_id})
+
+    # Le flux se termine avec la tâche
+    response = client.get(f'/api/events/{task_id}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = parse_events(response.data)
+    ids = [event_id for event_id, _, _ in events]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    types = [event_type for _, event_type, _ in events]
+    assert types[-1] == 'completed'
+    assert types.count('file_completed') == 2
+    assert types.index('started') < types.index('file_completed')
+    completed = [data for _, event_type, data in events if event_type == 'file_completed']
+    assert sorted(data['filename'] for data in completed) == ['a.png', 'b.png']
+
+    # Reprise après une coupure : seuls les événements suivants sont renvoyés
+    resumed = parse_events(client.get(f'/api/events/{task_id}', headers={'Last-Event-ID': str(ids[-2])}).data)
+    assert resumed == events[-1:]
+
+
+def test_event_stream_of_unknown_task(client):
+    assert client.get('/api/events/missing').status_code == 404
@@ -0,0 +1,54 @@
+# backend/tests/test_image.py
+"""Compression des images : modes inhabituels"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+from file_compressor import compress_file_job
+
+
+def luminance(path) -> float:
+    with Image.open(path) as image:
+        return float(np.asarray(image.convert('L')).mean())
+
+
+@pytest.mark.parametrize('output_format', ['keep', 'webp'])
+def test_16bit_grayscale_is_not_clipped(tmp_path, output_format):
+    # Dégradé 16 bits (Pillow l'ouvre en mode I, valeurs 0-65535)
+    gradient = np.tile(np.linspace(0, 65535, 512), (256, 1)).astype(np.uint16)
+    source = tmp_path / 'gradient.png'
+    Image.fromarray(gradient).save(source)
+    
+    result = compress_file_job(str(tmp_path / 'out'), str(source), {'output_format': output_format})
+    assert result['output_path'] is not None
+    assert luminance(result['output_path']) == pytest.approx(127.5, abs=2)
+
+
+def test_same_stem_outputs_do_not_collide(tmp_path):
+    # x.bmp passe en JPEG sous la politique keep : il ne doit pas écraser la sortie de x.jpg
+    pixels = np.random.default_rng(0).integers(0, 256, (128, 128, 3), dtype=np.uint8)
+    Image.fromarray(pixels // 2).save(tmp_path / 'x.bmp')
+    Image.fromarray(128 + pixels // 2).save(tmp_path / 'x.jpg', quality=95)
+    
+    output_dir = str(tmp_path / 'out')
+    outputs = [
+        compress_file_job(output_dir, str(tmp_path / name), {'output_format': 'keep'})['output_path']
+        for name in ('x.bmp', 'x.jpg')
+    ]
+    assert len(set(outputs)) == 2
+    assert luminance(outputs[0]) < 100 < luminance(outputs[1])
+
+
+def test_same_stem_previews_do_not_collide(tmp_path):
+    Image.new('RGB', (400, 300), (20, 20, 20)).save(tmp_path / 'x.png')
+    Image.new('RGB', (400, 300), (230, 230, 230)).save(tmp_path / 'x.jpg')
+    
+    output_dir = str(tmp_path / 'out')
+    previews = [
+        compress_file_job(output_dir, str(tmp_path / name), {}, previews=True)['preview_path']
+        for name in ('x.png', 'x.jpg')
+    ]
+    assert len(set(previews)) == 2
+    assert luminance(previews[0]) < 100 < luminance(previews[1])
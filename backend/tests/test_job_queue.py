@@ -0,0 +1,82 @@
+# backend/tests/test_job_queue.py
+"""File partagée SQLite : réservation, reprise des jobs abandonnés et tentatives"""
+
+import threading
+import time
+
+import pytest
+
+from job_queue import create_job_queue
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return create_job_queue(f"sqlite:///{tmp_path / 'jobs.db'}", max_attempts=2)
+
+
+def test_claim_by_lane_then_priority(job_queue):
+    job_queue.enqueue('video', 'heavy', {'name': 'video'})
+    job_queue.enqueue('late', 'light', {'name': 'late'}, priority=5)
+    job_queue.enqueue('urgent', 'light', {'name': 'urgent'}, priority=0)
+    assert job_queue.position('late') == 2
+    assert job_queue.stats() == {'light': {'queued': 2, 'running': 0}, 'heavy': {'queued': 1, 'running': 0}}
+
+    # Un worker dédié à la voie light ne prend jamais la vidéo
+    claimed = [job_queue.claim('w1', ['light']) for _ in range(3)]
+    assert [job and job['payload']['name'] for job in claimed] == ['urgent', 'late', None]
+    assert claimed[0]['attempts'] == 1 and claimed[0]['lane'] == 'light'
+    assert job_queue.position('late') is None
+    assert job_queue.claim('w2')['task_id'] == 'video'
+
+
+def test_concurrent_workers_never_share_a_job(job_queue):
+    for index in range(30):
+        job_queue.enqueue(f't{index}', 'light', {})
+    claimed = []
+
+    def claim_all(worker_id):
+        for job in iter(lambda: job_queue.claim(worker_id), None):
+            claimed.append(job['job_id'])
+
+    threads = [threading.Thread(target=claim_all, args=(f'w{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == len(set(claimed)) == 30
+
+
+def test_stale_jobs_are_requeued_until_attempts_run_out(job_queue):
+    job_queue.enqueue('t1', 'light', {'index': 0})
+    job = job_queue.claim('lost')
+    time.sleep(0.05)
+    # Worker silencieux : le job revient en file pour un autre
+    assert job_queue.reclaim_stale(0.01) == []
+    assert job_queue.complete(job['job_id'], 'lost') is False
+
+    retry = job_queue.claim('w2')
+    assert retry['job_id'] == job['job_id'] and retry['attempts'] == 2
+    time.sleep(0.05)
+    # Tentatives épuisées : le job est retiré et rendu à l'appelant pour le signaler en erreur
+    abandoned = job_queue.reclaim_stale(0.01)
+    assert [j['job_id'] for j in abandoned] == [job['job_id']]
+    assert job_queue.claim('w3') is None
+
+
+def test_heartbeat_keeps_job_and_release_requeues_it(job_queue):
+    job_queue.enqueue('t1', 'light', {})
+    job = job_queue.claim('w1')
+    time.sleep(0.05)
+    job_queue.heartbeat('w1', [job['job_id']])
+    assert job_queue.reclaim_stale(0.04) == []
+    assert job_queue.claim('w2') is None
+
+    # Processus de compression perdu : remis en file par son propre worker
+    assert job_queue.release(job['job_id'], 'w1') is True
+    retry = job_queue.claim('w2')
+    assert job_queue.release(retry['job_id'], 'w2') is False  # max_attempts atteint
+    assert job_queue.claim('w3') is None
+
+    job_queue.enqueue('t2', 'light', {})
+    job_queue.cancel_task('t2')
+    assert job_queue.claim('w3') is None
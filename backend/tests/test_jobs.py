@@ -0,0 +1,72 @@
+# backend/tests/test_jobs.py
+"""Exécution des fichiers dans le pool de processus"""
+
+import multiprocessing
+import os
+import signal
+import threading
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import file_compressor
+from file_compressor import CompressionPool, ResourceLimitError, run_compression_jobs
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="le remplacement de compress_file_job doit être hérité par le pool")
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_pool_process_dying_mid_batch(tmp_path, monkeypatch, jobs):
+    compress_file_job = file_compressor.compress_file_job
+    
+    def die_on_marked_file(output_dir, input_path, *args, **kwargs):
+        # Processus tué pendant la compression (OOM killer, signal...)
+        if Path(input_path).stem == 'die':
+            os.kill(os.getpid(), signal.SIGKILL)
+        return compress_file_job(output_dir, input_path, *args, **kwargs)
+    
+    monkeypatch.setattr(file_compressor, 'compress_file_job', die_on_marked_file)
+    
+    names = ['die', 'a', 'b', 'c', 'd']
+    for name in names:
+        Image.new('RGB', (64, 64), (200, 20, 20)).save(tmp_path / f'{name}.png')
+    specs = [(str(tmp_path / 'out'), str(tmp_path / f'{name}.png'), {}) for name in names]
+    
+    results = {index: (result, error) for index, result, error in run_compression_jobs(specs, jobs, limits=(None, None))}
+    assert sorted(results) == list(range(len(names)))
+    assert isinstance(results[0][1], ResourceLimitError)
+    # Seuls les fichiers en cours avec le processus tué échouent, les suivants passent dans un nouveau pool
+    for index in range(jobs, len(names)):
+        result, error = results[index]
+        assert error is None and os.path.exists(result['output_path'])
+
+
+def test_shared_pool_serves_concurrent_calls(tmp_path):
+    pool = CompressionPool(2)
+    processes = set(pool.executor._processes)
+    if multiprocessing.get_start_method() == 'fork':
+        assert len(processes) == 2  # Tous créés dès la construction
+    
+    for name in ['a', 'b', 'c', 'd']:
+        Image.new('RGB', (64, 64), (20, 200, 20)).save(tmp_path / f'{name}.png')
+    results = {}
+    
+    def run(names):
+        specs = [(str(tmp_path / 'out'), str(tmp_path / f'{name}.png'), {}) for name in names]
+        for index, result, error in run_compression_jobs(specs, 2, pool=pool):
+            results[names[index]] = (result, error)
+    
+    try:
+        threads = [threading.Thread(target=run, args=(names,)) for names in (['a', 'b'], ['c', 'd'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Aucun pool ni processus supplémentaire pour ces appels
+        assert set(pool.executor._processes) == processes
+    finally:
+        pool.shutdown()
+    assert sorted(results) == ['a', 'b', 'c', 'd']
+    for result, error in results.values():
+        assert error is None and os.path.exists(result['output_path'])
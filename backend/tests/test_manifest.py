@@ -0,0 +1,49 @@
+# backend/tests/test_manifest.py
+"""Manifeste du mode incrémental"""
+
+import os
+
+from manifest import CompressionManifest, source_snapshot
+
+
+def record(manifest, tmp_path, name, output):
+    source = tmp_path / 'src' / name
+    output_path = tmp_path / 'out' / output
+    output_path.write_bytes(b'compressed')
+    stat, digest = source_snapshot(source)
+    manifest.record(name, stat, digest, 'settings', output_path, tmp_path / 'out', 'compress')
+    return output_path
+
+
+def test_changed_output_removes_only_unshared_files(tmp_path):
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'out').mkdir()
+    for name in ('x.bmp', 'x.jpg', 'y.png'):
+        (tmp_path / 'src' / name).write_bytes(name.encode())
+    manifest = CompressionManifest(tmp_path / 'out' / 'manifest.json')
+    
+    # Manifeste d'une version qui nommait les deux sorties x_compressed.jpg
+    shared = record(manifest, tmp_path, 'x.bmp', 'x_compressed.jpg')
+    record(manifest, tmp_path, 'x.jpg', 'x_compressed.jpg')
+    record(manifest, tmp_path, 'x.bmp', 'x.bmp_compressed.jpg')
+    assert shared.exists()
+    
+    old = record(manifest, tmp_path, 'y.png', 'y_compressed.png')
+    record(manifest, tmp_path, 'y.png', 'y.png_compressed.webp')
+    assert not old.exists()
+
+
+def test_source_changed_during_compression_is_processed_again(tmp_path):
+    source = tmp_path / 'photo.jpg'
+    source.write_bytes(b'before')
+    output = tmp_path / 'photo_compressed.jpg'
+    output.write_bytes(b'compressed')
+    manifest = CompressionManifest(tmp_path / 'manifest.json')
+    
+    stat, digest = source_snapshot(source)
+    # Modifiée pendant la compression, même taille
+    source.write_bytes(b'after!')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    manifest.record('photo.jpg', stat, digest, 'settings', output, tmp_path, 'compress')
+    
+    assert not manifest.is_current('photo.jpg', source, 'settings', tmp_path)
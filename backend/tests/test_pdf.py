@@ -0,0 +1,73 @@
+# backend/tests/test_pdf.py
+"""Le PDF compressé doit s'afficher comme l'original (rendu pypdfium2 avant/après)"""
+
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('PyPDF2')
+pdfium = pytest.importorskip('pypdfium2')
+np = pytest.importorskip('numpy')
+from PIL import Image, ImageDraw
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, NameObject
+
+from file_compressor import FileCompressor
+
+
+def render_means(path: Path) -> list:
+    """Luminance moyenne de chaque page rendue"""
+    document = pdfium.PdfDocument(str(path))
+    try:
+        return [
+            float(np.asarray(document[index].render(scale=0.5).to_pil().convert('L')).mean())
+            for index in range(len(document))
+        ]
+    finally:
+        document.close()
+
+
+def assert_same_rendering(source: Path, output_dir: Path) -> None:
+    output = FileCompressor(str(output_dir)).compress_pdf(source)
+    assert output is not None
+    before, after = render_means(source), render_means(output)
+    assert len(after) == len(before)
+    for page_before, page_after in zip(before, after):
+        assert page_before < 250  # la page d'origine n'est pas blanche
+        assert abs(page_after - page_before) < 2
+
+
+def test_unfiltered_content_stream_is_kept(tmp_path):
+    # Pillow écrit un flux de contenu sans filtre : il est compressé par compress_pdf
+    image = Image.new('RGB', (800, 600), 'white')
+    ImageDraw.Draw(image).rectangle((100, 100, 500, 400), fill='black')
+    source = tmp_path / 'box.pdf'
+    image.save(source)
+    assert_same_rendering(source, tmp_path / 'out')
+
+
+def test_multiple_pages(tmp_path):
+    first = Image.new('RGB', (800, 600), 'white')
+    ImageDraw.Draw(first).rectangle((100, 100, 500, 400), fill='black')
+    second = Image.new('RGB', (800, 600), 'white')
+    ImageDraw.Draw(second).ellipse((100, 100, 700, 500), fill='gray')
+    source = tmp_path / 'pages.pdf'
+    first.save(source, save_all=True, append_images=[second])
+    assert_same_rendering(source, tmp_path / 'out')
+
+
+def test_content_stream_array(tmp_path):
+    # /Contents en tableau de flux : fusionnés en un seul flux compressé
+    writer = PdfWriter()
+    writer.add_blank_page(200, 200)
+    page = writer.pages[0]
+    streams = []
+    for operators in (b'0 0 1 rg 20 20 80 80 re f\n', b'1 0 0 rg 100 100 80 80 re f\n'):
+        stream = DecodedStreamObject()
+        stream.set_data(operators * 30)
+        streams.append(writer._add_object(stream))
+    page[NameObject('/Contents')] = ArrayObject(streams)
+    source = tmp_path / 'array.pdf'
+    with open(source, 'wb') as f:
+        writer.write(f)
+    assert_same_rendering(source, tmp_path / 'out')
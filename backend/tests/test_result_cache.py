@@ -0,0 +1,75 @@
+# backend/tests/test_result_cache.py
+"""Cache des résultats : clé contenu + paramètres, restauration et éviction LRU"""
+
+import os
+import time
+
+from PIL import Image
+
+from file_compressor import compress_file_job
+from result_cache import ResultCache
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return path
+
+
+def test_key_follows_content_and_settings(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    a = write(tmp_path / 'a.png', b'same')
+    b = write(tmp_path / 'b.png', b'same')
+    c = write(tmp_path / 'c.png', b'other')
+    # Même contenu sous un autre nom : même clé
+    assert cache.make_key(a, {'quality': 80}) == cache.make_key(b, {'quality': 80})
+    assert cache.make_key(a, {'quality': 80}) != cache.make_key(c, {'quality': 80})
+    assert cache.make_key(a, {'quality': 80}) != cache.make_key(a, {'quality': 60})
+    assert cache.make_key(a, {'quality': 80}, '1') != cache.make_key(a, {'quality': 80}, '2')
+
+
+def test_fetch_restores_a_private_copy(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert cache.fetch('key', lambda extension: tmp_path / f'miss{extension}') is None
+
+    cache.store('key', write(tmp_path / 'result.webp', b'compressed'))
+    restored = cache.fetch('key', lambda extension: tmp_path / f'restored{extension}')
+    assert restored == tmp_path / 'restored.webp'
+    assert restored.read_bytes() == b'compressed'
+
+    # Modifier la sortie restaurée n'altère pas l'entrée du cache
+    restored.write_bytes(b'edited')
+    again = cache.fetch('key', lambda extension: tmp_path / f'again{extension}')
+    assert again.read_bytes() == b'compressed'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=25)
+    for key in ('old', 'used', 'new'):
+        cache.store(key, write(tmp_path / f'{key}.bin', b'x' * 10))
+        if key == 'used':
+            # Accès récent à 'old' : c'est 'used' qui devient le moins récent
+            time.sleep(0.01)
+            cache.fetch('old', lambda extension: tmp_path / f'hit{extension}')
+            time.sleep(0.01)
+
+    assert cache.fetch('used', lambda extension: tmp_path / f'evicted{extension}') is None
+    assert cache.fetch('old', lambda extension: tmp_path / f'kept{extension}') is not None
+    assert cache.stats()['size_bytes'] == 20
+    # Un résultat plus gros que tout le cache n'y entre pas
+    cache.store('huge', write(tmp_path / 'huge.bin', b'x' * 30))
+    assert cache.fetch('huge', lambda extension: tmp_path / f'huge_hit{extension}') is None
+
+
+def test_compression_reuses_cached_result(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'photo.png'
+    Image.effect_noise((128, 128), 40).convert('RGB').save(source)
+
+    first = compress_file_job(str(tmp_path / 'first'), str(source), {'quality': 70}, cache)
+    second = compress_file_job(str(tmp_path / 'second'), str(source), {'quality': 70}, cache)
+    assert cache.stats()['hits'] == 1
+    assert os.path.dirname(second['output_path']) == str(tmp_path / 'second')
+    with open(first['output_path'], 'rb') as a, open(second['output_path'], 'rb') as b:
+        assert a.read() == b.read()
@@ -0,0 +1,81 @@
+# backend/tests/test_scheduler.py
+"""Ordonnanceur : voies indépendantes, priorités et capacité de la file"""
+
+import threading
+
+import pytest
+
+from scheduler import JobScheduler, MemoryBudget, QueueFullError
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = JobScheduler({'light': 1, 'heavy': 1}, max_queued=3)
+    yield scheduler
+    scheduler.shutdown(timeout=5)
+
+
+def test_lanes_do_not_wait_for_each_other(scheduler):
+    release = threading.Event()
+    heavy_done = threading.Event()
+    scheduler.submit('long', 'light', release.wait)
+    scheduler.submit('short', 'heavy', heavy_done.set)
+    # La voie heavy avance alors que l'unique worker light est occupé
+    assert heavy_done.wait(5)
+    release.set()
+
+
+def test_priority_then_arrival_order(scheduler):
+    release = threading.Event()
+    started = threading.Event()
+    finished = threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    def last():
+        order.append('next')
+        finished.set()
+
+    scheduler.submit('blocker', 'light', block)
+    assert started.wait(5)
+    assert scheduler.submit('late', 'light', order.append, 'late', priority=5) == 1
+    assert scheduler.submit('urgent', 'light', order.append, 'urgent', priority=0) == 1
+    assert scheduler.submit('next', 'light', last, priority=5) == 3
+    assert scheduler.position('late') == 2
+    with pytest.raises(QueueFullError):
+        scheduler.submit('overflow', 'heavy', order.append, 'overflow')
+
+    release.set()
+    assert finished.wait(5)
+    assert order == ['urgent', 'late', 'next']
+
+
+def test_shutdown_returns_unfinished_jobs(scheduler):
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    scheduler.submit('running', 'light', block)
+    assert started.wait(5)
+    scheduler.submit('waiting', 'light', lambda: None)
+    assert scheduler.shutdown(timeout=0.1) == ['waiting', 'running']
+    assert scheduler.draining
+    with pytest.raises(QueueFullError):
+        scheduler.submit('after', 'heavy', lambda: None)
+    release.set()
+
+
+def test_memory_budget_admits_within_capacity():
+    budget = MemoryBudget(100)
+    assert budget.try_acquire(60)
+    assert not budget.try_acquire(60)
+    budget.release(60)
+    # Plus gros que le budget entier : compte pour le budget entier et passe seul
+    assert budget.try_acquire(500)
+    assert budget.stats() == {'capacity': 100, 'used': 100}
@@ -0,0 +1,68 @@
+# backend/tests/test_task_store.py
+"""Stockage SQLite des tâches : persistance, mises à jour atomiques, événements et uploads"""
+
+import threading
+
+import pytest
+
+from compression_task import CompressionTask
+from task_store import create_task_store
+
+
+@pytest.fixture
+def store_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'data' / 'tasks.db'}"
+
+
+@pytest.fixture
+def tasks(store_url):
+    return create_task_store(store_url, CompressionTask.from_dict)
+
+
+def test_tasks_survive_a_new_store(tasks, store_url):
+    task = CompressionTask('t1', [{'filename': 'a.png', 'path': '/tmp/a.png', 'size': 3}])
+    task.settings = {'quality': 70}
+    tasks['t1'] = task
+
+    # Autre processus (ou redémarrage) : même fichier SQLite
+    reopened = create_task_store(store_url, CompressionTask.from_dict)
+    assert 't1' in reopened and 't2' not in reopened
+    assert reopened['t1'].settings == {'quality': 70}
+    assert [t.task_id for t in reopened.values()] == ['t1']
+    del reopened['t1']
+    assert tasks.get('t1') is None
+
+
+def test_concurrent_updates_are_not_lost(tasks):
+    tasks['t1'] = CompressionTask('t1', [])
+
+    def add_results(start):
+        for index in range(start, start + 20):
+            tasks.update('t1', lambda task: task.results.append({'index': index}))
+
+    threads = [threading.Thread(target=add_results, args=(start,)) for start in (0, 100, 200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(tasks['t1'].results) == 60
+    with pytest.raises(KeyError):
+        tasks.update('missing', lambda task: None)
+
+
+def test_events_and_uploads_follow_their_task(tasks):
+    tasks['t1'] = CompressionTask('t1', [])
+    assert tasks.append_event('t1', 'started', {'total_files': 1}) == 1
+    assert tasks.append_event('t1', 'completed', {}) == 2
+    assert tasks.append_event('t2', 'started', {}) == 1
+    assert [e['event'] for e in tasks.events_since('t1', 1)] == ['completed']
+
+    tasks.save_upload('u1', {'task_id': 't1', 'offset': 0})
+    tasks.save_upload('u1', {'task_id': 't1', 'offset': 10})
+    assert tasks.load_upload('u1')['offset'] == 10
+    assert tasks.uploads_for_task('t1') == [{'upload_id': 'u1', 'task_id': 't1', 'offset': 10}]
+
+    # Supprimer la tâche emporte son journal et ses uploads
+    del tasks['t1']
+    assert tasks.events_since('t1', 0) == [] and tasks.load_upload('u1') is None
+    assert tasks.ping()
@@ -0,0 +1,67 @@
+# backend/tests/test_uploads.py
+"""Upload fragmenté et reprenable (/api/uploads)"""
+
+import io
+import threading
+import time
+
+
+def open_upload(client, size, filename='clip.bin'):
+    response = client.post('/api/uploads', json={'filename': filename, 'size': size})
+    assert response.status_code == 200
+    return response.json['upload_id']
+
+
+def test_resume_from_server_offset(client):
+    data = bytes(range(256)) * 40
+    upload_id = open_upload(client, len(data))
+    
+    response = client.put(f'/api/uploads/{upload_id}', data=data[:4000], headers={'Upload-Offset': '0'})
+    assert response.json['offset'] == 4000 and not response.json['complete']
+    
+    # Morceau rejoué (réponse perdue côté client) : le serveur indique où reprendre
+    response = client.put(f'/api/uploads/{upload_id}', data=data[:4000], headers={'Upload-Offset': '0'})
+    assert response.status_code == 409 and response.json['offset'] == 4000
+    
+    response = client.put(f'/api/uploads/{upload_id}', data=data[4000:], headers={'Upload-Offset': '4000'})
+    assert response.json['complete']
+    assert client.get(f'/api/uploads/{upload_id}').json['offset'] == len(data)
+
+
+def test_chunk_checksum_mismatch_is_rolled_back(client):
+    upload_id = open_upload(client, 10)
+    response = client.put(f'/api/uploads/{upload_id}', data=b'0123456789',
+                          headers={'Upload-Offset': '0', 'X-Chunk-SHA256': '0' * 64})
+    assert response.status_code == 400 and response.json['offset'] == 0
+    assert client.get(f'/api/uploads/{upload_id}').json['offset'] == 0
+
+
+class SlowStream(io.BytesIO):
+    """Corps de requête lu lentement, pour que deux envois se chevauchent"""
+    
+    def readinto(self, buffer):
+        time.sleep(0.05)
+        return super().readinto(memoryview(buffer)[:1000])
+
+
+def test_concurrent_chunks_at_same_offset(app_module):
+    data = b'x' * 5000
+    upload_id = open_upload(app_module.app.test_client(), len(data) * 2)
+    statuses = []
+    
+    def send():
+        response = app_module.app.test_client().put(
+            f'/api/uploads/{upload_id}', input_stream=SlowStream(data),
+            headers={'Upload-Offset': '0', 'Content-Length': str(len(data))}
+        )
+        statuses.append(response.status_code)
+    
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(statuses) == [200, 409]
+    assert app_module.app.test_client().get(f'/api/uploads/{upload_id}').json['offset'] == len(data)
@@ -0,0 +1,30 @@
+# backend/tests/test_video.py
+"""Analyse préalable des vidéos"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from file_compressor import compress_file_job
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg absent")
+
+
+@pytest.fixture
+def clip(tmp_path):
+    # H.264 déjà conforme, piste AAC à 192k
+    path = tmp_path / 'clip.mp4'
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25',
+        '-f', 'lavfi', '-i', 'anoisesrc=sample_rate=44100:amplitude=0.5',
+        '-t', '2', '-c:v', 'libx264', '-b:v', '300k', '-c:a', 'aac', '-b:a', '192k', str(path)
+    ], check=True)
+    return path
+
+
+@pytest.mark.parametrize('audio_bitrate, action', [('256k', 'skip'), ('96k', 'copy')])
+def test_audio_bitrate_setting_applies_to_video(tmp_path, clip, audio_bitrate, action):
+    result = compress_file_job(str(tmp_path / 'out'), str(clip), {'audio_bitrate': audio_bitrate})
+    assert result['action'] == action
@@ -0,0 +1,63 @@
+# backend/tests/test_worker.py
+"""Worker de la file partagée (mode EXECUTION_MODE=queue)"""
+
+import threading
+import time
+
+from PIL import Image
+
+from compression_task import CompressionTask
+from job_queue import create_job_queue
+from metrics import REGISTRY
+from task_store import create_task_store
+from worker import CompressionWorker
+
+
+def sample(name):
+    """Valeur d'une série du registre (0 si absente)"""
+    for line in REGISTRY.render().splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split(' ')[1])
+    return 0.0
+
+
+def test_worker_records_file_metrics(tmp_path):
+    tasks = create_task_store(f"sqlite:///{tmp_path / 'tasks.db'}", CompressionTask.from_dict)
+    job_queue = create_job_queue(f"sqlite:///{tmp_path / 'jobs.db'}")
+    source = tmp_path / 'a.png'
+    Image.new('RGB', (64, 64), (20, 20, 200)).save(source)
+    file_info = {'filename': 'a.png', 'path': str(source), 'size': source.stat().st_size}
+
+    task = CompressionTask('task', [file_info])
+    task.status = 'queued'
+    tasks.save_task(task.task_id, task.to_dict())
+    job_queue.enqueue(task.task_id, 'light', {
+        'index': 0,
+        'file': file_info,
+        'settings': {},
+        'output_dir': str(tmp_path / 'out'),
+        'queued_at': time.time() - 5
+    })
+
+    files = 'compressor_files_total{file_type="image",action="compress"}'
+    waits = 'compressor_queue_wait_seconds_count{lane="light"}'
+    waited = 'compressor_queue_wait_seconds_sum{lane="light"}'
+    before = {name: sample(name) for name in (files, waits, waited)}
+
+    worker = CompressionWorker(job_queue, tasks, poll_interval=0.1)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 30
+        while tasks.get(task.task_id).status != 'completed':
+            assert time.monotonic() < deadline, "fichier non traité par le worker"
+            time.sleep(0.1)
+    finally:
+        worker.stop()
+        thread.join()
+
+    assert tasks.get(task.task_id).results[0]['status'] == 'success'
+    assert sample(files) == before[files] + 1
+    assert sample(waits) == before[waits] + 1
+    # Attente mesurée depuis la mise en file par le serveur web
+    assert sample(waited) - before[waited] >= 5
@@ -0,0 +1,65 @@
+# backend/tests/test_zip_stream.py
+"""Archives ZIP diffusées en flux, puis servies depuis le disque avec reprise (Range)"""
+
+import io
+import time
+import zipfile
+
+from PIL import Image
+
+from zip_stream import stream_zip
+
+
+def make_entries(tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'\xff\xd8' + bytes(range(256)) * 40)
+    (tmp_path / 'notes.txt').write_text('compressible ' * 1000)
+    return [(tmp_path / 'photo.jpg', 'photo.jpg'), (tmp_path / 'notes.txt', 'docs/notes.txt')]
+
+
+def test_streamed_archive_is_valid_and_cached(tmp_path):
+    entries = make_entries(tmp_path)
+    cache_path = tmp_path / 'archive.zip'
+    data = b''.join(stream_zip(entries, cache_path))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ['photo.jpg', 'docs/notes.txt']
+        assert archive.read('docs/notes.txt') == (tmp_path / 'notes.txt').read_bytes()
+        # Formats déjà compressés stockés tels quels, les autres dégonflés
+        assert archive.getinfo('photo.jpg').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('docs/notes.txt').compress_type == zipfile.ZIP_DEFLATED
+    assert cache_path.read_bytes() == data
+
+
+def test_interrupted_stream_leaves_no_archive(tmp_path):
+    cache_path = tmp_path / 'archive.zip'
+    stream = stream_zip(make_entries(tmp_path), cache_path)
+    next(stream)
+    # Client déconnecté : le générateur est fermé avant la fin
+    stream.close()
+    assert list(tmp_path.glob('*archive.zip*')) == []
+
+
+def test_second_download_supports_range(client):
+    image = io.BytesIO()
+    Image.effect_noise((64, 64), 40).convert('RGB').save(image, 'PNG')
+    image.seek(0)
+    task_id = client.post('/api/upload', data={'files': [(image, 'a.png')]},
+                          content_type='multipart/form-data').json['task_id']
+    client.post('/api/compress', json={'task_id': task_id})
+    deadline = time.monotonic() + 30
+    while client.get(f'/api/status/{task_id}').json['status'] != 'completed':
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+    # Premier téléchargement : construit en flux et enregistré
+    full = client.get(f'/api/download/{task_id}')
+    assert full.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(full.data)) as archive:
+        assert len(archive.namelist()) == 1
+
+    partial = client.get(f'/api/download/{task_id}', headers={'Range': 'bytes=10-19'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f'bytes 10-19/{len(full.data)}'
+    assert partial.data == full.data[10:20]
+    etag = partial.headers['ETag']
+    assert client.get(f'/api/download/{task_id}', headers={'If-None-Match': etag}).status_code == 304
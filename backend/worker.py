@@ -0,0 +1,326 @@
+# backend/worker.py
+"""
+Worker de compression pour le mode EXECUTION_MODE=queue
+Traite les fichiers de la file partagée (JOB_QUEUE_URL) et écrit leurs résultats
+dans le stockage des tâches (TASK_STORE_URL). Se lance sur autant de machines que
+nécessaire, indépendamment des serveurs web : python worker.py --concurrency 4
+Les dossiers d'uploads, de sorties et de cache doivent être partagés avec le web.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional, Sequence
+
+from codec_backends import file_type_for
+from compression_task import CompressionTask, build_file_result, record_file_progress, record_file_result
+from file_compressor import compress_file_job_in_pool, estimate_job_memory, init_progress_queue, set_image_pixel_limit
+from job_metrics import queue_wait_seconds, record_job_metrics
+from job_queue import JobQueue, create_job_queue
+from metrics import serve_metrics
+from result_cache import ResultCache
+from scheduler import MemoryBudget, available_memory
+from task_store import TaskStore, create_task_store
+
+# Intervalle minimal entre deux écritures de progression d'un même fichier (secondes)
+PROGRESS_INTERVAL = 1.0
+
+
+class CompressionWorker:
+    """
+    Réserve au plus concurrency fichiers à la fois et les compresse dans un pool de processus.
+    Avec un budget mémoire, un fichier réservé ne démarre que si sa mémoire estimée y tient ;
+    limits = (mémoire, durée) plafonne chaque fichier (voir file_compressor.job_limits).
+    Un thread signale régulièrement les jobs en cours (heartbeat_interval) ; les jobs d'un
+    worker silencieux depuis stale_timeout secondes sont remis en file par les autres workers.
+    """
+
+    def __init__(self, job_queue: JobQueue, tasks: TaskStore, concurrency: int = 1,
+                 lanes: Optional[Sequence[str]] = None, result_cache: Optional[ResultCache] = None,
+                 heartbeat_interval: float = 10.0, stale_timeout: float = 60.0, poll_interval: float = 1.0,
+                 memory_budget: Optional[MemoryBudget] = None, limits: Optional[tuple] = None):
+        self.job_queue = job_queue
+        self.tasks = tasks
+        self.concurrency = max(1, concurrency)
+        self.lanes = tuple(lanes or job_queue.lanes)
+        self.result_cache = result_cache
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_timeout = stale_timeout
+        self.poll_interval = poll_interval
+        self.memory_budget = memory_budget
+        self.limits = limits
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._running = {}  # job_id -> job réservé par ce worker
+        self._progress_sent = {}  # job_id -> instant de la dernière progression écrite
+
+    def stop(self) -> None:
+        """Arrêt propre : plus aucune réservation, les fichiers en cours se terminent"""
+        self._stopping.set()
+
+    def publish(self, task_id: str, event_type: str, data: dict) -> None:
+        # Les flux SSE des serveurs web relisent le journal des événements du stockage
+        self.tasks.append_event(task_id, event_type, data)
+
+    def run(self) -> None:
+        print(f"Worker {self.worker_id} : {self.concurrency} fichier(s) à la fois, voies {', '.join(self.lanes)}")
+        progress_queue = multiprocessing.Queue()
+        progress_thread = threading.Thread(target=self._drain_progress, args=(progress_queue,), daemon=True)
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        progress_thread.start()
+        heartbeat_thread.start()
+
+        executor = self._new_executor(progress_queue)
+        futures = {}
+        waiting = None  # (job, spec, mémoire estimée) réservé mais pas encore admis dans le budget
+        next_reclaim = 0.0
+        try:
+            while not self._stopping.is_set() or futures or waiting:
+                if time.monotonic() >= next_reclaim:
+                    self._reclaim_stale()
+                    next_reclaim = time.monotonic() + self.stale_timeout / 2
+
+                while len(futures) < self.concurrency:
+                    if waiting is None:
+                        if self._stopping.is_set():
+                            break
+                        job = self.job_queue.claim(self.worker_id, self.lanes)
+                        if job is None:
+                            break
+                        spec = self._start_job(job)
+                        if spec is None:
+                            continue
+                        cost = estimate_job_memory(spec[1], spec[2]) if self.memory_budget is not None else 0
+                        waiting = (job, spec, cost)
+                    job, spec, cost = waiting
+                    # Un seul fichier attend le budget (toujours signalé) : les autres restent en file
+                    if self.memory_budget is not None and not self.memory_budget.try_acquire(cost):
+                        break
+                    waiting = None
+                    try:
+                        future = executor.submit(compress_file_job_in_pool, job['job_id'], spec, self.limits)
+                    except BrokenProcessPool:
+                        # Pool cassé avant que l'échec de ses fichiers n'ait été constaté
+                        executor = self._new_executor(progress_queue)
+                        future = executor.submit(compress_file_job_in_pool, job['job_id'], spec, self.limits)
+                    futures[future] = (job, cost)
+
+                if not futures:
+                    self._stopping.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(futures, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job, cost = futures.pop(future)
+                    if self.memory_budget is not None:
+                        self.memory_budget.release(cost)
+                    broken |= self._finish_job(job, future)
+                if broken:
+                    # Un processus du pool est mort (mémoire, signal) : le pool est inutilisable
+                    executor.shutdown(wait=False)
+                    executor = self._new_executor(progress_queue)
+        finally:
+            self._stopping.set()
+            executor.shutdown(wait=True)
+            progress_queue.put(None)
+            progress_thread.join()
+        print(f"Worker {self.worker_id} arrêté")
+
+    def _new_executor(self, progress_queue) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            initializer=init_progress_queue,
+            initargs=(progress_queue,)
+        )
+
+    def _start_job(self, job: dict) -> Optional[tuple]:
+        """Passe la tâche en cours de traitement ; retourne la spécification du fichier, None s'il n'y a rien à faire"""
+        payload = job['payload']
+        index = payload['index']
+        state = {}
+
+        def mark_started(task):
+            state['done'] = task.has_result(index)
+            state['started'] = task.status == 'queued'
+            if state['started']:
+                task.status = 'processing'
+
+        try:
+            task = self.tasks.update(job['task_id'], mark_started)
+        except KeyError:
+            # Tâche supprimée entre-temps
+            self.job_queue.complete(job['job_id'], self.worker_id)
+            return None
+        if state['done']:
+            # Résultat déjà enregistré par un worker précédent, disparu avant de retirer le job
+            self.job_queue.complete(job['job_id'], self.worker_id)
+            return None
+        if state['started']:
+            self.publish(task.task_id, 'started', {'total_files': task.total_files})
+        if 'queued_at' in payload:
+            # Horloge murale : le serveur web qui a mis le fichier en file peut être sur une autre machine
+            queue_wait_seconds.observe(max(0.0, time.time() - payload['queued_at']), lane=job['lane'])
+
+        with self._lock:
+            self._running[job['job_id']] = job
+        return (payload['output_dir'], payload['file']['path'], payload['settings'], self.result_cache, True)
+
+    def _finish_job(self, job: dict, future) -> bool:
+        """Enregistre le résultat d'un fichier ; retourne True si le pool est hors d'usage"""
+        payload = job['payload']
+        broken = False
+        try:
+            try:
+                job_result, error = future.result(), None
+            except BrokenProcessPool:
+                broken = True
+                if self.job_queue.release(job['job_id'], self.worker_id):
+                    print(f"Processus de compression perdu, fichier remis en file: {payload['file']['filename']}")
+                    return broken
+                job_result, error = None, RuntimeError(
+                    f"Le processus de compression s'est arrêté {job['attempts']} fois sur ce fichier"
+                )
+            except Exception as e:
+                job_result, error = None, e
+
+            file_type = file_type_for(Path(payload['file']['path']).suffix) or 'other'
+            record_job_metrics(file_type, payload['file'], job_result, error)
+            self._record_result(job['task_id'], payload, build_file_result(payload['index'], payload['file'], job_result, error))
+            self.job_queue.complete(job['job_id'], self.worker_id)
+        except Exception as e:
+            # Le job n'est plus signalé : il sera repris après stale_timeout
+            print(f"Erreur d'enregistrement du fichier {payload['file']['filename']}: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(job['job_id'], None)
+                self._progress_sent.pop(job['job_id'], None)
+        return broken
+
+    def _record_result(self, task_id: str, payload: dict, result: dict) -> None:
+        """Ajoute le résultat à la tâche (une seule fois) et la termine avec son dernier fichier"""
+        try:
+            task, recorded, completed = record_file_result(self.tasks, task_id, result, complete=True)
+        except KeyError:
+            return
+        if recorded:
+            self.publish(task_id, 'file_completed', {**result, 'task_progress': round(task.progress, 1)})
+        if completed:
+            self.publish(task_id, 'completed', {'processed_files': task.processed_files})
+
+    def _reclaim_stale(self) -> None:
+        """Remet en file les jobs des workers disparus ; signale en erreur ceux qui ont épuisé leurs tentatives"""
+        try:
+            for job in self.job_queue.reclaim_stale(self.stale_timeout):
+                payload = job['payload']
+                error = RuntimeError(f"Worker perdu {job['attempts']} fois pendant la compression, fichier abandonné")
+                self._record_result(job['task_id'], payload, build_file_result(payload['index'], payload['file'], None, error))
+        except Exception as e:
+            print(f"Erreur lors de la reprise des jobs abandonnés: {e}")
+
+    def _heartbeat_loop(self) -> None:
+        # Continue pendant l'arrêt propre : les fichiers en cours restent signalés jusqu'au bout
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                job_ids = list(self._running)
+            if not job_ids:
+                continue
+            try:
+                self.job_queue.heartbeat(self.worker_id, job_ids)
+            except Exception as e:
+                print(f"Battement de cœur impossible: {e}")
+
+    def _drain_progress(self, progress_queue) -> None:
+        for job_id, fraction in iter(progress_queue.get, None):
+            try:
+                self._on_progress(job_id, fraction)
+            except Exception as e:
+                print(f"Erreur de progression: {e}")
+
+    def _on_progress(self, job_id: str, fraction: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            job = self._running.get(job_id)
+            last_sent = self._progress_sent.get(job_id)
+            if job is None or (last_sent is not None and now - last_sent < PROGRESS_INTERVAL):
+                return
+            self._progress_sent[job_id] = now
+
+        payload = job['payload']
+        index = payload['index']
+        try:
+            progress = record_file_progress(self.tasks, job['task_id'], index, fraction)
+        except KeyError:
+            return
+        if progress is None:
+            return
+        task, first = progress
+        if first:
+            self.publish(task.task_id, 'file_started', {'index': index, 'filename': payload['file']['filename']})
+        self.publish(task.task_id, 'file_progress', {
+            'index': index,
+            'filename': payload['file']['filename'],
+            'percent': round(fraction * 100, 1),
+            'task_progress': round(task.progress, 1)
+        })
+
+
+def main():
+    """Point d'entrée : configuration par variables d'environnement, surchargeable en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Worker de compression (mode EXECUTION_MODE=queue)")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get('WORKER_CONCURRENCY', os.cpu_count() or 1)),
+                        help="Fichiers compressés simultanément par ce worker (défaut: nombre de cœurs)")
+    parser.add_argument("--lanes", default=os.environ.get('WORKER_LANES', 'light,heavy'),
+                        help="Voies traitées, ex: heavy pour une machine dédiée à la vidéo (défaut: light,heavy)")
+    parser.add_argument("--queue-url", default=os.environ.get('JOB_QUEUE_URL', 'sqlite:////app/data/jobs.db'),
+                        help="File partagée (sqlite:////chemin/jobs.db ou redis://hote:6379/0)")
+    parser.add_argument("--task-store-url", default=os.environ.get('TASK_STORE_URL', 'sqlite:////app/data/tasks.db'),
+                        help="Stockage des tâches, le même que celui du serveur web")
+    parser.add_argument("--memory-budget", type=int, default=int(os.environ.get('MEMORY_BUDGET', 0)),
+                        help="Mémoire des fichiers compressés simultanément, en octets (défaut: 75 %% de la mémoire)")
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get('WORKER_METRICS_PORT', 0)),
+                        help="Port d'exposition des métriques Prometheus (/metrics), 0 = désactivé")
+    args = parser.parse_args()
+
+    set_image_pixel_limit(int(os.environ.get('MAX_IMAGE_PIXELS', 100_000_000)))
+    memory_limit = int(os.environ.get('JOB_MEMORY_LIMIT', 4 * 1024 * 1024 * 1024))
+    time_limit = int(os.environ.get('JOB_TIMEOUT', 3600))
+    cache_max_bytes = int(os.environ.get('CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    result_cache = None
+    if cache_max_bytes > 0:
+        result_cache = ResultCache(os.environ.get('CACHE_FOLDER', '/app/cache'), cache_max_bytes)
+
+    worker = CompressionWorker(
+        create_job_queue(args.queue_url, max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3))),
+        create_task_store(args.task_store_url, CompressionTask.from_dict),
+        concurrency=args.concurrency,
+        lanes=[lane.strip() for lane in args.lanes.split(',') if lane.strip()],
+        result_cache=result_cache,
+        heartbeat_interval=float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 10)),
+        stale_timeout=float(os.environ.get('JOB_STALE_TIMEOUT', 60)),
+        memory_budget=MemoryBudget(args.memory_budget or int(available_memory() * 0.75)),
+        limits=(memory_limit or None, time_limit or None)
+    )
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        print(f"Métriques sur http://0.0.0.0:{args.metrics_port}/metrics")
+
+    # SIGTERM (docker stop) : terminer les fichiers en cours sans en réserver d'autres
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
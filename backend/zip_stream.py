@@ -0,0 +1,94 @@
+# backend/zip_stream.py
+"""
+Génération d'archives ZIP en flux
+Les octets sont produits au fur et à mesure, sans fichier intermédiaire
+"""
+
+import io
+import os
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Formats déjà compressés : les recompresser coûte du CPU sans rien gagner
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.webp', '.heic', '.heif', '.avif',
+    '.mp4', '.mov', '.mkv', '.webm', '.avi', '.flv', '.wmv',
+    '.mp3', '.aac', '.m4a', '.ogg', '.opus',
+    '.zip', '.gz'
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Tampon non positionnable : zipfile écrit alors des descripteurs de données"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[Path, str]]) -> Iterator[bytes]:
+    """Produit une archive ZIP morceau par morceau à partir de (chemin, nom dans l'archive)"""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w') as archive:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            if path.suffix.lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            # Sans retour en arrière possible, ZIP64 doit être décidé avant l'écriture
+            force_zip64 = path.stat().st_size > zipfile.ZIP64_LIMIT * 0.9
+            with open(path, 'rb') as source, archive.open(info, mode='w', force_zip64=force_zip64) as target:
+                for block in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(block)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_zip(entries: Iterable[Tuple[Path, str]], cache_path: Optional[Path] = None) -> Iterator[bytes]:
+    """
+    Diffuse l'archive ; si cache_path est fourni, elle y est aussi enregistrée
+    pour servir directement les téléchargements suivants (avec reprise/Range).
+    """
+    if cache_path is None:
+        yield from (chunk for chunk in iter_zip(entries) if chunk)
+        return
+
+    partial_path = cache_path.with_name(f".{cache_path.name}.{uuid.uuid4().hex}.part")
+    completed = False
+    try:
+        with open(partial_path, 'wb') as cache_file:
+            for chunk in iter_zip(entries):
+                if chunk:
+                    cache_file.write(chunk)
+                    yield chunk
+        os.replace(partial_path, cache_path)
+        completed = True
+    finally:
+        # Client déconnecté avant la fin : archive partielle inutilisable
+        if not completed:
+            partial_path.unlink(missing_ok=True)
@@ -7,8 +7,12 @@ const FileCompressorApp = () => {
   const [compressionStatus, setCompressionStatus] = useState(null);
   const [settings, setSettings] = useState({
     quality: 85,
+    target_size_kb: null,
+    output_format: 'keep',
     video_bitrate: '1000k',
     audio_bitrate: '128k',
+    audio_format: 'mp3',
+    video_codec: 'h264',
     max_width: 1920,
     max_height: 1080
   });
@@ -17,6 +21,7 @@ const FileCompressorApp = () => {
   const [showSettings, setShowSettings] = useState(false);
   const fileInputRef = useRef(null);
   const pollInterval = useRef(null);
+  const eventSource = useRef(null);
 
   const API_BASE = window.location.hostname === 'localhost' ? 'http://localhost:5000' : '';
 
@@ -29,7 +34,7 @@ const FileCompressorApp = () => {
 
   const getFileIcon = (filename) => {
     const ext = filename.toLowerCase().split('.').pop();
-    if (['jpg', 'jpeg', 'png', 'webp', 'bmp', 'tiff', 'heic', 'heif'].includes(ext)) {
+    if (['jpg', 'jpeg', 'png', 'webp', 'avif', 'bmp', 'tiff', 'heic', 'heif'].includes(ext)) {
       return <FileImage className="w-6 h-6 text-blue-500" />;
     }
     if (['mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv'].includes(ext)) {
@@ -59,25 +64,56 @@ const FileCompressorApp = () => {
     event.preventDefault();
   }, []);
 
+  const sha256Hex = async (blob) => {
+    // crypto.subtle n'est disponible qu'en contexte sécurisé (HTTPS ou localhost)
+    if (!window.crypto || !window.crypto.subtle) return null;
+    const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+  };
+
+  const uploadFileInChunks = async (file, currentTaskId) => {
+    const initResponse = await fetch(`${API_BASE}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, task_id: currentTaskId })
+    });
+    if (!initResponse.ok) throw new Error('Upload init failed');
+    const { upload_id, task_id, chunk_size } = await initResponse.json();
+
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + chunk_size);
+      const headers = { 'Content-Type': 'application/octet-stream', 'Upload-Offset': String(offset) };
+      const chunkHash = await sha256Hex(chunk);
+      if (chunkHash) headers['X-Chunk-SHA256'] = chunkHash;
+
+      try {
+        const response = await fetch(`${API_BASE}/api/uploads/${upload_id}`, { method: 'PUT', headers, body: chunk });
+        if (!response.ok && response.status !== 409) throw new Error('Chunk upload failed');
+        offset = (await response.json()).offset;
+        retries = 0;
+      } catch (error) {
+        // Connexion interrompue : reprendre là où le serveur s'est arrêté
+        if (++retries > 3) throw error;
+        const statusResponse = await fetch(`${API_BASE}/api/uploads/${upload_id}`);
+        if (statusResponse.ok) offset = (await statusResponse.json()).offset;
+      }
+    }
+    return task_id;
+  };
+
   const uploadFiles = async () => {
     if (files.length === 0) return;
 
     setIsUploading(true);
-    const formData = new FormData();
-    files.forEach(file => formData.append('files', file));
 
     try {
-      const response = await fetch(`${API_BASE}/api/upload`, {
-        method: 'POST',
-        body: formData
-      });
-
-      if (response.ok) {
-        const result = await response.json();
-        setTaskId(result.task_id);
-      } else {
-        throw new Error('Upload failed');
+      let currentTaskId = null;
+      for (const file of files) {
+        currentTaskId = await uploadFileInChunks(file, currentTaskId);
       }
+      setTaskId(currentTaskId);
     } catch (error) {
       console.error('Error uploading files:', error);
       alert('Erreur lors de l\'upload des fichiers');
@@ -98,7 +134,11 @@ const FileCompressorApp = () => {
       });
 
       if (response.ok) {
-        startPolling();
+        if (window.EventSource) {
+          startEventStream();
+        } else {
+          startPolling();
+        }
       } else {
         throw new Error('Compression start failed');
       }
@@ -109,6 +149,71 @@ const FileCompressorApp = () => {
     }
   };
 
+  const fetchStatus = async () => {
+    const response = await fetch(`${API_BASE}/api/status/${taskId}`);
+    if (response.ok) {
+      setCompressionStatus(await response.json());
+    }
+  };
+
+  const startEventStream = () => {
+    // Événements poussés par le serveur : plus de polling, progression interne à chaque fichier
+    const source = new EventSource(`${API_BASE}/api/events/${taskId}`);
+    eventSource.current = source;
+    const update = (changes) => setCompressionStatus(prev => ({
+      status: 'queued',
+      progress: 0,
+      processed_files: 0,
+      total_files: files.length,
+      results: [],
+      current_files: {},
+      ...prev,
+      ...changes(prev || { results: [], current_files: {} })
+    }));
+
+    source.addEventListener('queued', (e) => {
+      const data = JSON.parse(e.data);
+      update(() => ({ status: 'queued', queue_position: data.queue_position }));
+    });
+    source.addEventListener('started', (e) => {
+      const data = JSON.parse(e.data);
+      update(() => ({ status: 'processing', total_files: data.total_files }));
+    });
+    source.addEventListener('file_progress', (e) => {
+      const data = JSON.parse(e.data);
+      update(prev => ({
+        progress: data.task_progress,
+        current_files: { ...prev.current_files, [data.index]: data }
+      }));
+    });
+    source.addEventListener('file_completed', (e) => {
+      const data = JSON.parse(e.data);
+      update(prev => {
+        const { [data.index]: _done, ...currentFiles } = prev.current_files || {};
+        return {
+          progress: data.task_progress,
+          processed_files: (prev.processed_files || 0) + 1,
+          results: [...(prev.results || []), data],
+          current_files: currentFiles
+        };
+      });
+    });
+    const finish = async () => {
+      source.close();
+      await fetchStatus();
+      setIsCompressing(false);
+    };
+    source.addEventListener('completed', finish);
+    source.addEventListener('error', (e) => {
+      // Événement 'error' de la tâche (avec données) ou perte de connexion
+      if (e.data) {
+        finish();
+      } else if (source.readyState === EventSource.CLOSED) {
+        startPolling();
+      }
+    });
+  };
+
   const startPolling = () => {
     pollInterval.current = setInterval(async () => {
       try {
@@ -128,26 +233,16 @@ const FileCompressorApp = () => {
     }, 1000);
   };
 
-  const downloadFiles = async () => {
+  const downloadFiles = () => {
     if (!taskId) return;
 
-    try {
-      const response = await fetch(`${API_BASE}/api/download/${taskId}`);
-      if (response.ok) {
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `compressed_files_${taskId.slice(0, 8)}.zip`;
-        document.body.appendChild(a);
-        a.click();
-        window.URL.revokeObjectURL(url);
-        document.body.removeChild(a);
-      }
-    } catch (error) {
-      console.error('Error downloading files:', error);
-      alert('Erreur lors du téléchargement');
-    }
+    // Lien direct : le navigateur écrit l'archive sur disque au fil de sa génération
+    const a = document.createElement('a');
+    a.href = `${API_BASE}/api/download/${taskId}`;
+    a.download = `compressed_files_${taskId.slice(0, 8)}.zip`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
   };
 
   const resetApp = () => {
@@ -159,6 +254,9 @@ const FileCompressorApp = () => {
     if (pollInterval.current) {
       clearInterval(pollInterval.current);
     }
+    if (eventSource.current) {
+      eventSource.current.close();
+    }
     if (fileInputRef.current) {
       fileInputRef.current.value = '';
     }
@@ -203,7 +301,7 @@ const FileCompressorApp = () => {
                 Glissez vos fichiers ici ou cliquez pour sélectionner
               </h3>
               <p className="text-gray-500 mb-4">
-                Supports: Images, Vidéos, Audio, PDF (Max: 500MB)
+                Supports: Images, Vidéos, Audio, PDF (upload reprenable)
               </p>
               <input
                 ref={fileInputRef}
@@ -211,7 +309,7 @@ const FileCompressorApp = () => {
                 multiple
                 onChange={handleFileSelect}
                 className="hidden"
-                accept=".jpg,.jpeg,.png,.webp,.bmp,.tiff,.heic,.heif,.mp4,.avi,.mov,.mkv,.wmv,.flv,.mp3,.wav,.flac,.aac,.ogg,.m4a,.pdf"
+                accept=".jpg,.jpeg,.png,.webp,.avif,.bmp,.tiff,.heic,.heif,.mp4,.avi,.mov,.mkv,.wmv,.flv,.mp3,.wav,.flac,.aac,.ogg,.m4a,.pdf"
               />
             </div>
 
@@ -283,6 +381,36 @@ const FileCompressorApp = () => {
                           className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
                         />
                       </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700 mb-1">
+                          Taille cible image (Ko, optionnel)
+                        </label>
+                        <input
+                          type="number"
+                          min="1"
+                          placeholder="Qualité fixe"
+                          value={settings.target_size_kb || ''}
+                          onChange={(e) => setSettings({...settings, target_size_kb: e.target.value ? parseInt(e.target.value) : null})}
+                          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                        />
+                      </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700 mb-1">
+                          Format des images
+                        </label>
+                        <select
+                          value={settings.output_format}
+                          onChange={(e) => setSettings({...settings, output_format: e.target.value})}
+                          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                        >
+                          <option value="keep">Format d'origine</option>
+                          <option value="auto">Automatique (plus léger)</option>
+                          <option value="jpeg">JPEG progressif</option>
+                          <option value="webp">WebP</option>
+                          <option value="avif">AVIF</option>
+                          <option value="png">PNG</option>
+                        </select>
+                      </div>
                       <div>
                         <label className="block text-sm font-medium text-gray-700 mb-1">
                           Bitrate vidéo
@@ -297,6 +425,34 @@ const FileCompressorApp = () => {
                           <option value="2000k">2000k (Élevé)</option>
                         </select>
                       </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700 mb-1">
+                          Codec vidéo
+                        </label>
+                        <select
+                          value={settings.video_codec}
+                          onChange={(e) => setSettings({...settings, video_codec: e.target.value})}
+                          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                        >
+                          <option value="h264">H.264 (MP4, compatible)</option>
+                          <option value="h265">H.265 (MP4, plus compact)</option>
+                          <option value="vp9">VP9 (WebM)</option>
+                        </select>
+                      </div>
+                      <div>
+                        <label className="block text-sm font-medium text-gray-700 mb-1">
+                          Format audio
+                        </label>
+                        <select
+                          value={settings.audio_format}
+                          onChange={(e) => setSettings({...settings, audio_format: e.target.value})}
+                          className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                        >
+                          <option value="mp3">MP3 (compatible)</option>
+                          <option value="aac">AAC (M4A)</option>
+                          <option value="opus">Opus (plus compact)</option>
+                        </select>
+                      </div>
                     </div>
                   </div>
                 )}
@@ -351,6 +507,11 @@ const FileCompressorApp = () => {
                           style={{ width: `${compressionStatus.progress}%` }}
                         />
                       </div>
+                      {Object.values(compressionStatus.current_files || {}).map(file => (
+                        <p key={file.index} className="text-xs text-gray-500 mt-2 truncate">
+                          {file.filename} : {Math.round(file.percent)}%
+                        </p>
+                      ))}
                     </div>
                   )}
 
@@ -390,7 +551,16 @@ const FileCompressorApp = () => {
                     <div className="space-y-2 max-h-60 overflow-y-auto">
                       {compressionStatus.results.map((result, index) => (
                         <div key={index} className="flex items-center space-x-3 p-3 bg-gray-50 rounded-lg">
-                          {getFileIcon(result.filename)}
+                          {result.status === 'success' && result.preview_path ? (
+                            <img
+                              src={`${API_BASE}/api/preview/${taskId}/${result.index}`}
+                              alt={`Aperçu de ${result.filename}`}
+                              loading="lazy"
+                              className="w-12 h-12 object-cover rounded flex-shrink-0"
+                            />
+                          ) : (
+                            getFileIcon(result.filename)
+                          )}
                           <div className="flex-1 min-w-0">
                             <p className="text-sm font-medium text-gray-900 truncate">
                               {result.filename}
@@ -401,11 +571,27 @@ const FileCompressorApp = () => {
                                 <span className="text-green-600 ml-2">
                                   (-{result.compression_ratio.toFixed(1)}%)
                                 </span>
+                                {result.action === 'skip' && (
+                                  <span className="ml-2" title={result.reason}>· déjà optimisé</span>
+                                )}
+                                {result.action === 'copy' && (
+                                  <span className="ml-2" title={result.reason}>· recopié sans réencodage</span>
+                                )}
                               </p>
                             ) : (
                               <p className="text-xs text-red-500">{result.error}</p>
                             )}
                           </div>
+                          {result.status === 'success' && (
+                            <a
+                              href={`${API_BASE}/api/download/${taskId}/${result.index}`}
+                              download
+                              title="Télécharger ce fichier"
+                              className="text-gray-500 hover:text-blue-600 transition-colors"
+                            >
+                              <Download className="w-5 h-5" />
+                            </a>
+                          )}
                           <div>
                             {result.status === 'success' ? (
                               <CheckCircle className="w-5 h-5 text-green-500" />
@@ -439,6 +625,17 @@ const FileCompressorApp = () => {
                     </div>
                   )}
 
+                  {/* Queued Indicator */}
+                  {compressionStatus.status === 'queued' && (
+                    <div className="text-center py-4">
+                      <Loader className="w-8 h-8 text-gray-400 animate-spin mx-auto mb-2" />
+                      <p className="text-gray-600">
+                        En file d'attente
+                        {compressionStatus.queue_position && ` (position ${compressionStatus.queue_position})`}
+                      </p>
+                    </div>
+                  )}
+
                   {/* Error State */}
                   {compressionStatus.status === 'error' && (
                     <div className="bg-red-50 border border-red-200 rounded-lg p-4">